@@ -1,8 +1,69 @@
+from collections import namedtuple
 import datetime
+import heapq
+import json
+from functools import lru_cache
+import os
 from pathlib import Path
 import shutil
+import socket
 import sqlite3
-from typing import List, Optional, Dict, Any
+import time
+from typing import Callable, Iterator, List, Optional, Dict, Any, Sequence, Tuple
+
+from metrics import count, log, span
+from profiler import profiled
+
+# Lifecycle of a row in the 'jobs' table
+JOB_PENDING = "pending"
+JOB_LEASED = "leased"
+JOB_DONE = "done"
+JOB_FAILED = "failed"
+
+# Columns added to 'images' after the first release, with their types.
+# create_table adds whichever an older database is missing.
+IMAGE_MIGRATIONS = {
+    "ocrConfidence": "REAL",
+    "ocrModel": "TEXT",
+    "readAt": "TEXT",
+    # Kept current by the change tracking triggers, see create_table
+    "version": "INTEGER",
+    "updatedAt": "TEXT",
+}
+# Columns of the 'images' table that queries may project
+IMAGE_COLUMNS = ("id", "text", "fileName", "correctedText", *IMAGE_MIGRATIONS)
+
+# How detect / crop produced an image's plate crop, kept in 'detections'
+TIER_YOLO = "yolo"
+TIER_DB_FALLBACK = "db_fallback"
+TIER_MISSED = "missed"
+TIER_NO_BOX = "no_box"
+# Rows whose correctedText was filled in by hand
+CORRECTED_WHERE = "correctedText IS NOT NULL AND TRIM(correctedText) != ''"
+# Rows per fetchmany / keyset page when streaming
+PAGE_SIZE = 500
+
+RowFactory = Callable[[sqlite3.Cursor, tuple], Any]
+
+
+@lru_cache(maxsize=32)
+def _row_class(fields: Tuple[str, ...]):
+    return namedtuple("ImageRow", fields)
+
+
+def namedtuple_factory(cursor: sqlite3.Cursor, row: tuple):
+    """sqlite3 row factory returning namedtuples named after the columns."""
+    return _row_class(tuple(column[0] for column in cursor.description))(*row)
+
+
+def tuple_factory(cursor: sqlite3.Cursor, row: tuple) -> tuple:
+    """Plain tuples, the cheapest rows when the columns are known."""
+    return row
+
+
+def default_worker_id() -> str:
+    """Identify a worker by host and process, unique across machines."""
+    return f"{socket.gethostname()}-{os.getpid()}"
 
 
 class ImageManager:
@@ -14,24 +75,37 @@ class ImageManager:
     - Inserting new images
     - Viewing all records
     - Searching by file name or text
+    - A lease-based 'jobs' work queue shared by several workers
+    - Quarantining images that time out or crash a stage
     - Safe operations with error handling
     """
 
-    def __init__(self, db_name: str = "plates.db"):
+    def __init__(self, db_name: str = "plates.db", timeout: float = 30.0):
         self.db_name = db_name
+        # Seconds to wait on a lock held by another worker before failing
+        self.timeout = timeout
         self.conn = None
 
     def connect(self):
         """Establish a connection to the SQLite database."""
         try:
-            self.conn = sqlite3.connect(self.db_name)
-            print(f"✅ Connected to database: {self.db_name}")
+            self.conn = sqlite3.connect(self.db_name, timeout=self.timeout)
+            log(f"✅ Connected to database: {self.db_name}")
         except sqlite3.Error as e:
-            print(f"❌ Error connecting to database: {e}")
+            log(f"❌ Error connecting to database: {e}", "error")
             raise
 
     def create_table(self):
-        """Create the 'images' table if it doesn't exist."""
+        """
+        Create the 'images' and 'detections' tables if they don't exist, and
+        add the IMAGE_MIGRATIONS columns to an 'images' table from before
+        them. Existing rows keep NULL metadata until they are reprocessed.
+
+        Triggers give every insert, text / correctedText update and delete
+        the next number of one database-wide change counter, stored in the
+        row's version (or in 'deletedImages' for a delete), so exporters
+        can ask for everything after the version they last saw.
+        """
         if self.conn is None:
             self.connect()
 
@@ -54,13 +128,125 @@ class ImageManager:
                 ON images (fileName);
             """
             )
+            existing = {row[1] for row in cursor.execute("PRAGMA table_info(images)")}
+            for column, column_type in IMAGE_MIGRATIONS.items():
+                if column not in existing:
+                    cursor.execute(
+                        f"ALTER TABLE images ADD COLUMN {column} {column_type}"
+                    )
+                    log(f"🔧 Added column images.{column}")
+            self._create_change_tracking(cursor)
+
+            # One row per source image, written by detect / crop. It is its
+            # own table since missed plates never get an 'images' row.
+            cursor.execute(
+                """
+                CREATE TABLE IF NOT EXISTS detections (
+                    fileName TEXT PRIMARY KEY,
+                    yoloConfidence REAL,
+                    bbox TEXT,
+                    cropTier TEXT NOT NULL,
+                    detectModel TEXT,
+                    detectedAt TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP
+                )
+            """
+            )
             self.conn.commit()
-            print("✅ Table 'images' created successfully.")
+            log("✅ Table 'images' created successfully.")
         except sqlite3.Error as e:
-            print(f"❌ Error creating table: {e}")
+            log(f"❌ Error creating table: {e}", "error")
             raise
 
-    def insert(self, text: str, file_name: str, corrected_text: Optional[str] = None):
+    def _create_change_tracking(self, cursor: sqlite3.Cursor):
+        cursor.execute(
+            """
+            CREATE TABLE IF NOT EXISTS changeCounter (
+                id INTEGER PRIMARY KEY CHECK (id = 1),
+                version INTEGER NOT NULL
+            )
+        """
+        )
+        if cursor.execute("SELECT 1 FROM changeCounter").fetchone() is None:
+            # Rows from before change tracking count as changed once, in id
+            # order, so the first incremental export has all of them
+            cursor.execute("UPDATE images SET version = id WHERE version IS NULL")
+            cursor.execute(
+                """
+                INSERT INTO changeCounter (id, version)
+                SELECT 1, COALESCE(MAX(id), 0) FROM images
+            """
+            )
+        cursor.execute(
+            """
+            CREATE INDEX IF NOT EXISTS idx_images_version ON images (version);
+        """
+        )
+        # ids are AUTOINCREMENT, never reused, so one tombstone per id
+        cursor.execute(
+            """
+            CREATE TABLE IF NOT EXISTS deletedImages (
+                id INTEGER PRIMARY KEY,
+                fileName TEXT,
+                version INTEGER NOT NULL,
+                deletedAt TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP
+            )
+        """
+        )
+        # The exports key plates by the number in the file name, so the
+        # tombstone keeps it. Older tombstones stay NULL
+        tombstone = cursor.execute("PRAGMA table_info(deletedImages)")
+        if "fileName" not in {row[1] for row in tombstone}:
+            cursor.execute("ALTER TABLE deletedImages ADD COLUMN fileName TEXT")
+            cursor.execute("DROP TRIGGER IF EXISTS images_track_delete")
+        cursor.execute(
+            """
+            CREATE INDEX IF NOT EXISTS idx_deleted_version ON deletedImages (version);
+        """
+        )
+        bump = "UPDATE changeCounter SET version = version + 1;"
+        current = "(SELECT version FROM changeCounter)"
+        cursor.execute(
+            f"""
+            CREATE TRIGGER IF NOT EXISTS images_track_insert AFTER INSERT ON images
+            BEGIN
+                {bump}
+                UPDATE images SET version = {current}, updatedAt = CURRENT_TIMESTAMP
+                WHERE id = NEW.id;
+            END
+        """
+        )
+        # Only what the exports carry, not the OCR metadata
+        cursor.execute(
+            f"""
+            CREATE TRIGGER IF NOT EXISTS images_track_update
+            AFTER UPDATE OF text, correctedText ON images
+            BEGIN
+                {bump}
+                UPDATE images SET version = {current}, updatedAt = CURRENT_TIMESTAMP
+                WHERE id = NEW.id;
+            END
+        """
+        )
+        cursor.execute(
+            f"""
+            CREATE TRIGGER IF NOT EXISTS images_track_delete AFTER DELETE ON images
+            BEGIN
+                {bump}
+                INSERT OR REPLACE INTO deletedImages (id, fileName, version)
+                VALUES (OLD.id, OLD.fileName, {current});
+            END
+        """
+        )
+
+    @profiled("db")
+    def insert(
+        self,
+        text: str,
+        file_name: str,
+        corrected_text: Optional[str] = None,
+        ocr_confidence: Optional[float] = None,
+        ocr_model: Optional[str] = None,
+    ):
         """
         Insert a new image record.
 
@@ -68,78 +254,919 @@ class ImageManager:
             text: Text content of the image
             file_name: File name (e.g., 'plate_001.jpg')
             corrected_text: Optional corrected text
+            ocr_confidence: Lowest recognition score of the text's lines
+            ocr_model: Version of the OCR pipeline that read it
+        """
+        if self.conn is None:
+            self.connect()
+
+        try:
+            with span("db_insert", file_name):
+                cursor = self.conn.cursor()
+                # Check if filename already exists
+                cursor.execute("SELECT 1 FROM images WHERE fileName = ?", (file_name,))
+                exists = cursor.fetchone()  # Returns (1,) if exists, None otherwise
+
+                if exists:
+                    count("plates_db_rows_total", result="skipped")
+                    log(
+                        f"😅 File '{file_name}' already exists. Skipping insertion.",
+                        "debug",
+                    )
+                    return False
+                cursor.execute(
+                    """
+                    INSERT INTO images (
+                        text, fileName, correctedText, ocrConfidence, ocrModel, readAt
+                    )
+                    VALUES (?, ?, ?, ?, ?, CURRENT_TIMESTAMP)
+                """,
+                    (text, file_name, corrected_text, ocr_confidence, ocr_model),
+                )
+                self.conn.commit()
+            count("plates_db_rows_total", result="inserted")
+            log(f"✅ Inserted: {file_name}", "debug")
+            return cursor.lastrowid
+        except sqlite3.Error as e:
+            log(f"❌ Error inserting record: {e}", "error")
+            raise
+
+    @profiled("db")
+    def insert_batch(
+        self, records: Sequence[Tuple[Any, ...]], replace: bool = False
+    ) -> List[Optional[int]]:
+        """
+        Insert many records in one transaction, one commit (and fsync) for
+        all of them.
+
+        Args:
+            records: (text, fileName, correctedText, ocrConfidence, ocrModel)
+                tuples
+            replace: Update the text and OCR metadata of records whose
+                fileName exists, instead of skipping them
+
+        Returns:
+            Each record's row id, None where it was skipped
+        """
+        if self.conn is None:
+            self.connect()
+
+        conflict = (
+            """
+            DO UPDATE SET text = excluded.text,
+                ocrConfidence = excluded.ocrConfidence,
+                ocrModel = excluded.ocrModel,
+                readAt = CURRENT_TIMESTAMP
+        """
+            if replace
+            else "DO NOTHING"
+        )
+        sql = f"""
+            INSERT INTO images (
+                text, fileName, correctedText, ocrConfidence, ocrModel, readAt
+            )
+            VALUES (?, ?, ?, ?, ?, CURRENT_TIMESTAMP)
+            ON CONFLICT (fileName) {conflict}
+            RETURNING id
+        """
+        row_ids = []
+        try:
+            with self.conn:
+                cursor = self.conn.cursor()
+                for record in records:
+                    cursor.execute(sql, record)
+                    row = cursor.fetchone()
+                    row_ids.append(row[0] if row else None)
+        except sqlite3.Error as e:
+            log(f"❌ Error inserting batch of {len(records)} records: {e}", "error")
+            raise
+        written = sum(row_id is not None for row_id in row_ids)
+        count("plates_db_rows_total", written, result="inserted")
+        count("plates_db_rows_total", len(row_ids) - written, result="skipped")
+        return row_ids
+
+    def _projection(self, columns: Optional[Sequence[str]]) -> str:
+        """SELECT list for columns, id always first as the pagination key."""
+        if not columns:
+            return "*"
+        unknown = set(columns) - set(IMAGE_COLUMNS)
+        if unknown:
+            raise ValueError(f"Unknown image columns: {', '.join(sorted(unknown))}")
+        return ", ".join(["id"] + [column for column in columns if column != "id"])
+
+    def iter_query(
+        self,
+        sql: str,
+        params: Sequence[Any] = (),
+        page_size: int = PAGE_SIZE,
+        row_factory: Optional[RowFactory] = sqlite3.Row,
+    ) -> Iterator[Any]:
+        """
+        Stream the rows of one query, page_size rows per fetchmany.
+
+        The cursor stays open until the generator is exhausted or closed,
+        so finish it before writing through this connection. Long scans
+        that write as they go should use iter_images.
+        """
+        if self.conn is None:
+            self.connect()
+
+        cursor = self.conn.cursor()
+        cursor.row_factory = row_factory
+        try:
+            cursor.execute(sql, params)
+            while True:
+                rows = cursor.fetchmany(page_size)
+                if not rows:
+                    return
+                yield from rows
+        finally:
+            cursor.close()
+
+    def iter_images(
+        self,
+        columns: Optional[Sequence[str]] = None,
+        text: Optional[str] = None,
+        file_name: Optional[str] = None,
+        where: Optional[str] = None,
+        after_id: int = 0,
+        page_size: int = PAGE_SIZE,
+        row_factory: Optional[RowFactory] = sqlite3.Row,
+    ) -> Iterator[Any]:
+        """
+        Stream 'images' rows in id order at constant memory.
+
+        Each page is its own query, WHERE id > last id LIMIT page_size, so
+        no cursor is open between pages and the caller may write to the
+        database while iterating. Rows always start with id.
+
+        Args:
+            columns: Columns to select (see IMAGE_COLUMNS), all if None
+            text: Only rows whose text contains this
+            file_name: Only rows whose fileName contains this
+            where: Extra SQL condition, e.g. "correctedText IS NOT NULL"
+            after_id: Resume after this id
+            page_size: Rows per page
+            row_factory: sqlite3.Row, namedtuple_factory, tuple_factory or
+                any sqlite3 row factory whose rows index like tuples
+
+        Raises:
+            sqlite3.Error: If a page can't be read, rather than ending early
+        """
+        conditions = ["id > ?"]
+        params: List[Any] = []
+        if text is not None:
+            conditions.append("text LIKE ?")
+            params.append(f"%{text}%")
+        if file_name is not None:
+            conditions.append("fileName LIKE ?")
+            params.append(f"%{file_name}%")
+        if where:
+            conditions.append(f"({where})")
+        sql = f"""
+            SELECT {self._projection(columns)} FROM images
+            WHERE {" AND ".join(conditions)}
+            ORDER BY id LIMIT ?
         """
+
+        last_id = after_id
+        while True:
+            try:
+                page = list(
+                    self.iter_query(
+                        sql, (last_id, *params, page_size), page_size, row_factory
+                    )
+                )
+            except sqlite3.Error as e:
+                log(f"❌ Error reading records: {e}", "error")
+                raise
+            yield from page
+            if len(page) < page_size:
+                return
+            last_id = page[-1][0]
+
+    def _dicts(self, rows: Iterator[sqlite3.Row]) -> List[Dict[str, Any]]:
+        return [dict(row) for row in rows]
+
+    @profiled("db")
+    def get_all(self) -> List[Dict[str, Any]]:
+        """Retrieve all records as a list of dictionaries."""
+        return self._dicts(self.iter_images())
+
+    @profiled("db")
+    def search_by_filename(self, filename: str) -> List[Dict[str, Any]]:
+        """Search for images by filename (partial match)."""
+        return self._dicts(self.iter_images(file_name=filename))
+
+    @profiled("db")
+    def search_by_text(self, text: str) -> List[Dict[str, Any]]:
+        """Search for images by text content (partial match)."""
+        return self._dicts(self.iter_images(text=text))
+
+    @profiled("db")
+    def has_file(self, file_name: str) -> bool:
+        """Whether a record with exactly this fileName exists."""
         if self.conn is None:
             self.connect()
 
         try:
             cursor = self.conn.cursor()
-            # Check if filename already exists
-            cursor.execute("SELECT 1 FROM images WHERE fileName = ?", (file_name,))
-            exists = cursor.fetchone()  # Returns (1,) if exists, None otherwise
+            cursor.execute(
+                "SELECT 1 FROM images WHERE fileName = ? LIMIT 1", (file_name,)
+            )
+            return cursor.fetchone() is not None
+        except sqlite3.Error as e:
+            log(f"❌ Error searching by filename: {e}", "error")
+            return False
 
-            if exists:
-                print(f"😅 File '{file_name}' already exists. Skipping insertion.")
-                return False
+    def iter_processed_names(self) -> Iterator[str]:
+        """
+        File names already through the pipeline: those with an 'images' row
+        and those with a 'detections' row, which includes the images where
+        no plate was found and that never get an 'images' row.
+        """
+        try:
+            for (name,) in self.iter_query(
+                """
+                SELECT fileName FROM images
+                UNION
+                SELECT fileName FROM detections
+            """,
+                row_factory=tuple_factory,
+            ):
+                yield name
+        except sqlite3.Error as e:
+            log(f"❌ Error reading processed file names: {e}", "error")
+
+    @profiled("db")
+    def get_labeled(self) -> List[Dict[str, Any]]:
+        """Records whose correctedText was filled in by hand, oldest first."""
+        return self._dicts(
+            self.iter_images(where=CORRECTED_WHERE)
+        )
+
+    def get_plate_texts(
+        self, corrected_only: bool = False
+    ) -> Iterator[Tuple[str, Optional[str]]]:
+        """
+        (text, correctedText) of every record, or of the hand-corrected ones,
+        streamed to build a PlateIndex.
+        """
+        for _, text, corrected_text in self.iter_images(
+            columns=("text", "correctedText"),
+            where=CORRECTED_WHERE if corrected_only else None,
+            row_factory=tuple_factory,
+        ):
+            yield text, corrected_text
+
+    @profiled("db")
+    def record_detection(
+        self,
+        file_name: str,
+        tier: str,
+        confidence: Optional[float] = None,
+        bbox: Optional[Sequence[Sequence[float]]] = None,
+        model: Optional[str] = None,
+    ):
+        """
+        Record how an image's plate was found, replacing an earlier record.
+
+        Args:
+            file_name: Source image name, the same as its crop's
+            tier: TIER_YOLO, TIER_DB_FALLBACK, TIER_MISSED or TIER_NO_BOX
+            confidence: YOLO confidence of the chosen box
+            bbox: The YOLO box as points, stored as JSON
+            model: Version of the detection model
+        """
+        if self.conn is None:
+            self.connect()
+
+        if bbox is not None:
+            bbox = json.dumps([[int(x), int(y)] for x, y in bbox])
+        try:
+            cursor = self.conn.cursor()
             cursor.execute(
-                "INSERT INTO images (text, fileName, correctedText) VALUES (?, ?, ?)",
-                (text, file_name, corrected_text),
+                """
+                INSERT OR REPLACE INTO detections (
+                    fileName, yoloConfidence, bbox, cropTier, detectModel
+                )
+                VALUES (?, ?, ?, ?, ?)
+            """,
+                (file_name, confidence, bbox, tier, model),
             )
             self.conn.commit()
-            print(f"✅ Inserted: {file_name}")
-            return cursor.lastrowid
         except sqlite3.Error as e:
-            print(f"❌ Error inserting record: {e}")
+            log(f"❌ Error recording detection: {e}", "error")
             raise
 
-    def get_all(self) -> List[Dict[str, Any]]:
-        """Retrieve all records as a list of dictionaries."""
+    @profiled("db")
+    def get_crop_tiers(self, file_names: Sequence[str]) -> Dict[str, str]:
+        """The recorded crop tier of each of file_names that has a detection."""
         if self.conn is None:
             self.connect()
 
+        tiers = {}
         try:
             cursor = self.conn.cursor()
-            cursor.execute("SELECT * FROM images")
-            rows = cursor.fetchall()
-            # Convert to dict format
-            headers = [description[0] for description in cursor.description]
-            return [dict(zip(headers, row)) for row in rows]
+            # Under SQLite's default limit of bound parameters per query
+            for start in range(0, len(file_names), PAGE_SIZE):
+                chunk = file_names[start : start + PAGE_SIZE]
+                cursor.execute(
+                    f"""
+                    SELECT fileName, cropTier FROM detections
+                    WHERE fileName IN ({", ".join("?" * len(chunk))})
+                """,
+                    chunk,
+                )
+                tiers.update(cursor.fetchall())
+            return tiers
         except sqlite3.Error as e:
-            print(f"❌ Error reading records: {e}")
-            return []
+            log(f"❌ Error reading crop tiers: {e}", "error")
+            raise
 
-    def search_by_filename(self, filename: str) -> List[Dict[str, Any]]:
-        """Search for images by filename (partial match)."""
+    def select_for_reprocessing(
+        self,
+        max_yolo_confidence: Optional[float] = None,
+        max_ocr_confidence: Optional[float] = None,
+        detect_model: Optional[str] = None,
+        ocr_model: Optional[str] = None,
+        tiers: Optional[Sequence[str]] = None,
+        page_size: int = PAGE_SIZE,
+    ) -> Iterator[sqlite3.Row]:
+        """
+        Stream the images an upgrade could change, in fileName order.
+
+        An image is selected if it matches any of the given criteria. Images
+        without metadata (read before it was recorded) count as stale for
+        the model criteria but never match a confidence threshold. Missed
+        plates have a 'detections' row but no 'images' row, and are
+        selected through tiers or detect_model.
+
+        Args:
+            max_yolo_confidence: YOLO confidence below this
+            max_ocr_confidence: OCR confidence below this
+            detect_model: Detected by any other model version than this
+            ocr_model: Read by any other OCR version than this
+            tiers: Crop tier is one of these, e.g. (TIER_DB_FALLBACK,)
+
+        Yields:
+            Rows of fileName, id (None if never read), text, correctedText,
+            ocrConfidence, ocrModel, yoloConfidence, cropTier, detectModel
+        """
+        # Criteria on 'detections' columns apply to both branches, the OCR
+        # ones only to images that were read
+        detect_criteria, detect_params = [], []
+        read_criteria, read_params = [], []
+        if max_yolo_confidence is not None:
+            detect_criteria.append("d.yoloConfidence < ?")
+            detect_params.append(max_yolo_confidence)
+        if detect_model is not None:
+            detect_criteria.append("(d.detectModel IS NULL OR d.detectModel != ?)")
+            detect_params.append(detect_model)
+        if tiers:
+            detect_criteria.append(f"d.cropTier IN ({', '.join('?' * len(tiers))})")
+            detect_params.extend(tiers)
+        if max_ocr_confidence is not None:
+            read_criteria.append("i.ocrConfidence < ?")
+            read_params.append(max_ocr_confidence)
+        if ocr_model is not None:
+            read_criteria.append("(i.ocrModel IS NULL OR i.ocrModel != ?)")
+            read_params.append(ocr_model)
+        if not detect_criteria and not read_criteria:
+            raise ValueError("select_for_reprocessing needs at least one criterion")
+
+        # Each branch is paged on its own fileName index, with the keyset
+        # condition inside it, so a page never re-sorts the whole union
+        branches = [
+            self._pages_by_file_name(
+                f"""
+                SELECT i.fileName, i.id, i.text, i.correctedText, i.ocrConfidence,
+                    i.ocrModel, d.yoloConfidence, d.cropTier, d.detectModel
+                FROM images i LEFT JOIN detections d ON d.fileName = i.fileName
+                WHERE i.fileName > ?
+                    AND ({" OR ".join(detect_criteria + read_criteria)})
+                ORDER BY i.fileName LIMIT ?
+            """,
+                detect_params + read_params,
+                page_size,
+            )
+        ]
+        if detect_criteria:
+            # Missed plates: a detection but no image
+            branches.append(
+                self._pages_by_file_name(
+                    f"""
+                    SELECT d.fileName, NULL AS id, NULL AS text,
+                        NULL AS correctedText, NULL AS ocrConfidence,
+                        NULL AS ocrModel, d.yoloConfidence, d.cropTier,
+                        d.detectModel
+                    FROM detections d
+                    WHERE d.fileName > ?
+                        AND NOT EXISTS (
+                            SELECT 1 FROM images i WHERE i.fileName = d.fileName
+                        )
+                        AND ({" OR ".join(detect_criteria)})
+                    ORDER BY d.fileName LIMIT ?
+                """,
+                    detect_params,
+                    page_size,
+                )
+            )
+        # The branches never share a fileName
+        yield from heapq.merge(*branches, key=lambda row: row["fileName"])
+
+    def _pages_by_file_name(
+        self, sql: str, params: Sequence[Any], page_size: int
+    ) -> Iterator[sqlite3.Row]:
+        """
+        Keyset pages of a query taking (fileName > ?, *params, LIMIT ?).
+        No cursor stays open between pages.
+        """
+        last_name = ""
+        while True:
+            try:
+                page = list(
+                    self.iter_query(sql, (last_name, *params, page_size), page_size)
+                )
+            except sqlite3.Error as e:
+                log(f"❌ Error selecting records to reprocess: {e}", "error")
+                return
+            yield from page
+            if len(page) < page_size:
+                return
+            last_name = page[-1]["fileName"]
+
+    @profiled("db")
+    def current_version(self) -> int:
+        """The change counter, the version of the latest insert, update or delete."""
+        if self.conn is None:
+            self.connect()
+
+        try:
+            cursor = self.conn.cursor()
+            cursor.execute("SELECT version FROM changeCounter")
+            row = cursor.fetchone()
+            return row[0] if row else 0
+        except sqlite3.Error as e:
+            log(f"❌ Error reading change counter: {e}", "error")
+            raise
+
+    def iter_changes(
+        self,
+        since: int,
+        until: Optional[int] = None,
+        columns: Optional[Sequence[str]] = None,
+        page_size: int = PAGE_SIZE,
+    ) -> Iterator[sqlite3.Row]:
+        """
+        Stream the rows inserted or updated after version since (and up to
+        until), oldest change first, keyset-paged on the version index.
+        """
+        until = self.current_version() if until is None else until
+        projection = self._projection(columns)
+        if projection != "*" and "version" not in projection:
+            projection += ", version"
+        sql = f"""
+            SELECT {projection} FROM images
+            WHERE version > ? AND version <= ?
+            ORDER BY version LIMIT ?
+        """
+        while True:
+            try:
+                page = list(self.iter_query(sql, (since, until, page_size), page_size))
+            except sqlite3.Error as e:
+                log(f"❌ Error reading changes: {e}", "error")
+                raise
+            yield from page
+            if len(page) < page_size:
+                return
+            since = page[-1]["version"]
+
+    def iter_deletions(
+        self, since: int, until: Optional[int] = None
+    ) -> Iterator[sqlite3.Row]:
+        """Stream (id, fileName, version, deletedAt) of rows deleted after since."""
+        until = self.current_version() if until is None else until
+        return self.iter_query(
+            """
+            SELECT id, fileName, version, deletedAt FROM deletedImages
+            WHERE version > ? AND version <= ?
+            ORDER BY version
+        """,
+            (since, until),
+        )
+
+    def create_jobs_table(self):
+        """
+        Create the 'jobs' work queue if it doesn't exist.
+
+        Each row is one image for one pipeline stage ('detect' or 'read').
+        Workers lease batches of rows, and a lease that isn't renewed before
+        leaseExpires is handed to the next worker that asks for work.
+        """
         if self.conn is None:
             self.connect()
 
         try:
             cursor = self.conn.cursor()
             cursor.execute(
-                "SELECT * FROM images WHERE fileName LIKE ?", (f"%{filename}%",)
+                """
+                CREATE TABLE IF NOT EXISTS jobs (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    stage TEXT NOT NULL,
+                    filePath TEXT NOT NULL,
+                    status TEXT NOT NULL DEFAULT 'pending',
+                    worker TEXT,
+                    leaseExpires REAL,
+                    attempts INTEGER NOT NULL DEFAULT 0,
+                    error TEXT,
+                    UNIQUE (stage, filePath)
+                )
+            """
+            )
+            cursor.execute(
+                """
+                CREATE INDEX IF NOT EXISTS idx_jobs_claim
+                ON jobs (stage, status, leaseExpires);
+            """
+            )
+            self.conn.commit()
+            log("✅ Table 'jobs' created successfully.")
+        except sqlite3.Error as e:
+            log(f"❌ Error creating jobs table: {e}", "error")
+            raise
+
+    @profiled("db")
+    def enqueue_jobs(self, stage: str, file_paths: List[str]) -> int:
+        """
+        Add images to the queue for a stage. Already queued paths are ignored,
+        so every worker can safely enqueue the same folder.
+
+        Returns:
+            Number of newly queued jobs
+        """
+        if self.conn is None:
+            self.connect()
+
+        try:
+            cursor = self.conn.cursor()
+            before = self.conn.total_changes
+            cursor.executemany(
+                "INSERT OR IGNORE INTO jobs (stage, filePath) VALUES (?, ?)",
+                [(stage, str(path)) for path in file_paths],
+            )
+            self.conn.commit()
+            added = self.conn.total_changes - before
+            log(f"✅ Queued {added} '{stage}' jobs.")
+            return added
+        except sqlite3.Error as e:
+            log(f"❌ Error queueing jobs: {e}", "error")
+            raise
+
+    @profiled("db")
+    def claim_jobs(
+        self,
+        stage: str,
+        worker: str,
+        batch_size: int = 10,
+        lease_seconds: float = 300,
+        max_attempts: int = 3,
+    ) -> List[Dict[str, Any]]:
+        """
+        Atomically lease up to batch_size jobs for a worker.
+
+        Pending jobs and jobs whose lease expired (the worker died or stalled)
+        are both claimable. A job that was leased max_attempts times without
+        completing is marked failed instead of being handed out again.
+        """
+        if self.conn is None:
+            self.connect()
+
+        now = time.time()
+        try:
+            cursor = self.conn.cursor()
+            cursor.execute(
+                """
+                UPDATE jobs SET status = ?, error = 'lease expired'
+                WHERE stage = ? AND status = ? AND leaseExpires < ?
+                    AND attempts >= ?
+            """,
+                (JOB_FAILED, stage, JOB_LEASED, now, max_attempts),
+            )
+            # Single statement, so two workers can never lease the same row
+            cursor.execute(
+                """
+                UPDATE jobs
+                SET status = ?, worker = ?, leaseExpires = ?, attempts = attempts + 1
+                WHERE id IN (
+                    SELECT id FROM jobs
+                    WHERE stage = ?
+                        AND (status = ? OR (status = ? AND leaseExpires < ?))
+                    ORDER BY id
+                    LIMIT ?
+                )
+                RETURNING id, filePath, attempts
+            """,
+                (
+                    JOB_LEASED,
+                    worker,
+                    now + lease_seconds,
+                    stage,
+                    JOB_PENDING,
+                    JOB_LEASED,
+                    now,
+                    batch_size,
+                ),
             )
             rows = cursor.fetchall()
+            self.conn.commit()
             headers = [description[0] for description in cursor.description]
-            return [dict(zip(headers, row)) for row in rows]
+            return sorted(
+                (dict(zip(headers, row)) for row in rows), key=lambda job: job["id"]
+            )
         except sqlite3.Error as e:
-            print(f"❌ Error searching by filename: {e}")
-            return []
+            self.conn.rollback()
+            log(f"❌ Error claiming jobs: {e}", "error")
+            raise
 
-    def search_by_text(self, text: str) -> List[Dict[str, Any]]:
-        """Search for images by text content (partial match)."""
+    @profiled("db")
+    def heartbeat_jobs(
+        self, job_ids: List[int], worker: str, lease_seconds: float = 300
+    ) -> int:
+        """
+        Extend the lease on jobs still held by this worker.
+
+        Returns:
+            Number of leases renewed. Fewer than len(job_ids) means a lease
+            already expired and the job may be running elsewhere.
+        """
         if self.conn is None:
             self.connect()
+        if not job_ids:
+            return 0
 
         try:
             cursor = self.conn.cursor()
-            cursor.execute("SELECT * FROM images WHERE text LIKE ?", (f"%{text}%",))
+            placeholders = ",".join("?" * len(job_ids))
+            cursor.execute(
+                f"""
+                UPDATE jobs SET leaseExpires = ?
+                WHERE worker = ? AND status = ? AND id IN ({placeholders})
+            """,
+                (time.time() + lease_seconds, worker, JOB_LEASED, *job_ids),
+            )
+            self.conn.commit()
+            return cursor.rowcount
+        except sqlite3.Error as e:
+            log(f"❌ Error renewing leases: {e}", "error")
+            raise
+
+    @profiled("db")
+    def complete_jobs(
+        self, job_ids: List[int], worker: str, error: Optional[str] = None
+    ) -> int:
+        """Mark leased jobs as done, or failed if an error is given."""
+        if self.conn is None:
+            self.connect()
+        if not job_ids:
+            return 0
+
+        try:
+            cursor = self.conn.cursor()
+            placeholders = ",".join("?" * len(job_ids))
+            cursor.execute(
+                f"""
+                UPDATE jobs SET status = ?, error = ?, leaseExpires = NULL
+                WHERE worker = ? AND status = ? AND id IN ({placeholders})
+            """,
+                (
+                    JOB_FAILED if error else JOB_DONE,
+                    error,
+                    worker,
+                    JOB_LEASED,
+                    *job_ids,
+                ),
+            )
+            self.conn.commit()
+            return cursor.rowcount
+        except sqlite3.Error as e:
+            log(f"❌ Error completing jobs: {e}", "error")
+            raise
+
+    def requeue_expired_jobs(self, stage: Optional[str] = None) -> int:
+        """Put jobs whose lease ran out back to pending."""
+        if self.conn is None:
+            self.connect()
+
+        try:
+            cursor = self.conn.cursor()
+            cursor.execute(
+                """
+                UPDATE jobs SET status = ?, worker = NULL, leaseExpires = NULL
+                WHERE status = ? AND leaseExpires < ?
+                    AND (? IS NULL OR stage = ?)
+            """,
+                (JOB_PENDING, JOB_LEASED, time.time(), stage, stage),
+            )
+            self.conn.commit()
+            if cursor.rowcount:
+                log(f"♻️ Requeued {cursor.rowcount} expired jobs.")
+            return cursor.rowcount
+        except sqlite3.Error as e:
+            log(f"❌ Error requeueing jobs: {e}", "error")
+            raise
+
+    def job_counts(self, stage: str) -> Dict[str, int]:
+        """Number of jobs per status for a stage."""
+        if self.conn is None:
+            self.connect()
+
+        try:
+            cursor = self.conn.cursor()
+            cursor.execute(
+                "SELECT status, COUNT(*) FROM jobs WHERE stage = ? GROUP BY status",
+                (stage,),
+            )
+            return dict(cursor.fetchall())
+        except sqlite3.Error as e:
+            log(f"❌ Error counting jobs: {e}", "error")
+            return {}
+
+    def iter_job_batches(
+        self,
+        stage: str,
+        worker: Optional[str] = None,
+        batch_size: int = 10,
+        lease_seconds: float = 300,
+        before_complete: Optional[
+            Callable[[List[Dict[str, Any]]], Dict[int, str]]
+        ] = None,
+    ) -> Iterator[List[Dict[str, Any]]]:
+        """
+        Yield leased batches until the queue for a stage is drained.
+
+        A batch is marked done when the next one is requested, so if the
+        consumer crashes mid-batch its lease expires and the batch is retried
+        by another worker. Call heartbeat_jobs while working on long batches.
+
+        before_complete(batch) runs before a batch is marked done, e.g. to
+        wait for writes still queued behind the consumer. It returns
+        {job id: error} for the jobs whose work failed, those are marked
+        failed instead.
+        """
+        worker = worker or default_worker_id()
+        while True:
+            batch = self.claim_jobs(stage, worker, batch_size, lease_seconds)
+            if not batch:
+                return
+            yield batch
+            failed = before_complete(batch) if before_complete else {}
+            for job_id, error in failed.items():
+                self.complete_jobs([job_id], worker, error)
+            self.complete_jobs(
+                [job["id"] for job in batch if job["id"] not in failed], worker
+            )
+
+    def create_quarantine_table(self):
+        """
+        Create the 'quarantine' table if it doesn't exist. It records images
+        that blew a stage's time budget or crashed it, so later runs skip
+        them instead of stalling on the same file again.
+        """
+        if self.conn is None:
+            self.connect()
+
+        try:
+            cursor = self.conn.cursor()
+            cursor.execute(
+                """
+                CREATE TABLE IF NOT EXISTS quarantine (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    fileName TEXT NOT NULL,
+                    stage TEXT NOT NULL,
+                    elapsed REAL,
+                    error TEXT,
+                    createdAt TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP,
+                    UNIQUE (fileName, stage)
+                )
+            """
+            )
+            self.conn.commit()
+            log("✅ Table 'quarantine' created successfully.")
+        except sqlite3.Error as e:
+            log(f"❌ Error creating quarantine table: {e}", "error")
+            raise
+
+    @profiled("db")
+    def quarantine(self, file_name: str, stage: str, elapsed: float, error: str):
+        """
+        Record an image that failed a stage.
+
+        Args:
+            file_name: File name (e.g., 'plate_001.jpg')
+            stage: Pipeline stage that failed (e.g., 'detect', 'ocr')
+            elapsed: Seconds spent before the stage gave up
+            error: Timeout or exception message
+        """
+        if self.conn is None:
+            self.connect()
+
+        try:
+            cursor = self.conn.cursor()
+            cursor.execute(
+                """
+                INSERT OR REPLACE INTO quarantine (fileName, stage, elapsed, error)
+                VALUES (?, ?, ?, ?)
+            """,
+                (file_name, stage, elapsed, error),
+            )
+            self.conn.commit()
+            log(f"🚧 Quarantined {file_name} at '{stage}': {error}", "warning")
+        except sqlite3.Error as e:
+            log(f"❌ Error quarantining record: {e}", "error")
+            raise
+
+    @profiled("db")
+    def is_quarantined(self, file_name: str, stage: Optional[str] = None) -> bool:
+        """Check whether an image is quarantined, for any or one stage."""
+        if self.conn is None:
+            self.connect()
+
+        try:
+            cursor = self.conn.cursor()
+            cursor.execute(
+                """
+                SELECT 1 FROM quarantine
+                WHERE fileName = ? AND (? IS NULL OR stage = ?)
+            """,
+                (file_name, stage, stage),
+            )
+            return cursor.fetchone() is not None
+        except sqlite3.Error as e:
+            log(f"❌ Error reading quarantine: {e}", "error")
+            return False
+
+    def get_quarantined(self, stage: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Retrieve quarantined images, slowest first."""
+        if self.conn is None:
+            self.connect()
+
+        try:
+            cursor = self.conn.cursor()
+            cursor.execute(
+                """
+                SELECT * FROM quarantine WHERE (? IS NULL OR stage = ?)
+                ORDER BY elapsed DESC
+            """,
+                (stage, stage),
+            )
             rows = cursor.fetchall()
             headers = [description[0] for description in cursor.description]
             return [dict(zip(headers, row)) for row in rows]
         except sqlite3.Error as e:
-            print(f"❌ Error searching by text: {e}")
+            log(f"❌ Error reading quarantine: {e}", "error")
             return []
 
+    @profiled("db")
+    def update_text(
+        self,
+        file_name: str,
+        text: str,
+        ocr_confidence: Optional[float] = None,
+        ocr_model: Optional[str] = None,
+    ) -> Optional[int]:
+        """
+        Replace the OCR text of an existing record, e.g. after the image was
+        re-uploaded or reprocessed. correctedText is left alone.
+
+        Returns:
+            The record's id, or None if there is no record for file_name
+        """
+        if self.conn is None:
+            self.connect()
+
+        try:
+            cursor = self.conn.cursor()
+            cursor.execute(
+                """
+                UPDATE images
+                SET text = ?, ocrConfidence = ?, ocrModel = ?,
+                    readAt = CURRENT_TIMESTAMP
+                WHERE fileName = ? RETURNING id
+            """,
+                (text, ocr_confidence, ocr_model, file_name),
+            )
+            row = cursor.fetchone()
+            self.conn.commit()
+            if row is None:
+                log(f"⚠️ No record found for {file_name}", "debug")
+                return None
+            log(f"✅ Updated: {file_name}", "debug")
+            return row[0]
+        except sqlite3.Error as e:
+            log(f"❌ Error updating record: {e}", "error")
+            raise
+
     def delete_by_id(self, image_id: int) -> bool:
         """Delete a record by ID."""
         if self.conn is None:
@@ -149,13 +1176,13 @@ class ImageManager:
             cursor = self.conn.cursor()
             cursor.execute("DELETE FROM images WHERE id = ?", (image_id,))
             if cursor.rowcount == 0:
-                print(f"⚠️ No record found with ID {image_id}")
+                log(f"⚠️ No record found with ID {image_id}", "warning")
                 return False
             self.conn.commit()
-            print(f"✅ Deleted record with ID: {image_id}")
+            log(f"✅ Deleted record with ID: {image_id}")
             return True
         except sqlite3.Error as e:
-            print(f"❌ Error deleting record: {e}")
+            log(f"❌ Error deleting record: {e}", "error")
             return False
 
     def backup_database(self, backup_dir="backups", backup_prefix="plates_backup"):
@@ -176,17 +1203,17 @@ class ImageManager:
         try:
             # Copy the database file
             shutil.copy2(self.db_name, backup_path)
-            print(f"✅ Backup created: {backup_path}")
+            log(f"✅ Backup created: {backup_path}")
             return backup_path
         except Exception as e:
-            print(f"❌ Error creating backup: {e}")
+            log(f"❌ Error creating backup: {e}", "error")
             return None
 
     def close(self):
         """Close the database connection."""
         if self.conn:
             self.conn.close()
-            print("🔌 Database connection closed.")
+            log("🔌 Database connection closed.")
 
     def __enter__(self):
         """Support for context manager usage (with statement)."""
@@ -1,29 +1,66 @@
+import time
 import cv2
 import numpy as np
-from ultralytics import YOLO  # type: ignore
 from pathlib import Path
-from typing import Optional
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
 from helpers import (
+    IMAGE_EXTS,
     PointBox,
+    chunked,
     expand_bbox,
     find_largest_textbox,
+    model_version,
     points_to_xyxy,
+    scan_images,
     sort_bbox_corners,
     sort_flat_boxes,
     xyxy_to_points,
 )
+from cropStore import open_store
+from imageCache import get_cache, imread
+from ImageManager import (
+    TIER_DB_FALLBACK,
+    TIER_MISSED,
+    TIER_NO_BOX,
+    TIER_YOLO,
+    ImageManager,
+    default_worker_id,
+)
+from metrics import count, get_metrics, log, log_enabled, span
+from pipelineConfig import get_config
+from profiler import profiled
+from resourceScheduler import stage
+from timeBudget import LatencyRecorder, StageFailed, StageRunner
 
 
 class LicensePlateProcess:
-    def __init__(self, model_path: str):
-        """Initialize the YOLO model once."""
-        print(f"Loading model from: {model_path}")
+    def __init__(self, model_path: Optional[str]):
+        """
+        Initialize the YOLO model once. Without a model_path only the
+        cropping methods are usable and torch is never imported.
+        """
+        self.model_path = model_path
+        self.bounds = dict()
+        self.model = None
+        # Recorded with every detection, so a new model can be told apart
+        self.model_version = None
+        if model_path is None:
+            return
+
+        log(f"Loading model from: {model_path}")
         try:
+            from ultralytics import YOLO  # type: ignore
+
             self.model = YOLO(model_path)
-            self.bounds = dict()
         except Exception as e:
-            print(f"Error loading model: {e}")
+            log(f"Error loading model: {e}", "error")
             self.model = None
+            return
+        try:
+            self.model_version = model_version(model_path)
+        except OSError:
+            # A hub name rather than a local file
+            self.model_version = Path(model_path).name
 
     def four_point_transform(self, image: np.ndarray, pts: np.ndarray) -> np.ndarray:
         """
@@ -61,56 +98,92 @@ class LicensePlateProcess:
 
         return warped
 
-    def detect_plate_bbox(self, read_path: Path) -> dict:
+    @profiled("yolo")
+    def detect_plate_bbox(self, read_path: Path | List[str]) -> dict:
         """
         Runs YOLO to find the license plate. Returns a dictionary mapping image filename
         to {'bbox': [x1, y1, x2, y2], 'confidence': float}.
+
+        read_path is either a folder or a list of image paths.
         """
         if self.model is None:
             return {}
 
         bounds = {}
 
-        # Run YOLO inference
-        mainResults = self.model(
-            str(read_path),
-            imgsz=640,
-            verbose=True,
+        # stream=True runs inference lazily while the results are consumed
+        with stage("yolo"):
+            for image_path, results in self._yolo_results(read_path):
+                # Batched inference, ultralytics reports each image's share
+                speed = results.speed or {}
+                get_metrics().observe(
+                    "yolo",
+                    sum(ms or 0.0 for ms in speed.values()) / 1000,
+                    Path(image_path).name,
+                )
+                if len(results.boxes) == 0:
+                    count("plates_images_total", stage="yolo", result="no_box")
+                    continue
+
+                boxes = results.boxes.xyxy.cpu().numpy()
+                sorted_boxes = sort_flat_boxes(boxes, ascending=False)
+                best_box = sorted_boxes[0]
+
+                # best_box = np.array(sorted_boxes[0], np.int32)
+                index = np.where(boxes == best_box)[0][0]
+                # print(best_box, index)
+                best_conf = results.boxes.conf[index]
+                best_box = np.array(best_box, np.int32)
+                # print(results.boxes.conf)
+
+                if best_box is not None:
+                    img = imread(image_path)
+                    if img is None:
+                        continue
+                    best_point_box = xyxy_to_points(best_box)
+                    bounds[Path(image_path).name] = {
+                        "bbox": best_point_box,
+                        "confidence": float(best_conf),
+                    }
+
+        return bounds
+
+    def _yolo_results(
+        self, read_path: Path | List[str]
+    ) -> Iterator[Tuple[str, object]]:
+        """
+        Yields (image path, YOLO result). Path lists are decoded through the
+        image cache and passed to YOLO as arrays, so crop_plate reuses the
+        same decode instead of reading the file again.
+
+        The cached arrays are shared and read-only: a YOLO step writing
+        into its input would raise ValueError rather than corrupt the
+        cache. Pass a .copy() if one ever needs to.
+        """
+        config = get_config()
+        options = dict(
+            imgsz=config["yolo_imgsz"],
+            verbose=log_enabled("debug"),
             # save=True,
             project="source/images/output",
             name="detections",
             exist_ok=True,
-            batch=10,
+            batch=config["yolo_batch"],
             stream=True,
         )
+        if not isinstance(read_path, list):
+            for results in self.model(str(read_path), **options):
+                yield results.path, results
+            return
 
-        for results in mainResults:
-            if len(results.boxes) == 0:
+        for chunk in chunked(read_path, options["batch"]):
+            decoded = [(path, imread(path)) for path in chunk]
+            decoded = [(path, img) for path, img in decoded if img is not None]
+            if not decoded:
                 continue
-
-            image_path = results.path
-            boxes = results.boxes.xyxy.cpu().numpy()
-            sorted_boxes = sort_flat_boxes(boxes, ascending=False)
-            best_box = sorted_boxes[0]
-
-            # best_box = np.array(sorted_boxes[0], np.int32)
-            index = np.where(boxes == best_box)[0][0]
-            # print(best_box, index)
-            best_conf = results.boxes.conf[index]
-            best_box = np.array(best_box, np.int32)
-            # print(results.boxes.conf)
-
-            if best_box is not None:
-                img = cv2.imread(str(image_path))
-                if img is None:
-                    continue
-                best_point_box = xyxy_to_points(best_box)
-                bounds[Path(image_path).name] = {
-                    "bbox": best_point_box,
-                    "confidence": float(best_conf),
-                }
-
-        return bounds
+            results = self.model([img for _, img in decoded], **options)
+            for (path, _), result in zip(decoded, results):
+                yield path, result
 
     def find_corners_contour_fallback(self, crop_img: np.ndarray) -> Optional[PointBox]:
         """
@@ -138,12 +211,129 @@ class LicensePlateProcess:
             [[x, y], [x + w, y], [x + w, y + h], [x, y + h]], dtype="float32"
         )
 
+    @profiled("crop")
+    def crop_plate(
+        self,
+        img_path: Path,
+        bound: dict,
+        detected_plates_path: Path,
+        missed_plates_path: Path,
+        crop_store: Optional[str] = None,
+    ) -> Optional[str]:
+        """
+        Crops the detected plate out of one image and writes it to
+        detected_plates_path. Low confidence detections fall back to the DB
+        text detector, images where that fails too go to missed_plates_path.
+
+        With crop_store (a CropStore root) the crops are packed into the
+        store under the folder's name instead of written as files.
+
+        Returns:
+            The tier that produced the crop (TIER_YOLO or TIER_DB_FALLBACK),
+            None if the plate was missed
+        """
+        key = img_path.name
+        img = imread(img_path)
+        if img is None:
+            return None
+
+        with span("crop", key):
+            detected = self._crop_decoded(
+                img, key, bound, detected_plates_path, missed_plates_path, crop_store
+            )
+        result = "detected" if detected else "missed"
+        count("plates_images_total", stage="crop", result=result)
+        return detected
+
+    def _crop_decoded(
+        self,
+        img: np.ndarray,
+        key: str,
+        bound: dict,
+        detected_plates_path: Path,
+        missed_plates_path: Path,
+        crop_store: Optional[str] = None,
+    ) -> Optional[str]:
+        """crop_plate on an already decoded image, timed as one 'crop' span."""
+        x1, y1, x2, y2 = points_to_xyxy(
+            expand_bbox(
+                bound["bbox"],
+                img_shape=img.shape,
+                margin=img.shape[1] * 0.1,
+            )
+        )
+        conf = bound["confidence"]
+        output_img = img[y1:y2, x1:x2]
+
+        output_name = key
+        tier = TIER_YOLO
+
+        config = get_config()
+        if conf < config["fallback_confidence"]:
+            tier = TIER_DB_FALLBACK
+            with span("db_fallback", key):
+                best_box = find_largest_textbox(img)
+            if best_box is None:
+                _write_crop(missed_plates_path, key, img, crop_store)
+                return None
+
+            x1, y1, x2, y2 = points_to_xyxy(
+                expand_bbox(best_box, img.shape, img.shape[1] * 0.2)
+            )
+            output_img = img[y1:y2, x1:x2]
+
+        img = output_img
+        imgScale = config["crop_width"] / img.shape[1]
+        img_size = np.array(
+            (
+                imgScale * img.shape[0],
+                (imgScale - 0.1) * img.shape[1],
+            ),
+            dtype=np.int32,
+        )
+        output_img = cv2.resize(output_img, img_size)
+
+        _write_crop(detected_plates_path, output_name, output_img, crop_store)
+        return tier
+
+    @profiled("detect_crop")
     def run(
         self,
         image_folder_path: str | Path,
         output_path: str | Path,
         skip_ok: bool = True,
+        queue: Optional[ImageManager] = None,
+        worker_id: Optional[str] = None,
+        batch_size: int = 10,
+        timeouts: Optional[Dict[str, float]] = None,
+        db: Optional[ImageManager] = None,
+        bounded_memory: bool = False,
+        crop_store: Optional[str | Path] = None,
+        paths: Optional[List[Path]] = None,
     ):
+        """
+        Detects and crops the plate of every image in image_folder_path.
+
+        With a queue, the folder is only used to seed the shared 'detect' jobs
+        and this process works through whatever batches it can lease, so
+        several machines can run against the same database.
+
+        With timeouts (seconds per stage, e.g. {"detect": 30, "crop": 20})
+        every image runs in a worker process. An image that exceeds a budget
+        or crashes is recorded in db's quarantine table (the queue's database
+        by default) and the run continues with the next one.
+
+        With bounded_memory the folder is scanned and detected in chunks, so
+        bounds only ever cover one chunk and memory stays flat.
+
+        With crop_store (a folder) crops are appended to a CropStore pack
+        instead of being written as one file per plate.
+
+        With db, every image's YOLO confidence, box, crop tier and model
+        version are recorded in its 'detections' table. With paths (e.g.
+        from ImageManager.select_for_reprocessing) only those images are
+        processed instead of the whole folder.
+        """
         image_folder = Path(image_folder_path)
         output_path = Path(output_path)
         missed_plates_path = output_path / "missedPlates"
@@ -151,7 +341,7 @@ class LicensePlateProcess:
         sharpened_plates_path = output_path / "sharpenedPlates"
 
         if not image_folder.exists():
-            print(f"File not found: {str(image_folder.absolute())}")
+            log(f"File not found: {str(image_folder.absolute())}", "error")
             return
 
         # if not output_path.exists():
@@ -160,51 +350,227 @@ class LicensePlateProcess:
         missed_plates_path.mkdir(parents=True, exist_ok=True)
         sharpened_plates_path.mkdir(parents=True, exist_ok=True)
 
-        print(f"Processing: {image_folder.name}")
-
-        # 1. Detect Box
-        bounds = self.detect_plate_bbox(image_folder)
-        self.bounds = bounds
+        log(f"Processing: {image_folder.name}")
+        if crop_store is not None:
+            crop_store = str(crop_store)
+
+        latency = LatencyRecorder(max_samples=10_000 if bounded_memory else None)
+        runner = None
+        if timeouts:
+            # Per-image isolation: the model lives in a worker process that
+            # is killed and restarted when an image blows its budget
+            runner = StageRunner(LicensePlateProcess, (self.model_path,))
+            db = db or queue
+            if db is not None:
+                db.create_quarantine_table()
+        if db is not None:
+            db.create_table()
 
+        try:
+            for batch, heartbeat in self._iter_batches(
+                image_folder, queue, worker_id, batch_size, bounded_memory, paths
+            ):
+                if runner is None:
+                    self._detect_and_crop(
+                        batch,
+                        heartbeat,
+                        detected_plates_path,
+                        missed_plates_path,
+                        latency,
+                        db,
+                        crop_store,
+                    )
+                    continue
 
-        # 2. Crop Image
-        for key in self.bounds:
-            img_path = str(image_folder / key)
-            img = cv2.imread(img_path)
+                for i, img_path in enumerate(batch):
+                    self._run_isolated(
+                        runner,
+                        img_path,
+                        timeouts,
+                        detected_plates_path,
+                        missed_plates_path,
+                        latency,
+                        db,
+                        crop_store,
+                    )
+                    heartbeat(i)
+        finally:
+            if runner is not None:
+                runner.close()
+
+        latency.report()
+        get_cache().report()
+
+    def _detect_and_crop(
+        self,
+        batch: List[Path],
+        heartbeat: Callable[[int], None],
+        detected_plates_path: Path,
+        missed_plates_path: Path,
+        latency: LatencyRecorder,
+        db: Optional[ImageManager],
+        crop_store: Optional[str] = None,
+    ):
+        """
+        Detect and crop a batch one YOLO batch at a time. Each chunk is
+        cropped right after it is detected, while its decodes are still in
+        the image cache, instead of after the whole batch was decoded.
+        """
+        offset = 0
+        for chunk in chunked(batch, get_config()["yolo_batch"]):
+            # 1. Detect Box
+            bounds = self.detect_plate_bbox([str(path) for path in chunk])
+            self.bounds = bounds
+
+            for i, img_path in enumerate(chunk, offset):
+                # 2. Crop Image
+                bound = bounds.get(img_path.name)
+                tier = None
+                if bound is not None:
+                    started = time.perf_counter()
+                    tier = self.crop_plate(
+                        img_path,
+                        bound,
+                        detected_plates_path,
+                        missed_plates_path,
+                        crop_store,
+                    )
+                    latency.record("crop", img_path.name, time.perf_counter() - started)
+                self.record_detection(db, img_path.name, bound, tier)
+                heartbeat(i)
+            offset += len(chunk)
+
+    def _iter_batches(
+        self,
+        image_folder: Path,
+        queue: Optional[ImageManager],
+        worker_id: Optional[str],
+        batch_size: int,
+        bounded_memory: bool = False,
+        paths: Optional[List[Path]] = None,
+    ) -> Iterator[Tuple[List[Path], Callable[[int], None]]]:
+        """
+        Yields (image paths, heartbeat) pairs. Without a queue the whole
+        folder is one batch (one scan chunk in bounded-memory mode), otherwise
+        the folder seeds the shared 'detect' jobs and batches are leased from
+        it. heartbeat(i) renews the lease on the images after index i.
 
-            x1, y1, x2, y2 = points_to_xyxy(
-                expand_bbox(
-                    bounds[key]["bbox"],
-                    img_shape=img.shape,
-                    margin=img.shape[1] * 0.1,
+        paths replaces the folder listing, in chunks like a bounded scan.
+        """
+        if paths is not None:
+            chunks = chunked(paths)
+        elif bounded_memory:
+            chunks = scan_images(image_folder)
+        else:
+            chunks = [
+                sorted(
+                    path
+                    for path in image_folder.iterdir()
+                    if path.suffix.lower() in IMAGE_EXTS
                 )
-            )
-            conf = bounds[key]["confidence"]
-            output_img = img[y1:y2, x1:x2]
+            ]
 
-            output_name = key
+        if queue is None:
+            for chunk in chunks:
+                yield chunk, lambda i: None
+            return
 
-            if conf < 0.7:
-                best_box = find_largest_textbox(img)
-                if best_box is None:
-                    cv2.imwrite(str((missed_plates_path / key)), img)
-                    continue
+        queue.create_jobs_table()
+        for chunk in chunks:
+            queue.enqueue_jobs("detect", [str(path) for path in chunk])
+        worker = worker_id or default_worker_id()
 
-                x1, y1, x2, y2 = points_to_xyxy(
-                    expand_bbox(best_box, img.shape, img.shape[1] * 0.2)
-                )
-                output_img = img[y1:y2, x1:x2]
-
-            img = output_img
-            imgScale = 768 / img.shape[1]
-            img_size = np.array(
-                (
-                    imgScale * img.shape[0],
-                    (imgScale - 0.1) * img.shape[1],
-                ),
-                dtype=np.int32,
+        for batch in queue.iter_job_batches("detect", worker, batch_size):
+            job_ids = [job["id"] for job in batch]
+            yield (
+                [Path(job["filePath"]) for job in batch],
+                lambda i: queue.heartbeat_jobs(job_ids[i + 1 :], worker),
+            )
+
+    def _run_isolated(
+        self,
+        runner: StageRunner,
+        img_path: Path,
+        timeouts: Dict[str, float],
+        detected_plates_path: Path,
+        missed_plates_path: Path,
+        latency: LatencyRecorder,
+        db: Optional[ImageManager],
+        crop_store: Optional[str] = None,
+    ):
+        """Detect and crop one image in the worker, quarantining failures."""
+        if db is not None and db.is_quarantined(img_path.name):
+            return
+
+        started = time.perf_counter()
+        try:
+            bounds = runner.call(
+                "detect", _detect_image, str(img_path), timeout=timeouts.get("detect")
             )
-            output_img = cv2.resize(output_img, img_size)
+            latency.record("detect", img_path.name, time.perf_counter() - started)
+
+            bound = bounds.get(img_path.name)
+            tier = None
+            if bound is not None:
+                crop_started = time.perf_counter()
+                tier = runner.call(
+                    "crop",
+                    _crop_image,
+                    img_path,
+                    bound,
+                    detected_plates_path,
+                    missed_plates_path,
+                    crop_store,
+                    timeout=timeouts.get("crop"),
+                )
+                latency.record(
+                    "crop", img_path.name, time.perf_counter() - crop_started
+                )
+            self.record_detection(db, img_path.name, bound, tier)
+        except StageFailed as e:
+            if db is not None:
+                db.quarantine(img_path.name, e.stage, e.elapsed, e.message)
+            else:
+                log(f"🚧 Skipping {img_path.name}: {e}", "warning")
+        latency.record("image", img_path.name, time.perf_counter() - started)
+
+    def record_detection(
+        self,
+        db: Optional[ImageManager],
+        file_name: str,
+        bound: Optional[dict],
+        tier: Optional[str],
+    ):
+        """Store how file_name's crop was made, if there is a database."""
+        if db is None:
+            return
+        if bound is None:
+            db.record_detection(file_name, TIER_NO_BOX, model=self.model_version)
+            return
+        db.record_detection(
+            file_name,
+            tier or TIER_MISSED,
+            bound["confidence"],
+            bound["bbox"],
+            self.model_version,
+        )
+
+
+def _write_crop(
+    folder: Path, name: str, img: np.ndarray, crop_store: Optional[str] = None
+):
+    """Save a crop as folder/name, or pack it under folder's name."""
+    if crop_store is None:
+        cv2.imwrite(str(folder / name), img)
+    else:
+        open_store(crop_store).put_image(folder.name, name, img)
+
+
+def _detect_image(processor: LicensePlateProcess, image_path: str) -> dict:
+    """Stage function run in the StageRunner worker."""
+    return processor.detect_plate_bbox([image_path])
 
-            cv2.imwrite(detected_plates_path / output_name, output_img)
 
+def _crop_image(processor: LicensePlateProcess, *args) -> Optional[str]:
+    """Stage function run in the StageRunner worker."""
+    return processor.crop_plate(*args)
@@ -0,0 +1,9 @@
+"""
+Benchmarks for the plate pipeline. Run from the parsePlates folder, e.g.
+
+    python -m benchmarks.memory
+    python -m benchmarks.stages --count 200 --output bench.json
+    python -m benchmarks.accuracy --sample 200 --save-baseline
+    python -m benchmarks.fuzzy
+    python -m benchmarks.hotloops --count 500
+"""
@@ -0,0 +1,245 @@
+"""
+Accuracy and throughput regression check against hand-corrected plates.
+
+Rows of plates.db with a correctedText are the labelled set. A seeded
+sample of them is replayed through detect -> crop -> OCR with the current
+settings (model, crop store, PLATES_* env) in a scratch folder, the real
+database and output folders are never written. The report has:
+
+    cer             character error rate over the normalized texts
+    exact_match     share of plates read exactly right
+    recall          share of images where a plate was detected and cropped
+    images_per_sec  replay throughput, model loading excluded
+    stages          per-stage mean / p95 from the pipeline's metrics
+
+--save-baseline stores the report. Later runs replay the baseline's
+images and exit 1 if CER, exact match or recall got worse than the
+tolerances allow, so a speed-up (quantization, smaller decodes, batching)
+has to show it didn't cost accuracy. --stored scores the text already in
+the database instead of replaying, which needs no models.
+
+    python -m benchmarks.accuracy --sample 200 --save-baseline
+    python -m benchmarks.accuracy            # after a change
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from ImageManager import ImageManager
+from metrics import get_metrics
+from plateIndex import normalize
+
+DB_NAME = "source/images/plates.db"
+INPUT_FOLDER = "source/images/input"
+MODEL_PATH = "source/license-plate-finetune-v1x.pt"
+BASELINE_PATH = "source/accuracy-baseline.json"
+
+
+def edit_distance(a: str, b: str) -> int:
+    """Levenshtein distance, one row at a time."""
+    if len(a) < len(b):
+        a, b = b, a
+    previous = list(range(len(b) + 1))
+    for i, ca in enumerate(a, start=1):
+        current = [i]
+        for j, cb in enumerate(b, start=1):
+            current.append(
+                min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (ca != cb))
+            )
+        previous = current
+    return previous[-1]
+
+
+def score(rows: List[dict], predictions: Dict[str, Optional[str]]) -> dict:
+    """
+    CER, exact match and recall of predictions (fileName -> text, None when
+    no plate was found) against the rows' correctedText.
+    """
+    errors = chars = exact = detected = 0
+    for row in rows:
+        truth = normalize(row["correctedText"])
+        predicted = predictions.get(row["fileName"])
+        if predicted is not None:
+            detected += 1
+        predicted = normalize(predicted)
+        errors += edit_distance(predicted, truth)
+        chars += len(truth)
+        exact += predicted == truth
+    total = len(rows)
+    return {
+        "images": total,
+        "cer": errors / chars if chars else 0.0,
+        "exact_match": exact / total if total else 0.0,
+        "recall": detected / total if total else 0.0,
+    }
+
+
+def sample_rows(rows: List[dict], size: Optional[int], seed: int) -> List[dict]:
+    if size is None or size >= len(rows):
+        return rows
+    return sorted(random.Random(seed).sample(rows, size), key=lambda row: row["id"])
+
+
+def load_models(model_path: str):
+    """The YOLO processor and the OCR pipeline, loaded once for every replay."""
+    from LicensePlateProcess import LicensePlateProcess
+    from readPlates import _create_ocr
+
+    processor = LicensePlateProcess(model_path=model_path)
+    if processor.model is None:
+        sys.exit(f"❌ Could not load {model_path}")
+    return processor, _create_ocr()
+
+
+def replay(
+    rows: List[dict],
+    input_folder: Path,
+    scratch: Path,
+    models,
+    crop_store: bool = False,
+) -> Tuple[Dict[str, Optional[str]], float]:
+    """
+    Run detect, crop and OCR over the rows' images with the current pipeline
+    config. Returns fileName -> text and the seconds it took.
+    """
+    from cropStore import open_store
+    from readPlates import _ocr_plate
+
+    processor, ocr = models
+    # The pipeline works on folders, link just the sampled images into one
+    images = scratch / "input"
+    images.mkdir()
+    for row in rows:
+        name = row["fileName"]
+        os.symlink((input_folder / name).absolute(), images / name)
+    output = scratch / "output"
+    store = str(output / "crops") if crop_store else None
+
+    started = time.perf_counter()
+    processor.run(images, output, crop_store=store)
+    detected = output / "detectedPlates"
+    reads = output / "reads"
+    predictions = {}
+    for row in rows:
+        name = row["fileName"]
+        found = (
+            (detected.name, name) in open_store(store)
+            if store
+            else (detected / name).exists()
+        )
+        if not found:
+            predictions[name] = None
+            continue
+        texts = _ocr_plate(ocr, detected / name, reads, store)
+        predictions[name] = texts[0][0] if texts else ""
+    return predictions, time.perf_counter() - started
+
+
+def stage_latencies() -> Dict[str, dict]:
+    return {
+        stage: {
+            "count": info["count"],
+            "mean_ms": round(info["mean"] * 1000, 3),
+            "p95_ms": round(info["p95"] * 1000, 3),
+        }
+        for stage, info in get_metrics().summary()["stages"].items()
+    }
+
+
+def compare(report: dict, baseline: dict, args) -> List[str]:
+    """Regressions of report against baseline beyond the tolerances."""
+    failures = []
+    if report["cer"] > baseline["cer"] + args.max_cer_increase:
+        failures.append(f"CER {baseline['cer']:.4f} -> {report['cer']:.4f}")
+    for key, tolerance in (
+        ("exact_match", args.max_exact_drop),
+        ("recall", args.max_recall_drop),
+    ):
+        if report[key] < baseline[key] - tolerance:
+            failures.append(f"{key} {baseline[key]:.4f} -> {report[key]:.4f}")
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--db", default=DB_NAME)
+    parser.add_argument("--input", type=Path, default=Path(INPUT_FOLDER))
+    parser.add_argument("--model", default=MODEL_PATH)
+    parser.add_argument("--sample", type=int, help="Labelled images to replay")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--crop-store", action="store_true")
+    parser.add_argument(
+        "--stored", action="store_true", help="Score the text already in the db"
+    )
+    parser.add_argument("--baseline", type=Path, default=Path(BASELINE_PATH))
+    parser.add_argument("--save-baseline", action="store_true")
+    parser.add_argument("--max-cer-increase", type=float, default=0.005)
+    parser.add_argument("--max-exact-drop", type=float, default=0.01)
+    parser.add_argument("--max-recall-drop", type=float, default=0.01)
+    args = parser.parse_args()
+
+    with ImageManager(args.db) as db:
+        labeled = db.get_labeled()
+    if not labeled:
+        sys.exit(f"❌ No rows with correctedText in {args.db}")
+
+    baseline = None
+    if args.baseline.exists() and not args.save_baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+    if baseline is not None and args.sample is None:
+        # Same images as the baseline, or the numbers aren't comparable
+        names = set(baseline["files"])
+        rows = [row for row in labeled if row["fileName"] in names]
+    else:
+        rows = sample_rows(labeled, args.sample, args.seed)
+    if not args.stored:
+        rows = [row for row in rows if (args.input / row["fileName"]).exists()]
+    if not rows:
+        sys.exit("❌ None of the sampled images are available")
+
+    if args.stored:
+        predictions = {row["fileName"]: row["text"] for row in rows}
+        elapsed = None
+    else:
+        with tempfile.TemporaryDirectory() as tmp:
+            predictions, elapsed = replay(
+                rows, args.input, Path(tmp), load_models(args.model), args.crop_store
+            )
+
+    report = {
+        "mode": "stored" if args.stored else "replay",
+        **score(rows, predictions),
+        "images_per_sec": round(len(rows) / elapsed, 2) if elapsed else None,
+        "stages": stage_latencies(),
+        "files": [row["fileName"] for row in rows],
+    }
+    failures = []
+    if baseline is not None:
+        failures = compare(report, baseline, args)
+        if baseline.get("images_per_sec") and report["images_per_sec"]:
+            report["speedup"] = round(
+                report["images_per_sec"] / baseline["images_per_sec"], 3
+            )
+        report["regressions"] = failures
+
+    print(json.dumps({k: v for k, v in report.items() if k != "files"}, indent=4))
+    if args.save_baseline:
+        args.baseline.parent.mkdir(parents=True, exist_ok=True)
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=4)
+        print(f"✅ Saved baseline of {len(rows)} images to {args.baseline}")
+    if failures:
+        print(f"❌ Accuracy regressed: {'; '.join(failures)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
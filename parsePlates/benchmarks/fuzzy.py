@@ -0,0 +1,111 @@
+"""
+Lookup latency of the PlateIndex at realistic sizes.
+
+Indexes random corrected plates (a tenth of them first misread by the
+OCR), then looks up reads with one or two OCR-style confusions plus
+unseen plates. It checks
+a sample of the answers against a brute-force scan, and fails if p95
+lookup latency exceeds MAX_P95_MS.
+
+    python -m benchmarks.fuzzy --sizes 10000 100000
+"""
+
+import argparse
+import json
+import random
+import statistics
+import string
+import sys
+import time
+
+from plateIndex import PlateIndex, bounded_distance, normalize
+
+MAX_P95_MS = 1.0
+CONFUSIONS = {"O": "0", "0": "O", "I": "1", "1": "I", "B": "8", "8": "B", "S": "5"}
+
+
+def random_plate(rng: random.Random) -> str:
+    letters = "".join(rng.choices(string.ascii_uppercase, k=3))
+    digits = "".join(rng.choices(string.digits, k=rng.choice((3, 4))))
+    return f"{letters} {digits}"
+
+
+def misread(plate: str, rng: random.Random, edits: int) -> str:
+    chars = list(plate)
+    for _ in range(edits):
+        i = rng.randrange(len(chars))
+        if chars[i] == " ":
+            continue
+        chars[i] = CONFUSIONS.get(chars[i], rng.choice(string.ascii_uppercase))
+    return "".join(chars)
+
+
+def brute_force(index: PlateIndex, text: str) -> int | None:
+    key = normalize(text)
+    distances = [
+        bounded_distance(key, other, index.max_distance) for other in index.keys
+    ]
+    best = min(distances, default=index.max_distance + 1)
+    return best if best <= index.max_distance else None
+
+
+def measure(size: int, lookups: int, seed: int) -> dict:
+    rng = random.Random(seed)
+    plates = [random_plate(rng) for _ in range(size)]
+    started = time.perf_counter()
+    index = PlateIndex()
+    for plate in plates:
+        text = misread(plate, rng, 1) if rng.random() < 0.1 else plate
+        index.add(text, plate)
+    build = time.perf_counter() - started
+
+    queries = [
+        misread(rng.choice(plates), rng, rng.choice((1, 2))) for _ in range(lookups)
+    ]
+    queries += [random_plate(rng) for _ in range(lookups // 4)]
+    latencies = []
+    found = 0
+    for query in queries:
+        started = time.perf_counter()
+        suggestion = index.suggest(query)
+        latencies.append(time.perf_counter() - started)
+        found += suggestion is not None
+
+    wrong = 0
+    for query in queries[:: max(1, len(queries) // 50)]:
+        suggestion = index.suggest(query)
+        expected = brute_force(index, query)
+        wrong += (suggestion and suggestion["distance"]) != expected and not (
+            suggestion is None and expected is None
+        )
+
+    latencies.sort()
+    return {
+        "size": size,
+        "entries": len(index),
+        "build_seconds": round(build, 3),
+        "lookups": len(queries),
+        "found": found,
+        "p50_ms": round(statistics.median(latencies) * 1000, 4),
+        "p95_ms": round(latencies[int(len(latencies) * 0.95)] * 1000, 4),
+        "max_ms": round(latencies[-1] * 1000, 4),
+        "mismatches": wrong,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000])
+    parser.add_argument("--lookups", type=int, default=2000)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    results = [measure(size, args.lookups, args.seed) for size in args.sizes]
+    ok = all(r["p95_ms"] <= MAX_P95_MS and not r["mismatches"] for r in results)
+    print(json.dumps({"results": results, "ok": ok}, indent=4))
+    if not ok:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,220 @@
+"""
+Time and allocations per image of the recognize_text and read_text inner
+loops, before and after they were reworked around views and indices.
+
+The before side is the old loop body, kept here verbatim apart from
+returning instead of writing. Neither side runs a model: the DB detector
+is a fixed box (failing on --fallback of the images, so the Otsu path is
+exercised) and OCR results are synthetic, so only the per-image array and
+Python work is measured. Allocations are the tracemalloc peak above the
+loop's baseline, numpy and OpenCV outputs included.
+
+    python -m benchmarks.hotloops --count 500
+"""
+
+import argparse
+import json
+import random
+import statistics
+import time
+import tracemalloc
+from typing import Callable, List
+
+import cv2
+import numpy as np
+
+import metrics
+from benchmarks.synthetic import random_text, render_plate
+from helpers import (
+    expand_bbox,
+    group_boxes_by_height,
+    points_to_xyxy,
+    xyxy_to_points,
+)
+from pipelineConfig import get_config
+from readPlates import Scratch, _plate_text, _preprocess_plate
+
+IMG_SIZE = 768
+
+
+class FixedDetector:
+    """A text box in the middle of the plate, or None for a failing image."""
+
+    def __init__(self):
+        self.fail = False
+
+    def __call__(self, img: np.ndarray):
+        if self.fail:
+            # Only the first try fails, the Otsu retry finds the box
+            self.fail = False
+            return None
+        h, w = img.shape[:2]
+        x1, y1, x2, y2 = w // 8, h // 3, w * 7 // 8, h * 5 // 6
+        return np.array([[x1, y1], [x2, y1], [x2, y2], [x1, y2]], dtype=np.int32)
+
+
+def legacy_preprocess(img: np.ndarray, detect) -> np.ndarray:
+    im_bw = cv2.threshold(img, 155, 255, cv2.THRESH_BINARY | cv2.THRESH_OTSU)[1]
+    largest_box = detect(cv2.cvtColor(img, cv2.COLOR_GRAY2BGR))
+    if largest_box is None:
+        largest_box = detect(cv2.cvtColor(im_bw, cv2.COLOR_GRAY2BGR))
+        img = im_bw
+        if largest_box is None:
+            return None
+    x1 = int(min(largest_box[:, 0]))
+    y1 = int(min(largest_box[:, 1]))
+    x2 = int(max(largest_box[:, 0]))
+    y2 = int(max(largest_box[:, 1]))
+    bbox = [x1, y1, x2, y2]
+    expanded_bbox = expand_bbox(
+        xyxy_to_points(bbox), img.shape, margin=int(IMG_SIZE * 0.2)
+    )
+    x1, y1, x2, y2 = points_to_xyxy(expanded_bbox)
+    plate_crop = img[y1:y2, x1:x2]
+    plate_crop = cv2.GaussianBlur(plate_crop, (5, 5), 0)
+    plate_crop = cv2.cvtColor(plate_crop, cv2.COLOR_GRAY2BGR)
+    return plate_crop
+
+
+def legacy_plate_text(res):
+    plate_text = ""
+    if res and len(res["rec_boxes"]) > 0:
+        sorted_by_area = sorted(
+            res["rec_boxes"],
+            key=lambda b: (int(b[2]) - int(b[0])) * int((b[3]) - int(b[1])),
+            reverse=True,
+        )
+        boxes = group_boxes_by_height(
+            sorted_by_area, rel_tol=get_config()["ocr_rel_tol"]
+        )[0]
+        boxes.sort(key=lambda box: box[0] + box[2])
+        confidence = 1.0
+        for box in boxes:
+            index = np.where(res["rec_boxes"] == box)[0][0]
+            plate_text += res["rec_texts"][index] + " "
+            confidence = min(confidence, float(res["rec_scores"][index]))
+        return plate_text.rstrip().lstrip(), confidence
+    return None
+
+
+def plates(count: int, seed: int) -> List[np.ndarray]:
+    rng = random.Random(seed)
+    return [
+        cv2.cvtColor(render_plate(random_text(rng), rng), cv2.COLOR_BGR2GRAY)
+        for _ in range(count)
+    ]
+
+
+def ocr_results(count: int, seed: int) -> List[dict]:
+    """Paddle-shaped results: a tall plate line split in 1-3 boxes plus small text."""
+    rng = random.Random(seed)
+    results = []
+    for _ in range(count):
+        boxes, texts = [], []
+        x = rng.randint(10, 40)
+        for _ in range(rng.randint(1, 3)):
+            w = rng.randint(120, 220)
+            boxes.append([x, 90, x + w, 90 + rng.randint(110, 125)])
+            texts.append(random_text(rng)[:4])
+            x += w + rng.randint(10, 30)
+        for _ in range(rng.randint(2, 6)):
+            x = rng.randint(0, 400)
+            y = rng.randint(0, 60)
+            boxes.append([x, y, x + rng.randint(40, 120), y + rng.randint(15, 30)])
+            texts.append("state")
+        order = rng.sample(range(len(boxes)), len(boxes))
+        results.append(
+            {
+                "rec_boxes": np.array([boxes[i] for i in order], dtype=np.int16),
+                "rec_texts": [texts[i] for i in order],
+                "rec_scores": np.array([rng.uniform(0.6, 1.0) for _ in order]),
+            }
+        )
+    return results
+
+
+def measure(items: list, work: Callable, before_each: Callable = None) -> dict:
+    """Per-item wall time and tracemalloc peak above the starting point."""
+    work(items[0])  # warm-up, first calls allocate lazily
+    times, peaks = [], []
+    tracemalloc.start()
+    try:
+        for i, item in enumerate(items):
+            if before_each is not None:
+                before_each(i)
+            baseline = tracemalloc.get_traced_memory()[0]
+            tracemalloc.reset_peak()
+            started = time.perf_counter()
+            work(item)
+            times.append(time.perf_counter() - started)
+            peaks.append(tracemalloc.get_traced_memory()[1] - baseline)
+    finally:
+        tracemalloc.stop()
+    times.sort()
+    return {
+        "mean_us": round(statistics.fmean(times) * 1e6, 2),
+        "p95_us": round(times[int(len(times) * 0.95)] * 1e6, 2),
+        "peak_alloc_kb": round(statistics.fmean(peaks) / 1024, 2),
+    }
+
+
+def compare(before: dict, after: dict) -> dict:
+    return {
+        "before": before,
+        "after": after,
+        "speedup": round(before["mean_us"] / after["mean_us"], 2),
+        "alloc_ratio": round(after["peak_alloc_kb"] / before["peak_alloc_kb"], 3)
+        if before["peak_alloc_kb"]
+        else None,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--count", type=int, default=500)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument(
+        "--fallback", type=float, default=0.1, help="Share of images on the Otsu path"
+    )
+    args = parser.parse_args()
+    # The fallback path logs every image at debug level
+    metrics.set_log_level("info")
+
+    images = plates(args.count, args.seed)
+    fails = set(
+        random.Random(args.seed).sample(
+            range(args.count), int(args.count * args.fallback)
+        )
+    )
+    detect = FixedDetector()
+
+    def set_fail(i: int):
+        detect.fail = i in fails
+
+    # tests/test_readPlates.py checks both sides give the same crops
+    scratch = Scratch()
+    results = ocr_results(args.count, args.seed)
+    mismatches = sum(_plate_text(res) != legacy_plate_text(res) for res in results)
+
+    report = {
+        "count": args.count,
+        "recognize_text": compare(
+            measure(images, lambda img: legacy_preprocess(img, detect), set_fail),
+            measure(
+                images,
+                lambda img: _preprocess_plate(img, scratch, detect=detect),
+                set_fail,
+            ),
+        ),
+        "read_text": compare(
+            measure(results, legacy_plate_text), measure(results, _plate_text)
+        ),
+        # The old per-box np.where matched any equal coordinate, not the
+        # whole box, so it can pick another box's text
+        "read_text_mismatches": mismatches,
+    }
+    print(json.dumps(report, indent=4))
+
+
+if __name__ == "__main__":
+    main()
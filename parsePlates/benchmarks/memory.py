@@ -0,0 +1,120 @@
+"""
+Peak RSS of read_text as the input folder grows, with and without
+bounded_memory.
+
+Both modes run the real read_text over synthetic folders against a scratch
+database: the default path (sorted listing of the folder, toReturn, the
+results.json compaction) and the bounded-memory path (chunked os.scandir,
+appended results.jsonl, sampled latencies). OCR is replaced by a fixed
+string so only the per-image bookkeeping is measured.
+
+    python -m benchmarks.memory --sizes 10000 100000
+"""
+
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import metrics
+import readPlates
+
+# Allowed peak RSS growth of the bounded path between the smallest and the
+# largest folder before the benchmark fails
+FLAT_TOLERANCE_KB = 8 * 1024
+
+
+def make_corpus(folder: Path, count: int):
+    """Create count empty plate images, the stubbed OCR never decodes them."""
+    folder.mkdir(parents=True, exist_ok=True)
+    for i in range(1, count + 1):
+        (folder / f"plate{i}.jpg").touch()
+
+
+def fake_ocr(ocr, image_path: Path, reads_path: Path, crop_store=None):
+    """_ocr_plate without a model: one read per crop."""
+    return [(f"PLATE {image_path.stem.upper()}", str(image_path), 1.0)]
+
+
+def stub_read_text(workdir: Path):
+    """Point read_text's database and results at workdir, OCR at fake_ocr."""
+    os.chdir(workdir)
+    readPlates.DB_NAME = str(workdir / "plates.db")
+    readPlates.RESULTS_PATH = str(workdir / "results.json")
+    readPlates.RESULTS_LOG_PATH = str(workdir / "results.jsonl")
+    readPlates._create_ocr = lambda: None
+    readPlates._ocr_plate = fake_ocr
+
+
+def measure(mode: str, folder: Path) -> dict:
+    """Run one mode in this process and report its peak RSS growth."""
+    metrics.set_log_level("warning")
+    workdir = folder.parent / mode
+    workdir.mkdir()
+    stub_read_text(workdir)
+    baseline_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    started = time.perf_counter()
+    readPlates.read_text(folder, bounded_memory=mode == "bounded")
+    elapsed = time.perf_counter() - started
+    peak_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    images = sum(1 for _ in open(readPlates.RESULTS_LOG_PATH, encoding="utf-8"))
+    return {
+        "mode": mode,
+        "images": images,
+        "seconds": round(elapsed, 3),
+        "images_per_sec": round(images / elapsed, 1) if elapsed else None,
+        "peak_rss_growth_kb": peak_kb - baseline_kb,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000])
+    parser.add_argument("--modes", nargs="+", default=["default", "bounded"])
+    parser.add_argument("--child", nargs=2, metavar=("MODE", "FOLDER"))
+    args = parser.parse_args()
+
+    if args.child:
+        # Each measurement runs in a fresh interpreter so peaks don't carry over
+        print(json.dumps(measure(args.child[0], Path(args.child[1]))))
+        return
+
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for size in sorted(args.sizes):
+            folder = Path(tmp) / str(size) / "detectedPlates"
+            make_corpus(folder, size)
+            for mode in args.modes:
+                output = subprocess.run(
+                    [sys.executable, "-m", "benchmarks.memory", "--child", mode, str(folder)],
+                    check=True,
+                    capture_output=True,
+                    text=True,
+                ).stdout
+                result = json.loads(output.strip().splitlines()[-1])
+                result["size"] = size
+                results.append(result)
+
+    bounded = [r for r in results if r["mode"] == "bounded"]
+    growth = (
+        bounded[-1]["peak_rss_growth_kb"] - bounded[0]["peak_rss_growth_kb"]
+        if len(bounded) > 1
+        else 0
+    )
+    summary = {
+        "results": results,
+        "bounded_growth_kb": growth,
+        "flat": growth <= FLAT_TOLERANCE_KB,
+    }
+    print(json.dumps(summary, indent=4))
+    if not summary["flat"]:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
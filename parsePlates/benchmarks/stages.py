@@ -0,0 +1,313 @@
+"""
+Stage-level benchmarks over a synthetic plate corpus.
+
+Renders (or reuses) a corpus from benchmarks.synthetic, then times every
+stage in its own fresh interpreter so peak RSS is per stage:
+
+    find_largest_textbox   DB text detector on the full photo
+    detect_plate_bbox      YOLO, in batches of 10 like run()
+    crop                   the crop loop of run() over the labelled bounds
+    group_boxes_by_height  grouping of OCR-like text boxes, as _ocr_plate does
+    merge_lines            merging of broken plate edge segments
+    db_insert              ImageManager.insert into a scratch database
+    db_write_behind        the same rows through dbWriter, put() plus the flush
+    ocr                    _ocr_plate on the crops
+    end_to_end             run() then OCR + insert of every crop
+
+Stages whose model or framework is missing (no ONNX file, no ultralytics,
+no paddlex) are reported as skipped instead of failing the run. The JSON
+report has images/sec, p50/p95 latency and peak RSS per stage plus the
+git commit, so two reports can be diffed between commits.
+
+    python -m benchmarks.stages --count 200 --output bench.json
+    python -m benchmarks.stages --corpus /tmp/plates --stages crop db_insert
+"""
+
+import argparse
+import json
+import random
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Callable, Dict, List
+
+import numpy as np
+
+from benchmarks.synthetic import edge_segments, generate, load_labels, text_boxes
+
+PARSE_PLATES = Path(__file__).resolve().parent.parent
+MODEL_PATH = "source/license-plate-finetune-v1x.pt"
+DB_MODEL_PATH = "source/DB_TD500_resnet50.onnx"
+YOLO_BATCH = 10
+
+
+class StageUnavailable(Exception):
+    """The stage's model or framework isn't installed here."""
+
+
+def _require(module: str):
+    try:
+        __import__(module)
+    except ImportError as e:
+        raise StageUnavailable(f"{module} is not installed ({e})")
+
+
+def _require_file(path: str):
+    if not Path(path).exists():
+        raise StageUnavailable(f"{path} not found")
+
+
+def _processor(model_path: str | None):
+    from LicensePlateProcess import LicensePlateProcess
+
+    processor = LicensePlateProcess(model_path=model_path)
+    if model_path is not None and processor.model is None:
+        raise StageUnavailable(f"could not load {model_path}")
+    return processor
+
+
+def _timed(items, fn: Callable) -> List[float]:
+    latencies = []
+    for item in items:
+        started = time.perf_counter()
+        fn(item)
+        latencies.append(time.perf_counter() - started)
+    return latencies
+
+
+def _crop_all(processor, corpus: Path, labels: dict, output: Path) -> List[float]:
+    detected = output / "detectedPlates"
+    missed = output / "missedPlates"
+    detected.mkdir(parents=True, exist_ok=True)
+    missed.mkdir(parents=True, exist_ok=True)
+    return _timed(
+        labels.items(),
+        lambda item: processor.crop_plate(corpus / item[0], item[1], detected, missed),
+    )
+
+
+def bench_find_largest_textbox(corpus: Path, labels: dict, scratch: Path):
+    _require_file(DB_MODEL_PATH)
+    import cv2
+    from helpers import find_largest_textbox
+
+    images = [cv2.imread(str(corpus / name)) for name in labels]
+    find_largest_textbox(images[0])  # load the network outside the timings
+    return _timed(images, find_largest_textbox)
+
+
+def bench_detect_plate_bbox(corpus: Path, labels: dict, scratch: Path):
+    _require("ultralytics")
+    _require_file(MODEL_PATH)
+    processor = _processor(MODEL_PATH)
+    paths = [str(corpus / name) for name in labels]
+    processor.detect_plate_bbox(paths[:1])  # warm up
+    latencies = []
+    for i in range(0, len(paths), YOLO_BATCH):
+        batch = paths[i : i + YOLO_BATCH]
+        started = time.perf_counter()
+        processor.detect_plate_bbox(batch)
+        latencies += [(time.perf_counter() - started) / len(batch)] * len(batch)
+    return latencies
+
+
+def bench_crop(corpus: Path, labels: dict, scratch: Path):
+    return _crop_all(_processor(None), corpus, labels, scratch)
+
+
+def bench_group_boxes_by_height(corpus: Path, labels: dict, scratch: Path):
+    from helpers import group_boxes_by_height
+
+    rng = random.Random(0)
+    inputs = [
+        sorted(
+            text_boxes(label, rng),
+            key=lambda b: (b[2] - b[0]) * (b[3] - b[1]),
+            reverse=True,
+        )
+        for label in labels.values()
+    ]
+    return _timed(inputs, lambda boxes: group_boxes_by_height(boxes, rel_tol=0.2))
+
+
+def bench_merge_lines(corpus: Path, labels: dict, scratch: Path):
+    from helpers import merge_lines
+
+    rng = random.Random(0)
+    inputs = [edge_segments(label, rng) for label in labels.values()]
+    return _timed(inputs, lambda lines: merge_lines(lines, tolerance=5))
+
+
+def bench_db_insert(corpus: Path, labels: dict, scratch: Path):
+    from ImageManager import ImageManager
+
+    with ImageManager(str(scratch / "bench.db")) as db:
+        db.create_table()
+        return _timed(
+            labels.items(), lambda item: db.insert(item[1]["text"], item[0])
+        )
+
+
+def bench_db_write_behind(corpus: Path, labels: dict, scratch: Path):
+    from dbWriter import WriteBehindWriter
+    from ImageManager import ImageManager
+
+    with ImageManager(str(scratch / "bench.db")) as db:
+        db.create_table()
+    with WriteBehindWriter(str(scratch / "bench.db")) as writer:
+        latencies = _timed(
+            labels.items(), lambda item: writer.put(item[1]["text"], item[0])
+        )
+        started = time.perf_counter()
+        writer.flush()
+        # What the pipeline waits for at the end counts too
+        latencies[-1] += time.perf_counter() - started
+    return latencies
+
+
+def _ocr_all(crops: Path, scratch: Path, db=None) -> List[float]:
+    from readPlates import _create_ocr, _ocr_plate
+
+    ocr = _create_ocr()
+    reads_path = scratch / "reads"
+    reads_path.mkdir(parents=True, exist_ok=True)
+
+    def read(image_path: Path):
+        for text, _, _ in _ocr_plate(ocr, image_path, reads_path):
+            if db is not None:
+                db.insert(text, image_path.name)
+
+    crop_paths = sorted(crops.glob("*.jpg"))
+    if crop_paths:
+        read(crop_paths[0])  # model warm-up
+    return _timed(crop_paths, read)
+
+
+def bench_ocr(corpus: Path, labels: dict, scratch: Path):
+    _require("paddlex")
+    _crop_all(_processor(None), corpus, labels, scratch)
+    return _ocr_all(scratch / "detectedPlates", scratch)
+
+
+def bench_end_to_end(corpus: Path, labels: dict, scratch: Path):
+    _require("ultralytics")
+    _require("paddlex")
+    _require_file(MODEL_PATH)
+    from ImageManager import ImageManager
+
+    processor = _processor(MODEL_PATH)
+    started = time.perf_counter()
+    processor.run(corpus, scratch)
+    with ImageManager(str(scratch / "bench.db")) as db:
+        db.create_table()
+        _ocr_all(scratch / "detectedPlates", scratch, db)
+    per_image = (time.perf_counter() - started) / len(labels)
+    return [per_image] * len(labels)
+
+
+STAGES: Dict[str, Callable] = {
+    "find_largest_textbox": bench_find_largest_textbox,
+    "detect_plate_bbox": bench_detect_plate_bbox,
+    "crop": bench_crop,
+    "group_boxes_by_height": bench_group_boxes_by_height,
+    "merge_lines": bench_merge_lines,
+    "db_insert": bench_db_insert,
+    "db_write_behind": bench_db_write_behind,
+    "ocr": bench_ocr,
+    "end_to_end": bench_end_to_end,
+}
+
+
+def measure(name: str, corpus: Path) -> dict:
+    """Run one stage in this process, in a scratch folder next to nothing real."""
+    labels = load_labels(corpus)
+    with tempfile.TemporaryDirectory() as tmp:
+        try:
+            started = time.perf_counter()
+            latencies = STAGES[name](corpus, labels, Path(tmp))
+            elapsed = time.perf_counter() - started
+        except StageUnavailable as e:
+            return {"stage": name, "skipped": str(e)}
+    peak_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    timed = sum(latencies)
+    return {
+        "stage": name,
+        "images": len(latencies),
+        "seconds": round(timed, 4),
+        # Model loading and warm-up are in wall_seconds only
+        "wall_seconds": round(elapsed, 3),
+        "images_per_sec": round(len(latencies) / timed, 2) if timed else None,
+        "p50_ms": round(float(np.percentile(latencies, 50)) * 1000, 3),
+        "p95_ms": round(float(np.percentile(latencies, 95)) * 1000, 3),
+        "peak_rss_mb": round(peak_kb / 1024, 1),
+    }
+
+
+def git_commit() -> str | None:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=PARSE_PLATES,
+            check=True,
+            capture_output=True,
+            text=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--count", type=int, default=100)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument(
+        "--corpus", type=Path, help="Reuse a corpus written by benchmarks.synthetic"
+    )
+    parser.add_argument("--stages", nargs="+", choices=STAGES, default=list(STAGES))
+    parser.add_argument("--output", type=Path, help="Also write the report here")
+    parser.add_argument("--child", nargs=2, metavar=("STAGE", "CORPUS"))
+    args = parser.parse_args()
+
+    if args.child:
+        # Each stage runs in a fresh interpreter so peaks don't carry over
+        print(json.dumps(measure(args.child[0], Path(args.child[1]))))
+        return
+
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        corpus = args.corpus
+        if corpus is None:
+            corpus = Path(tmp) / "corpus"
+            generate(corpus, args.count, args.seed)
+        for name in args.stages:
+            output = subprocess.run(
+                [
+                    *(sys.executable, "-m", "benchmarks.stages"),
+                    *("--child", name, str(corpus)),
+                ],
+                check=True,
+                capture_output=True,
+                text=True,
+            ).stdout
+            result = json.loads(output.strip().splitlines()[-1])
+            results.append(result)
+            print(f"⏱️ {name}: {result.get('skipped') or result}", file=sys.stderr)
+        images = len(load_labels(corpus))
+
+    report = {
+        "commit": git_commit(),
+        "images": images,
+        "seed": None if args.corpus else args.seed,
+        "results": results,
+    }
+    text = json.dumps(report, indent=4)
+    if args.output:
+        args.output.write_text(text, encoding="utf-8")
+    print(text)
+
+
+if __name__ == "__main__":
+    main()
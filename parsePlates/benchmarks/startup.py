@@ -0,0 +1,94 @@
+"""
+Startup-time regression check for the main.py CLI.
+
+Runs light commands (db, export, crop --help) in fresh interpreters and
+fails if any of them imports torch / ultralytics / paddlex or if the
+median wall time exceeds MAX_STARTUP_SECONDS. Commands run in a scratch
+directory so they never touch the real plates.db.
+
+    python -m benchmarks.startup --runs 5
+
+tests/test_startup.py checks the imports on every test run.
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+PARSE_PLATES = Path(__file__).resolve().parent.parent
+MAIN = PARSE_PLATES / "main.py"
+HEAVY_MODULES = ("torch", "ultralytics", "paddle", "paddlex")
+# Generous for slow CI disks, the heavy imports alone take several seconds
+MAX_STARTUP_SECONDS = 1.5
+COMMANDS = (
+    ["db", "search", "BENCH"],
+    ["export"],
+    ["crop", "--help"],
+)
+
+# Run main.py as __main__, then report which heavy modules it pulled in
+CHILD = """
+import json, runpy, sys
+sys.argv = [{main!r}, *{argv!r}]
+try:
+    runpy.run_path({main!r}, run_name="__main__")
+except SystemExit:
+    pass
+heavy = [name for name in {heavy!r} if name in sys.modules]
+print(json.dumps({{"heavy": heavy}}))
+"""
+
+
+def measure(argv, cwd: Path, heavy=HEAVY_MODULES) -> dict:
+    code = CHILD.format(main=str(MAIN), argv=argv, heavy=tuple(heavy))
+    started = time.perf_counter()
+    output = subprocess.run(
+        [sys.executable, "-c", code],
+        cwd=cwd,
+        env={**os.environ, "PYTHONPATH": str(PARSE_PLATES)},
+        check=True,
+        capture_output=True,
+        text=True,
+    ).stdout
+    elapsed = time.perf_counter() - started
+    return {"seconds": elapsed, **json.loads(output.strip().splitlines()[-1])}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--max-seconds", type=float, default=MAX_STARTUP_SECONDS)
+    args = parser.parse_args()
+
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        cwd = Path(tmp)
+        (cwd / "source" / "images").mkdir(parents=True)
+        for argv in COMMANDS:
+            runs = [measure(argv, cwd) for _ in range(args.runs)]
+            heavy = sorted({name for run in runs for name in run["heavy"]})
+            median = statistics.median(run["seconds"] for run in runs)
+            results.append(
+                {
+                    "command": " ".join(argv),
+                    "median_seconds": median,
+                    "max_seconds": max(run["seconds"] for run in runs),
+                    "heavy_modules": heavy,
+                    "ok": not heavy and median <= args.max_seconds,
+                }
+            )
+
+    summary = {"results": results, "ok": all(result["ok"] for result in results)}
+    print(json.dumps(summary, indent=4))
+    if not summary["ok"]:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,209 @@
+"""
+Synthetic plate photos for benchmarking without the real images.
+
+Each image is a 1200x1600 (width x height) noisy background with a plate
+rendered flat (border, random text), warped into it with a random
+perspective, then blurred and noised like a phone photo. labels.json
+records the text, the plate's corners and its bounding box per image, in
+the same {"bbox": [[x1, y1], [x2, y2]], "confidence": ...} shape detect
+writes to bounds.json, so the crop stage can run without YOLO.
+
+    python -m benchmarks.synthetic /tmp/plates --count 200 --seed 7
+"""
+
+import argparse
+import json
+import random
+import string
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+import cv2
+import numpy as np
+
+WIDTH, HEIGHT = 1200, 1600
+PLATE_SIZE = (520, 260)  # US plate aspect ratio, 12 x 6 inches
+LABELS_FILE = "labels.json"
+FONTS = (
+    cv2.FONT_HERSHEY_SIMPLEX,
+    cv2.FONT_HERSHEY_DUPLEX,
+    cv2.FONT_HERSHEY_TRIPLEX,
+)
+
+
+def random_text(rng: random.Random) -> str:
+    """Plate-like text: 3 letters, a space, 3-4 digits."""
+    letters = "".join(rng.choices(string.ascii_uppercase, k=3))
+    digits = "".join(rng.choices(string.digits, k=rng.choice((3, 4))))
+    return f"{letters} {digits}"
+
+
+def render_plate(text: str, rng: random.Random) -> np.ndarray:
+    """A flat plate: light background, dark border, a state line and the text."""
+    w, h = PLATE_SIZE
+    shade = rng.randint(215, 250)
+    plate = np.full((h, w, 3), shade, dtype=np.uint8)
+    ink = tuple(rng.randint(0, 90) for _ in range(3))
+    cv2.rectangle(plate, (6, 6), (w - 7, h - 7), ink, 6)
+    cv2.putText(
+        plate, "SYNTHETIC", (w // 2 - 95, 48), cv2.FONT_HERSHEY_SIMPLEX, 1.0, ink, 2
+    )
+
+    font = rng.choice(FONTS)
+    scale, thickness = 3.2, 9
+    (text_w, text_h), _ = cv2.getTextSize(text, font, scale, thickness)
+    scale *= min(1.0, (w - 50) / text_w)
+    (text_w, text_h), _ = cv2.getTextSize(text, font, scale, thickness)
+    origin = ((w - text_w) // 2, (h + text_h) // 2 + 20)
+    cv2.putText(plate, text, origin, font, scale, ink, thickness, cv2.LINE_AA)
+    return plate
+
+
+def render_background(rng: random.Random, np_rng: np.random.Generator) -> np.ndarray:
+    """Gradient plus a few car-body-ish blocks and sensor noise."""
+    top = np.array([rng.randint(30, 200) for _ in range(3)], dtype=np.float32)
+    bottom = np.array([rng.randint(30, 200) for _ in range(3)], dtype=np.float32)
+    ramp = np.linspace(0.0, 1.0, HEIGHT, dtype=np.float32)[:, None, None]
+    gradient = np.broadcast_to(top + (bottom - top) * ramp, (HEIGHT, WIDTH, 3))
+    background = np.ascontiguousarray(gradient, dtype=np.uint8)
+    for _ in range(rng.randint(3, 8)):
+        x, y = rng.randrange(WIDTH), rng.randrange(HEIGHT)
+        color = tuple(rng.randint(0, 255) for _ in range(3))
+        cv2.rectangle(
+            background,
+            (x, y),
+            (x + rng.randint(80, 600), y + rng.randint(40, 400)),
+            color,
+            -1,
+        )
+    noise = np_rng.normal(0, 6, background.shape)
+    return np.clip(background + noise, 0, 255).astype(np.uint8)
+
+
+def place_plate(
+    background: np.ndarray, plate: np.ndarray, rng: random.Random
+) -> np.ndarray:
+    """Warp plate into background, returns the plate's corners (tl, tr, br, bl)."""
+    w, h = PLATE_SIZE
+    scale = rng.uniform(0.6, 1.2)
+    cx = rng.uniform(w * scale / 2 + 40, WIDTH - w * scale / 2 - 40)
+    cy = rng.uniform(h * scale / 2 + 40, HEIGHT - h * scale / 2 - 40)
+    half_w, half_h = w * scale / 2, h * scale / 2
+    jitter = 0.12 * min(w, h) * scale
+    corners = np.array(
+        [
+            [cx - half_w, cy - half_h],
+            [cx + half_w, cy - half_h],
+            [cx + half_w, cy + half_h],
+            [cx - half_w, cy + half_h],
+        ],
+        dtype=np.float32,
+    )
+    corners += np.array(
+        [[rng.uniform(-jitter, jitter) for _ in range(2)] for _ in range(4)],
+        dtype=np.float32,
+    )
+    source = np.array([[0, 0], [w - 1, 0], [w - 1, h - 1], [0, h - 1]], np.float32)
+    M = cv2.getPerspectiveTransform(source, corners)
+    warped = cv2.warpPerspective(plate, M, (WIDTH, HEIGHT))
+    mask = cv2.warpPerspective(
+        np.full((h, w), 255, dtype=np.uint8), M, (WIDTH, HEIGHT)
+    )
+    np.copyto(background, warped, where=mask[:, :, None] > 0)
+    return corners
+
+
+def render_image(
+    rng: random.Random, np_rng: np.random.Generator
+) -> Tuple[np.ndarray, str, np.ndarray]:
+    """One synthetic photo, its plate text and the plate's corners."""
+    text = random_text(rng)
+    image = render_background(rng, np_rng)
+    corners = place_plate(image, render_plate(text, rng), rng)
+    ksize = rng.choice((1, 3, 5))
+    if ksize > 1:
+        image = cv2.GaussianBlur(image, (ksize, ksize), 0)
+    noise = np_rng.normal(0, rng.uniform(2, 8), image.shape)
+    image = np.clip(image + noise, 0, 255).astype(np.uint8)
+    return image, text, corners
+
+
+def generate(folder: str | Path, count: int, seed: int = 0) -> Dict[str, dict]:
+    """
+    Write count synthetic photos and labels.json into folder.
+
+    The same seed always renders the same corpus, so results from
+    different commits measure the same images.
+    """
+    folder = Path(folder)
+    folder.mkdir(parents=True, exist_ok=True)
+    rng = random.Random(seed)
+    np_rng = np.random.default_rng(seed)
+    labels = {}
+    for i in range(1, count + 1):
+        image, text, corners = render_image(rng, np_rng)
+        name = f"synthetic{i:05d}.jpg"
+        cv2.imwrite(str(folder / name), image, [cv2.IMWRITE_JPEG_QUALITY, 90])
+        (x1, y1), (x2, y2) = corners.min(axis=0), corners.max(axis=0)
+        labels[name] = {
+            "text": text,
+            "corners": corners.round(1).tolist(),
+            "bbox": [[int(x1), int(y1)], [int(x2), int(y2)]],
+            "confidence": 0.9,
+        }
+    with open(folder / LABELS_FILE, "w", encoding="utf-8") as f:
+        json.dump(labels, f, indent=4)
+    return labels
+
+
+def load_labels(folder: str | Path) -> Dict[str, dict]:
+    with open(Path(folder) / LABELS_FILE, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def text_boxes(label: dict, rng: random.Random) -> List[List[int]]:
+    """
+    OCR-like (x1, y1, x2, y2) boxes for one plate: a tall box per word of
+    the plate text plus the short state line, with a few pixels of jitter.
+    """
+    (x1, y1), (x2, y2) = label["bbox"]
+    w, h = x2 - x1, y2 - y1
+    boxes = [[x1 + w // 3, y1 + h // 12, x2 - w // 3, y1 + h // 5]]
+    words = label["text"].split()
+    step = w // len(words)
+    for i, _ in enumerate(words):
+        boxes.append(
+            [x1 + i * step + 10, y1 + h // 3, x1 + (i + 1) * step - 10, y2 - h // 8]
+        )
+    return [[v + rng.randint(-3, 3) for v in box] for box in boxes]
+
+
+def edge_segments(label: dict, rng: random.Random) -> List[Tuple[int, ...]]:
+    """
+    Hough-like line segments for one plate: each edge of the plate broken
+    into short overlapping pieces, which merge_lines should join back up.
+    """
+    corners = np.array(label["corners"], dtype=np.float32)
+    segments = []
+    for start, end in zip(corners, np.roll(corners, -1, axis=0)):
+        pieces = rng.randint(3, 6)
+        for i in range(pieces):
+            a = start + (end - start) * max(0.0, (i - 0.2) / pieces)
+            b = start + (end - start) * min(1.0, (i + 1.2) / pieces)
+            segments.append(tuple(int(v) for v in (*a, *b)))
+    rng.shuffle(segments)
+    return segments
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("folder", type=Path)
+    parser.add_argument("--count", type=int, default=100)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    generate(args.folder, args.count, args.seed)
+    print(f"✅ Wrote {args.count} synthetic plates to {args.folder}")
+
+
+if __name__ == "__main__":
+    main()
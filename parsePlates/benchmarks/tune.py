@@ -0,0 +1,194 @@
+"""
+Sweep the pipeline settings on labelled images and keep the Pareto front.
+
+Every trial sets a pipelineConfig (YOLO imgsz / batch, the DB fallback
+confidence, crop width, the DB detector's input size and thresholds, the
+OCR grouping tolerance), replays the same labelled sample as
+benchmarks.accuracy and scores throughput against CER and recall. Trials
+no other trial beats on all three form the Pareto front. From the front,
+the fastest config within the accuracy tolerances of the defaults is
+written to the config file the pipeline loads at startup.
+
+    python -m benchmarks.tune --sample 100 --trials 24
+    python -m benchmarks.tune --sample 100 --keys yolo_imgsz yolo_batch --grid
+"""
+
+import argparse
+import itertools
+import json
+import random
+import sys
+import tempfile
+from pathlib import Path
+from typing import Any, Dict, List
+
+from benchmarks.accuracy import (
+    DB_NAME,
+    INPUT_FOLDER,
+    MODEL_PATH,
+    load_models,
+    replay,
+    sample_rows,
+    score,
+)
+from ImageManager import ImageManager
+from imageCache import get_cache
+from pipelineConfig import DEFAULT_CONFIG_PATH, DEFAULTS, configure, save_config
+
+REPORT_PATH = "source/tune-report.json"
+SEARCH_SPACE: Dict[str, List[Any]] = {
+    "yolo_imgsz": [480, 640, 800],
+    "yolo_batch": [1, 10, 16, 32],
+    "fallback_confidence": [0.5, 0.6, 0.7, 0.8],
+    "crop_width": [512, 640, 768],
+    # The DB network downsamples by 32
+    "db_input_size": [512, 640, 736],
+    "db_binary_threshold": [0.2, 0.3, 0.4],
+    "db_polygon_threshold": [0.4, 0.5, 0.6],
+    "ocr_rel_tol": [0.1, 0.2, 0.3],
+}
+
+
+def candidates(keys: List[str], trials: int, grid: bool, seed: int) -> List[dict]:
+    """The defaults first, then the grid over keys or trials random picks."""
+    configs = [dict(DEFAULTS)]
+    if grid:
+        for values in itertools.product(*(SEARCH_SPACE[key] for key in keys)):
+            configs.append({**DEFAULTS, **dict(zip(keys, values))})
+    else:
+        rng = random.Random(seed)
+        for _ in range(trials):
+            configs.append(
+                {**DEFAULTS, **{key: rng.choice(SEARCH_SPACE[key]) for key in keys}}
+            )
+    unique = []
+    for config in configs:
+        if config not in unique:
+            unique.append(config)
+    return unique
+
+
+def dominates(a: dict, b: dict) -> bool:
+    """a is at least as fast and as accurate as b, and better at one of them."""
+    at_least = (
+        a["images_per_sec"] >= b["images_per_sec"]
+        and a["cer"] <= b["cer"]
+        and a["recall"] >= b["recall"]
+    )
+    better = (
+        a["images_per_sec"] > b["images_per_sec"]
+        or a["cer"] < b["cer"]
+        or a["recall"] > b["recall"]
+    )
+    return at_least and better
+
+
+def pareto_front(results: List[dict]) -> List[dict]:
+    return [
+        result
+        for result in results
+        if not any(dominates(other, result) for other in results)
+    ]
+
+
+def choose(front: List[dict], default: dict, args) -> dict:
+    """Fastest front member no less accurate than the defaults allow."""
+    acceptable = [
+        result
+        for result in front
+        if result["cer"] <= default["cer"] + args.max_cer_increase
+        and result["recall"] >= default["recall"] - args.max_recall_drop
+    ]
+    # The defaults are either on the front or beaten by a member that is
+    # acceptable, so this is never empty
+    return max(acceptable, key=lambda result: result["images_per_sec"])
+
+
+def run_trial(config: dict, rows: List[dict], models, args) -> dict:
+    configure(config)
+    # Decodes cached by an earlier trial would flatter the later ones
+    get_cache().clear()
+    with tempfile.TemporaryDirectory() as tmp:
+        predictions, seconds = replay(rows, args.input, Path(tmp), models)
+    return {
+        "config": config,
+        **score(rows, predictions),
+        "seconds": round(seconds, 3),
+        "images_per_sec": round(len(rows) / seconds, 3) if seconds else 0.0,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--db", default=DB_NAME)
+    parser.add_argument("--input", type=Path, default=Path(INPUT_FOLDER))
+    parser.add_argument("--model", default=MODEL_PATH)
+    parser.add_argument("--sample", type=int, default=100)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--keys", nargs="+", choices=SEARCH_SPACE, default=None)
+    parser.add_argument("--trials", type=int, default=24)
+    parser.add_argument("--grid", action="store_true", help="Every combination")
+    parser.add_argument("--max-cer-increase", type=float, default=0.005)
+    parser.add_argument("--max-recall-drop", type=float, default=0.01)
+    parser.add_argument("--output", type=Path, default=Path(DEFAULT_CONFIG_PATH))
+    parser.add_argument("--report", type=Path, default=Path(REPORT_PATH))
+    parser.add_argument(
+        "--dry-run", action="store_true", help="Report only, keep the config file"
+    )
+    args = parser.parse_args()
+
+    with ImageManager(args.db) as db:
+        labeled = db.get_labeled()
+    rows = [
+        row
+        for row in sample_rows(labeled, args.sample, args.seed)
+        if (args.input / row["fileName"]).exists()
+    ]
+    if not rows:
+        sys.exit(f"❌ No labelled images from {args.db} found in {args.input}")
+
+    keys = args.keys or list(SEARCH_SPACE)
+    configs = candidates(keys, args.trials, args.grid, args.seed)
+    print(f"🎛️ {len(configs)} configs x {len(rows)} labelled images")
+
+    models = load_models(args.model)
+    # Untimed pass so model warm-up doesn't count against the first trial
+    run_trial(dict(DEFAULTS), rows[:10], models, args)
+
+    results = []
+    for i, config in enumerate(configs, start=1):
+        result = run_trial(config, rows, models, args)
+        results.append(result)
+        changed = {k: v for k, v in config.items() if DEFAULTS[k] != v}
+        print(
+            f"   {i}/{len(configs)} {result['images_per_sec']:.2f} img/s "
+            f"cer={result['cer']:.4f} recall={result['recall']:.3f} "
+            f"{changed or 'defaults'}"
+        )
+
+    front = pareto_front(results)
+    chosen = choose(front, results[0], args)
+    for result in results:
+        result["pareto"] = result in front
+        result["chosen"] = result is chosen
+
+    args.report.parent.mkdir(parents=True, exist_ok=True)
+    with open(args.report, "w", encoding="utf-8") as f:
+        json.dump({"images": len(rows), "trials": results}, f, indent=4)
+    print(f"📈 Pareto front, {len(front)} of {len(results)} ({args.report}):")
+    for result in sorted(front, key=lambda result: -result["images_per_sec"]):
+        marker = "👉" if result is chosen else "  "
+        print(
+            f" {marker} {result['images_per_sec']:.2f} img/s "
+            f"cer={result['cer']:.4f} exact={result['exact_match']:.3f} "
+            f"recall={result['recall']:.3f}"
+        )
+
+    if args.dry_run:
+        return
+    save_config(chosen["config"], args.output)
+    print(f"✅ Wrote {args.output}, loaded by main.py on startup")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,357 @@
+import argparse
+import hashlib
+import mmap
+import os
+import sqlite3
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import cv2
+import numpy as np
+
+from imageCache import get_cache
+
+try:
+    import fcntl
+except ImportError:  # Windows, single writer only
+    fcntl = None
+
+PACK_NAME = "crops.pack"
+INDEX_NAME = "crops.db"
+# Every pack generation, crops.pack first, then crops.1.pack, crops.2.pack...
+PACK_GLOB = "crops*.pack"
+
+_open_stores: Dict[str, "CropStore"] = {}
+
+
+class CropStore:
+    """
+    Append-only pack file for plate crops, indexed in SQLite.
+
+    Instead of one small JPEG per plate in detectedPlates / missedPlates /
+    reads, the encoded bytes are appended to a single crops.pack and
+    crops.db records (kind, name) -> offset, length and sha1. Reads slice an
+    mmap of the pack. Overwriting a crop only appends, compact() reclaims
+    the dead bytes into the next pack generation.
+
+    kind is the folder the crop used to live in, e.g. 'detectedPlates'.
+    """
+
+    def __init__(self, root: str | Path):
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.conn = sqlite3.connect(self.root / INDEX_NAME, timeout=30)
+        self.conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS crops (
+                kind TEXT NOT NULL,
+                name TEXT NOT NULL,
+                offset INTEGER NOT NULL,
+                length INTEGER NOT NULL,
+                hash TEXT NOT NULL,
+                createdAt TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP,
+                PRIMARY KEY (kind, name)
+            )
+        """
+        )
+        # The pack generation the offsets point into
+        self.conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS meta (
+                key TEXT PRIMARY KEY,
+                value INTEGER NOT NULL
+            )
+        """
+        )
+        self.conn.commit()
+        row = self.conn.execute(
+            "SELECT value FROM meta WHERE key = 'generation'"
+        ).fetchone()
+        self.generation = row[0] if row else 0
+        self.pack_path = self.root / pack_name(self.generation)
+        self.pack_path.touch(exist_ok=True)
+        self.pack = open(self.pack_path, "ab")
+        self.map = None
+
+    @contextmanager
+    def _locked(self):
+        """Serialize appends from several processes sharing the pack."""
+        if fcntl is not None:
+            fcntl.flock(self.pack.fileno(), fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(self.pack.fileno(), fcntl.LOCK_UN)
+
+    def put(self, kind: str, name: str, data: bytes) -> bool:
+        """
+        Store encoded bytes under (kind, name).
+
+        Returns:
+            False if the same bytes were already stored under that name
+        """
+        digest = hashlib.sha1(data).hexdigest()
+        cursor = self.conn.cursor()
+        cursor.execute(
+            "SELECT hash FROM crops WHERE kind = ? AND name = ?", (kind, name)
+        )
+        row = cursor.fetchone()
+        if row is not None and row[0] == digest:
+            return False
+
+        with self._locked():
+            offset = self.pack.seek(0, os.SEEK_END)
+            self.pack.write(data)
+            self.pack.flush()
+
+        cursor.execute(
+            """
+            INSERT OR REPLACE INTO crops (kind, name, offset, length, hash)
+            VALUES (?, ?, ?, ?, ?)
+        """,
+            (kind, name, offset, len(data), digest),
+        )
+        self.conn.commit()
+        return True
+
+    def put_image(self, kind: str, name: str, img: np.ndarray) -> bool:
+        """Encode img using the extension of name and store it."""
+        ext = os.path.splitext(name)[1] or ".jpg"
+        ok, encoded = cv2.imencode(ext, img)
+        if not ok:
+            raise ValueError(f"Could not encode {name}")
+        return self.put(kind, name, encoded.tobytes())
+
+    def _locate(self, kind: str, name: str) -> Optional[Tuple[int, int, str]]:
+        cursor = self.conn.cursor()
+        cursor.execute(
+            "SELECT offset, length, hash FROM crops WHERE kind = ? AND name = ?",
+            (kind, name),
+        )
+        return cursor.fetchone()
+
+    def _read(self, offset: int, length: int) -> bytes:
+        if self.map is None or offset + length > len(self.map):
+            # The pack grew since it was mapped
+            self._remap()
+        return self.map[offset : offset + length]
+
+    def get(self, kind: str, name: str) -> Optional[bytes]:
+        """Bytes of a crop, read through the mmap of the pack."""
+        row = self._locate(kind, name)
+        if row is None:
+            return None
+        return self._read(row[0], row[1])
+
+    def get_image(self, kind: str, name: str, flags: int = cv2.IMREAD_COLOR):
+        """
+        Decode a crop like cv2.imread, None if it doesn't exist. Goes through
+        the image cache, keyed by the crop's hash so overwrites never hit.
+        """
+        row = self._locate(kind, name)
+        if row is None:
+            return None
+        offset, length, digest = row
+        return get_cache().get_or_load(
+            (str(self.pack_path), kind, name, digest, flags),
+            lambda: cv2.imdecode(
+                np.frombuffer(self._read(offset, length), dtype=np.uint8), flags
+            ),
+            name,
+        )
+
+    def _remap(self):
+        if self.map is not None:
+            self.map.close()
+            self.map = None
+        with open(self.pack_path, "rb") as f:
+            if os.fstat(f.fileno()).st_size > 0:
+                self.map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def names(self, kind: str, page_size: int = 500) -> Iterator[str]:
+        """
+        Names stored under a kind, sorted. Paged by name so no cursor stays
+        open while the caller writes to the store.
+        """
+        last = ""
+        while True:
+            cursor = self.conn.cursor()
+            cursor.execute(
+                """
+                SELECT name FROM crops WHERE kind = ? AND name > ?
+                ORDER BY name LIMIT ?
+            """,
+                (kind, last, page_size),
+            )
+            page = [name for (name,) in cursor.fetchall()]
+            if not page:
+                return
+            yield from page
+            last = page[-1]
+
+    def __contains__(self, key) -> bool:
+        kind, name = key
+        cursor = self.conn.cursor()
+        cursor.execute("SELECT 1 FROM crops WHERE kind = ? AND name = ?", (kind, name))
+        return cursor.fetchone() is not None
+
+    def stats(self) -> Dict[str, int]:
+        """Crop count, live bytes and pack size."""
+        cursor = self.conn.cursor()
+        cursor.execute("SELECT COUNT(*), COALESCE(SUM(length), 0) FROM crops")
+        count, live = cursor.fetchone()
+        size = self.pack_path.stat().st_size
+        return {"crops": count, "liveBytes": live, "packBytes": size}
+
+    def compact(self) -> int:
+        """
+        Rewrite the live crops into the next pack generation. Not safe while
+        other processes write to the store.
+
+        The new pack is written and synced under its own name, then its
+        offsets and generation are committed in one transaction, then the
+        old pack is deleted. A crash before the commit leaves the index on
+        the old pack, one after it on the new one. Either way the leftover
+        pack is deleted by the next compact().
+
+        Returns:
+            Bytes reclaimed
+        """
+        self._remove_stale_packs()
+        before = self.pack_path.stat().st_size
+        generation = self.generation + 1
+        new_path = self.root / pack_name(generation)
+        moves = self._write_pack(new_path)
+
+        if self.map is not None:
+            self.map.close()
+            self.map = None
+        with self._locked():
+            self._commit_pack(generation, moves)
+        self.pack.close()
+        self.generation = generation
+        self.pack_path = new_path
+        self.pack = open(self.pack_path, "ab")
+        self._remove_stale_packs()
+
+        reclaimed = before - self.pack_path.stat().st_size
+        print(f"✅ Compacted {self.pack_path}, reclaimed {reclaimed} bytes")
+        return reclaimed
+
+    def _write_pack(self, path: Path) -> List[Tuple[int, str, str]]:
+        """Copy the live crops into path, returning their new offsets."""
+        self._remap()
+        cursor = self.conn.cursor()
+        cursor.execute("SELECT kind, name, offset, length FROM crops ORDER BY offset")
+        moves = []
+        with open(path, "wb") as out:
+            for kind, name, offset, length in cursor.fetchall():
+                moves.append((out.tell(), kind, name))
+                out.write(self.map[offset : offset + length])
+            out.flush()
+            os.fsync(out.fileno())
+        _fsync_dir(self.root)
+        return moves
+
+    def _commit_pack(self, generation: int, moves: List[Tuple[int, str, str]]):
+        """Point the index at the new pack, offsets and generation together."""
+        with self.conn:
+            self.conn.executemany(
+                "UPDATE crops SET offset = ? WHERE kind = ? AND name = ?", moves
+            )
+            self.conn.execute(
+                "INSERT OR REPLACE INTO meta (key, value) VALUES ('generation', ?)",
+                (generation,),
+            )
+
+    def _remove_stale_packs(self):
+        """Delete packs of other generations, left by a compaction."""
+        for path in self.root.glob(PACK_GLOB):
+            if path.name != self.pack_path.name:
+                path.unlink()
+
+    def import_folder(self, folder: str | Path, kind: Optional[str] = None) -> int:
+        """Copy an existing crop folder's files into the store."""
+        folder = Path(folder)
+        kind = kind or folder.name
+        added = 0
+        with os.scandir(folder) as entries:
+            for entry in entries:
+                if entry.is_file():
+                    added += self.put(kind, entry.name, Path(entry.path).read_bytes())
+        print(f"✅ Imported {added} crops from {folder} as '{kind}'")
+        return added
+
+    def export_folder(self, kind: str, folder: str | Path) -> int:
+        """Write a kind back out as individual files."""
+        folder = Path(folder)
+        folder.mkdir(parents=True, exist_ok=True)
+        count = 0
+        for name in self.names(kind):
+            (folder / name).write_bytes(self.get(kind, name))
+            count += 1
+        return count
+
+    def close(self):
+        if self.map is not None:
+            self.map.close()
+            self.map = None
+        self.pack.close()
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+
+def pack_name(generation: int) -> str:
+    """File name of a pack generation, the first one keeps PACK_NAME."""
+    return PACK_NAME if generation == 0 else f"crops.{generation}.pack"
+
+
+def _fsync_dir(path: Path):
+    """Make a new file's directory entry durable (POSIX only)."""
+    if not hasattr(os, "O_DIRECTORY"):
+        return
+    fd = os.open(path, os.O_RDONLY | os.O_DIRECTORY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def open_store(root: str | Path) -> CropStore:
+    """One CropStore per root and process, for stage workers that get a path."""
+    key = f"{os.getpid()}:{Path(root).resolve()}"
+    if key not in _open_stores:
+        _open_stores[key] = CropStore(root)
+    return _open_stores[key]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Manage the packed crop store")
+    parser.add_argument("root", help="Store folder holding crops.pack / crops.db")
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("compact", help="Reclaim space from overwritten crops")
+    sub.add_parser("stats", help="Show crop count and pack size")
+    import_cmd = sub.add_parser("import", help="Pack an existing crop folder")
+    import_cmd.add_argument("folder")
+    import_cmd.add_argument("--kind")
+    export_cmd = sub.add_parser("export", help="Unpack a kind into a folder")
+    export_cmd.add_argument("kind")
+    export_cmd.add_argument("folder")
+    args = parser.parse_args()
+
+    with CropStore(args.root) as store:
+        if args.command == "compact":
+            store.compact()
+        elif args.command == "stats":
+            print(store.stats())
+        elif args.command == "import":
+            store.import_folder(args.folder, args.kind)
+        elif args.command == "export":
+            print(f"Exported {store.export_folder(args.kind, args.folder)} crops")
@@ -0,0 +1,277 @@
+"""
+Write-behind inserts into the 'images' table from a dedicated thread.
+
+    with WriteBehindWriter(DB_NAME) as writer:
+        writer.put(text, file_name, ocr_confidence=0.93, context=path)
+        for done in writer.completed():  # on the producer's thread
+            exporter.append(done.row_id, ...)
+        writer.flush()                    # durability barrier
+
+Producers put records on a bounded queue and go back to OCR. The writer
+thread takes whatever is queued, up to group_size records or whatever
+arrives within group_window seconds of the first, and commits the group
+in one transaction, so many rows share one fsync. A full queue blocks
+put(), so a stalled disk slows the pipeline down instead of growing memory.
+
+The thread has its own ImageManager connection, sqlite3 connections can't
+be shared between threads. Results come back through completed() on the
+producer's thread, so callbacks like the results exporter never run
+concurrently.
+
+Metrics: plates_db_queue_depth (gauge), the db_commit stage histogram
+(commit latency), db_queue_wait (put to commit) and
+plates_db_commits_total / plates_db_commit_rows_total counters.
+"""
+
+import queue
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Iterator, List, Optional
+
+from ImageManager import ImageManager
+from metrics import count, gauge, get_metrics, log
+
+# Records a producer can be ahead of the disk by
+MAX_QUEUE = 1000
+# A group is committed at this many records or this many seconds after its
+# first record arrived, whichever comes first
+GROUP_SIZE = 200
+GROUP_WINDOW = 0.25
+# Queued by flush(), commits the partial group without waiting out the window
+_FLUSH = object()
+
+
+@dataclass
+class WriteResult:
+    """One committed record. row_id is None if it was skipped or failed."""
+
+    file_name: str
+    text: str
+    row_id: Optional[int]
+    context: Any = None
+    error: Optional[str] = None
+
+
+@dataclass
+class _Record:
+    text: str
+    file_name: str
+    corrected_text: Optional[str]
+    ocr_confidence: Optional[float]
+    ocr_model: Optional[str]
+    context: Any
+    seq: int
+    queued: float
+
+
+class WriterClosed(RuntimeError):
+    """put() after close(), or the writer thread died."""
+
+
+class WriteBehindWriter:
+    def __init__(
+        self,
+        db_name: str,
+        replace: bool = False,
+        max_queue: int = MAX_QUEUE,
+        group_size: int = GROUP_SIZE,
+        group_window: float = GROUP_WINDOW,
+        timeout: float = 30.0,
+    ):
+        """
+        Args:
+            db_name: SQLite file, opened again on the writer thread
+            replace: Update existing fileNames instead of skipping them
+            max_queue: Queued records before put() blocks
+            group_size: Most records per transaction
+            group_window: Seconds a group waits for more records
+            timeout: The writer connection's lock timeout
+        """
+        self.db_name = db_name
+        self.replace = replace
+        self.group_size = group_size
+        self.group_window = group_window
+        self.timeout = timeout
+        self.queue: "queue.Queue[Any]" = queue.Queue(max_queue)
+        self.results: "queue.SimpleQueue[WriteResult]" = queue.SimpleQueue()
+        # Sequence numbers: put() hands them out, the writer thread
+        # advances committed past each group it finished
+        self.submitted = 0
+        self.committed = 0
+        # Keeps sequence numbers in queue order with several producers
+        self.put_lock = threading.Lock()
+        self.done = threading.Condition()
+        self.closed = False
+        self.error: Optional[BaseException] = None
+        self.thread = threading.Thread(
+            target=self._run, name="plates-db-writer", daemon=True
+        )
+        self.thread.start()
+
+    def put(
+        self,
+        text: str,
+        file_name: str,
+        corrected_text: Optional[str] = None,
+        ocr_confidence: Optional[float] = None,
+        ocr_model: Optional[str] = None,
+        context: Any = None,
+    ):
+        """
+        Queue one insert. Blocks while the queue is full. context comes back
+        untouched in the record's WriteResult.
+        """
+        if self.closed or self.error is not None:
+            raise WriterClosed(f"DB writer is closed: {self.error or 'close()'}")
+        with self.put_lock:
+            self.submitted += 1
+            record = _Record(
+                text,
+                file_name,
+                corrected_text,
+                ocr_confidence,
+                ocr_model,
+                context,
+                self.submitted,
+                time.perf_counter(),
+            )
+            self._enqueue(record)
+        gauge("plates_db_queue_depth", self.queue.qsize())
+
+    def _enqueue(self, item: Any):
+        """Queue put that gives up if the writer thread died meanwhile."""
+        while True:
+            try:
+                self.queue.put(item, timeout=1.0)
+                return
+            except queue.Full:
+                # Don't wait forever on a thread that died
+                if self.error is not None:
+                    raise WriterClosed(f"DB writer failed: {self.error}")
+
+    def completed(self) -> Iterator[WriteResult]:
+        """The results committed since the last call, without waiting."""
+        while True:
+            try:
+                yield self.results.get_nowait()
+            except queue.Empty:
+                return
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """
+        Durability barrier: wait until every record put so far is committed.
+        The writer commits its partial group right away instead of waiting
+        out group_window.
+
+        Returns:
+            False if timeout ran out first
+        """
+        target = self.submitted
+        if self.committed < target and self.error is None:
+            self._enqueue(_FLUSH)
+        with self.done:
+            finished = self.done.wait_for(
+                lambda: self.committed >= target or self.error is not None, timeout
+            )
+        if self.error is not None:
+            raise WriterClosed(f"DB writer failed: {self.error}") from self.error
+        return finished
+
+    def close(self, timeout: Optional[float] = None):
+        """Commit everything queued, then stop the thread."""
+        if self.closed:
+            return
+        self.closed = True
+        # A dead thread won't take the sentinel off a full queue
+        if self.error is None:
+            try:
+                # The sentinel queues behind every record, so they all
+                # commit first
+                self._enqueue(None)
+            except WriterClosed:
+                return
+        self.thread.join(timeout)
+        if self.thread.is_alive():
+            log("⚠️ DB writer still committing after close timeout", "warning")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def _run(self):
+        db = ImageManager(self.db_name, timeout=self.timeout)
+        try:
+            db.connect()
+            stopping = False
+            while not stopping:
+                group, stopping = self._next_group()
+                if group:
+                    self._commit(db, group)
+        except BaseException as e:
+            self.error = e
+            log(f"❌ DB writer stopped: {e}", "error")
+            with self.done:
+                self.done.notify_all()
+        finally:
+            db.close()
+
+    def _next_group(self):
+        """Block for one record, then take more until the group is full."""
+        first = self.queue.get()
+        if first is None:
+            return [], True
+        if first is _FLUSH:
+            return [], False
+        group = [first]
+        deadline = time.monotonic() + self.group_window
+        while len(group) < self.group_size:
+            remaining = deadline - time.monotonic()
+            try:
+                record = (
+                    self.queue.get(timeout=remaining)
+                    if remaining > 0
+                    else self.queue.get_nowait()
+                )
+            except queue.Empty:
+                break
+            if record is None:
+                return group, True
+            if record is _FLUSH:
+                break
+            group.append(record)
+        return group, False
+
+    def _commit(self, db: ImageManager, group: List[_Record]):
+        metrics = get_metrics()
+        rows = [
+            (r.text, r.file_name, r.corrected_text, r.ocr_confidence, r.ocr_model)
+            for r in group
+        ]
+        started = time.perf_counter()
+        error = None
+        try:
+            row_ids = db.insert_batch(rows, replace=self.replace)
+        except Exception as e:
+            # The whole transaction rolled back, report every record failed
+            # and keep the thread alive for the next group
+            error = f"{type(e).__name__}: {e}"
+            row_ids = [None] * len(group)
+        finished = time.perf_counter()
+        metrics.observe("db_commit", finished - started, error=error)
+        count("plates_db_commits_total", result="failed" if error else "ok")
+        count("plates_db_commit_rows_total", len(group))
+        gauge("plates_db_queue_depth", self.queue.qsize())
+
+        for record, row_id in zip(group, row_ids):
+            metrics.observe("db_queue_wait", finished - record.queued)
+            self.results.put(
+                WriteResult(
+                    record.file_name, record.text, row_id, record.context, error
+                )
+            )
+        with self.done:
+            self.committed = group[-1].seq
+            self.done.notify_all()
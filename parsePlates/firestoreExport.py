@@ -0,0 +1,236 @@
+"""
+Export plates in the format scripts/firestore-helpers/uploadToFirestore.js
+uploads, as a full snapshot or as the changes since the last export.
+
+    python main.py firestore          # changes since the last export
+    python main.py firestore --full   # every plate
+
+Each export is a folder of batch files. A batch file holds at most
+FIRESTORE_BATCH_LIMIT writes, the most one Firestore batch can commit:
+
+    {"insert": [{"id": "12", "title": "ABC 123"}],
+     "update": [...], "delete": ["7"]}
+
+Documents are keyed by the plate number in the file name (plate12.jpg is
+"12"), the ids the site's documents already have, not by database row id.
+
+Every row carries a version from the database's change counter (see
+ImageManager.create_table). The watermark file keeps the last exported
+version and the highest row id uploaded so far, so an incremental export
+only holds the rows changed since. Rows with a higher id than that were
+never uploaded: they are inserts, and uploadToFirestore.js gives them a
+voteCount. Changes to older rows are updates, which are merged and keep
+their votes.
+
+The watermark also keeps the version and highest id of every export, so
+a redo with --since N classifies rows against what was uploaded as of
+version N, not against the failed export being redone. Every export goes
+to a folder of its own, a redo never overwrites the batches it repeats.
+"""
+
+import datetime
+import json
+import os
+import re
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional
+
+from ImageManager import ImageManager
+from metrics import log
+
+EXPORT_DIR = "source/firestore"
+WATERMARK_FILE = "watermark.json"
+# Firestore rejects batches with more writes than this
+FIRESTORE_BATCH_LIMIT = 500
+# The flat [{id, title}] list the upload script used to take
+SNAPSHOT_FILE = "Plate_Zone_Plates.json"
+
+
+def plate_id(file_name: Optional[str]) -> Optional[str]:
+    """
+    The site's id for a plate, the first number in its file name
+    (plate12.jpg -> "12"), parsed like server/index.ts does. None if the
+    name has no number.
+    """
+    match = re.search(r"\d+", file_name or "")
+    return str(int(match.group())) if match else None
+
+
+def plate_doc(row) -> Optional[Dict[str, str]]:
+    """A plate as a Firestore document, the hand correction winning."""
+    doc_id = plate_id(row["fileName"])
+    if doc_id is None:
+        log(f"⚠️ No plate number in {row['fileName']}, not exported", "warning")
+        return None
+    title = (row["correctedText"] or "").strip() or row["text"]
+    return {"id": doc_id, "title": title}
+
+
+def load_watermark(export_dir: str | Path) -> Dict[str, Any]:
+    path = Path(export_dir) / WATERMARK_FILE
+    if not path.exists():
+        return {"version": 0, "maxId": 0, "history": []}
+    with open(path, encoding="utf-8") as f:
+        watermark = json.load(f)
+    # Watermarks from before the history was kept
+    watermark.setdefault(
+        "history", [{"version": watermark["version"], "maxId": watermark["maxId"]}]
+    )
+    return watermark
+
+
+def uploaded_max_id(watermark: Dict[str, Any], version: int) -> int:
+    """The highest row id uploaded by the exports up to version."""
+    return max(
+        (
+            entry["maxId"]
+            for entry in watermark["history"]
+            if entry["version"] <= version
+        ),
+        default=0,
+    )
+
+
+def save_watermark(export_dir: str | Path, watermark: Dict[str, Any]):
+    """Write the watermark atomically, a crash keeps the previous one."""
+    path = Path(export_dir) / WATERMARK_FILE
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_suffix(path.suffix + ".tmp")
+    tmp_path.write_text(json.dumps(watermark, indent=4), encoding="utf-8")
+    os.replace(tmp_path, path)
+
+
+class BatchWriter:
+    """
+    Splits writes into batch-NNNN.json files of at most batch_size writes,
+    holding only the batch being filled in memory.
+    """
+
+    def __init__(self, folder: Path, batch_size: int = FIRESTORE_BATCH_LIMIT):
+        self.folder = folder
+        self.folder.mkdir(parents=True, exist_ok=True)
+        self.batch_size = batch_size
+        self.batch: Dict[str, List[Any]] = self._empty()
+        self.pending = 0
+        self.files: List[Path] = []
+        self.counts = {"insert": 0, "update": 0, "delete": 0}
+
+    def _empty(self) -> Dict[str, List[Any]]:
+        return {"insert": [], "update": [], "delete": []}
+
+    def add(self, op: str, item: Any):
+        self.batch[op].append(item)
+        self.counts[op] += 1
+        self.pending += 1
+        if self.pending >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        if not self.pending:
+            return
+        path = self.folder / f"batch-{len(self.files) + 1:04d}.json"
+        path.write_text(json.dumps(self.batch, indent=4), encoding="utf-8")
+        self.files.append(path)
+        self.batch = self._empty()
+        self.pending = 0
+
+
+def _unique_folder(export_dir: Path, name: str) -> Path:
+    """export_dir / name, or name-2, name-3... if an export already used it."""
+    folder = export_dir / name
+    n = 1
+    while folder.exists():
+        n += 1
+        folder = export_dir / f"{name}-{n}"
+    return folder
+
+
+def _write_snapshot(path: Path, docs: Iterator[Dict[str, str]]):
+    """Stream the flat [{id, title}] list, the old upload input."""
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("[")
+        for i, doc in enumerate(docs):
+            f.write(("\n" if i == 0 else ",\n") + json.dumps(doc, indent=4))
+        f.write("\n]\n")
+
+
+def export(
+    db: ImageManager,
+    export_dir: str | Path = EXPORT_DIR,
+    full: bool = False,
+    since: Optional[int] = None,
+    batch_size: int = FIRESTORE_BATCH_LIMIT,
+) -> Optional[Dict[str, Any]]:
+    """
+    Write one export folder under export_dir and move the watermark on.
+
+    Args:
+        db: Database to export
+        export_dir: Parent of the export folders and the watermark
+        full: Every plate as an insert, plus the flat snapshot file. Like
+            the old from-scratch upload, this resets the votes
+        since: Export the changes after this version instead of the
+            watermark's, e.g. to redo an upload that failed. Rows count as
+            uploaded if an export up to this version included them
+        batch_size: Writes per batch file
+
+    Returns:
+        The export's summary (also saved as summary.json), None if nothing
+        changed since the watermark
+    """
+    export_dir = Path(export_dir)
+    watermark = load_watermark(export_dir)
+    db.create_table()
+    # Changes after this are left for the next export
+    until = db.current_version()
+    start = 0 if full else watermark["version"] if since is None else since
+    if not full and until <= start:
+        print(f"✅ No changes since version {start}")
+        return None
+
+    kind = "full" if full else "delta"
+    folder = _unique_folder(export_dir, f"{kind}-{start:08d}-{until:08d}")
+    writer = BatchWriter(folder, batch_size)
+    uploaded = uploaded_max_id(watermark, start)
+    max_id = watermark["maxId"]
+    columns = ("id", "fileName", "text", "correctedText")
+    for row in db.iter_changes(start, until, columns=columns):
+        max_id = max(max_id, row["id"])
+        doc = plate_doc(row)
+        if doc is not None:
+            writer.add("insert" if row["id"] > uploaded else "update", doc)
+    if not full:
+        for row in db.iter_deletions(start, until):
+            doc_id = plate_id(row["fileName"])
+            # A row added and deleted since the last upload never got there
+            if row["id"] <= uploaded and doc_id is not None:
+                writer.add("delete", doc_id)
+    writer.flush()
+
+    if full:
+        _write_snapshot(
+            folder / SNAPSHOT_FILE,
+            filter(None, map(plate_doc, db.iter_images(columns=columns))),
+        )
+
+    summary = {
+        "kind": kind,
+        "folder": folder.name,
+        "fromVersion": start,
+        "toVersion": until,
+        **writer.counts,
+        "batches": [path.name for path in writer.files],
+        "exportedAt": datetime.datetime.now().isoformat(timespec="seconds"),
+    }
+    (folder / "summary.json").write_text(json.dumps(summary, indent=4), "utf-8")
+    # Last, so a crash above leaves the watermark where it was
+    history = watermark["history"] + [{"version": until, "maxId": max_id}]
+    save_watermark(
+        export_dir, {"version": until, "maxId": max_id, "history": history}
+    )
+    print(
+        f"✅ {kind} export of versions {start + 1}..{until} to {folder}: "
+        f"{writer.counts['insert']} inserts, {writer.counts['update']} updates, "
+        f"{writer.counts['delete']} deletes in {len(writer.files)} batches"
+    )
+    return summary
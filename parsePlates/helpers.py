@@ -1,12 +1,20 @@
 from collections import Counter
+from functools import lru_cache
+import hashlib
+from itertools import islice
 import math
+import os
+from pathlib import Path
 import random
-from typing import List, Sequence, Tuple
+from typing import Iterable, Iterator, List, Sequence, Tuple
 import cv2
 import numpy as np
 
 from typing import List, Tuple
 
+from pipelineConfig import get_config
+from resourceScheduler import stage
+
 # --- 1. Update the type alias ---------------------------------------------
 Line = List[int]  # e.g., [x1, y1, x2, y2]  (all integers)
 
@@ -18,6 +26,64 @@ PointBox = List[
 ]  # , Tuple[int, int], Tuple[int, int], Tuple[int, int]]
 Boxes = Sequence[Box]  # any iterable of boxes
 
+IMAGE_EXTS = (".jpg", ".jpeg", ".png")
+# Files per chunk when scanning a folder in bounded-memory mode
+SCAN_CHUNK_SIZE = 256
+
+
+def scan_images(
+    folder: Path, exts: Tuple[str, ...] = IMAGE_EXTS, chunk_size: int = SCAN_CHUNK_SIZE
+) -> Iterator[List[Path]]:
+    """
+    Iterate a folder with os.scandir, yielding image paths in chunks.
+
+    Each chunk is sorted by name, but chunks follow directory order, so the
+    folder is never listed into memory as a whole.
+
+    Args:
+    - folder (Path): The folder to scan.
+    - exts (tuple): Lower case extensions to keep.
+    - chunk_size (int): Paths per chunk.
+    """
+    chunk = []
+    with os.scandir(folder) as entries:
+        for entry in entries:
+            if not entry.name.lower().endswith(exts) or not entry.is_file():
+                continue
+            chunk.append(entry.name)
+            if len(chunk) >= chunk_size:
+                yield [Path(folder) / name for name in sorted(chunk)]
+                chunk = []
+    if chunk:
+        yield [Path(folder) / name for name in sorted(chunk)]
+
+
+def chunked(items: Iterable, chunk_size: int = SCAN_CHUNK_SIZE) -> Iterator[list]:
+    """
+    Group any iterable into lists of at most chunk_size items.
+
+    Args:
+    - items (Iterable): The items to group.
+    - chunk_size (int): Items per chunk.
+    """
+    it = iter(items)
+    while chunk := list(islice(it, chunk_size)):
+        yield chunk
+
+
+@lru_cache(maxsize=8)
+def model_version(model_path: str) -> str:
+    """
+    Name and content hash of a model file, e.g. 'plates-v1x.pt@3f2a9c01d4be'.
+    Retraining under the same file name still gives a new version.
+    """
+    path = Path(model_path)
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return f"{path.name}@{digest.hexdigest()[:12]}"
+
 
 def points_to_xyxy(points: PointBox) -> Box:
     """
@@ -143,17 +209,40 @@ def sort_flat_boxes(boxes, ascending=False):
     return sorted(boxes, key=get_line_length, reverse=ascending == False)
 
 
-def find_largest_textbox(img: cv2.typing.MatLike) -> PointBox | None:
-    # Set threshold for Binary Map creation and polygon detection.
-    binThresh = 0.3
-    polyThresh = 0.5
+def sort_boxes_by_area(
+    boxes: Sequence[PointBox], ascending: bool = False
+) -> Tuple[List[PointBox], List[float]]:
+    """Sort the DB detector's quads by polygon area, largest first by default."""
+    areas = [cv2.contourArea(np.asarray(box, dtype=np.float32)) for box in boxes]
+    order = sorted(range(len(boxes)), key=areas.__getitem__, reverse=not ascending)
+    return [boxes[i] for i in order], [areas[i] for i in order]
+
+
+@lru_cache(maxsize=1)
+def _db_text_detector(input_size: int, binThresh: float, polyThresh: float):
+    """
+    The DB text detector, loaded once per process instead of per image.
+    Reloaded only when the pipeline config changes its settings.
+    """
+    # Thresholds for Binary Map creation and polygon detection.
     mean = (122.67891434, 116.66876762, 104.00698793)
     textDetectorDB50 = cv2.dnn_TextDetectionModel_DB("source/DB_TD500_resnet50.onnx")
     textDetectorDB50.setBinaryThreshold(binThresh)
     textDetectorDB50.setPolygonThreshold(polyThresh)
-    textDetectorDB50.setInputParams(1 / 255, (736, 736), mean, True)
+    textDetectorDB50.setInputParams(1 / 255, (input_size, input_size), mean, True)
+    return textDetectorDB50
+
+
+def find_largest_textbox(img: cv2.typing.MatLike) -> PointBox | None:
+    config = get_config()
+    textDetectorDB50 = _db_text_detector(
+        config["db_input_size"],
+        config["db_binary_threshold"],
+        config["db_polygon_threshold"],
+    )
     img = cv2.medianBlur(img, 3)
-    boxes, confidences = textDetectorDB50.detect(img)
+    with stage("db"):
+        boxes, confidences = textDetectorDB50.detect(img)
     # if 1:
     #     for box in boxes:
     #         cv2.polylines(
@@ -0,0 +1,128 @@
+import os
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Callable, Dict, Hashable, Optional
+
+import cv2
+import numpy as np
+
+from metrics import count, span
+
+# e.g. PLATES_IMAGE_CACHE_MB=512, 0 disables the cache
+CACHE_ENV = "PLATES_IMAGE_CACHE_MB"
+DEFAULT_CACHE_MB = 256
+
+_cache = None
+
+
+class ImageCache:
+    """
+    LRU cache of decoded images, bounded by the bytes of the arrays it holds.
+
+    Detection, cropping and OCR all open the same files. Reading through the
+    cache decodes each one once per process. Keys include the file's mtime,
+    size and the decode flags, so a rewritten file or a grayscale read never
+    returns a stale or differently decoded array.
+
+    Cached arrays are shared between callers and marked read-only. Slicing
+    and cv2 operations that return new arrays are fine, in-place edits need
+    a .copy() first.
+    """
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.entries: OrderedDict[Hashable, np.ndarray] = OrderedDict()
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.lock = threading.Lock()
+
+    def get_or_load(
+        self,
+        key: Hashable,
+        loader: Callable[[], Optional[np.ndarray]],
+        name: Optional[str] = None,
+    ) -> Optional[np.ndarray]:
+        """
+        Cached array for key, or the result of loader() which is then cached.
+        None results are never cached. name labels the decode span.
+        """
+        with self.lock:
+            img = self.entries.get(key)
+            if img is not None:
+                self.entries.move_to_end(key)
+                self.hits += 1
+                count("plates_image_cache_total", result="hit")
+                return img
+            self.misses += 1
+        count("plates_image_cache_total", result="miss")
+
+        with span("decode", name):
+            img = loader()
+        if img is None or self.max_bytes <= 0 or img.nbytes > self.max_bytes:
+            return img
+
+        img.setflags(write=False)
+        with self.lock:
+            if key not in self.entries:
+                self.entries[key] = img
+                self.bytes += img.nbytes
+                while self.bytes > self.max_bytes:
+                    _, evicted = self.entries.popitem(last=False)
+                    self.bytes -= evicted.nbytes
+                    self.evictions += 1
+        return img
+
+    def imread(
+        self, path: str | Path, flags: int = cv2.IMREAD_COLOR
+    ) -> Optional[np.ndarray]:
+        """cv2.imread through the cache."""
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return None
+        key = (os.path.abspath(path), stat.st_mtime_ns, stat.st_size, flags)
+        return self.get_or_load(
+            key, lambda: cv2.imread(str(path), flags), os.path.basename(path)
+        )
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.bytes = 0
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "entries": len(self.entries),
+            "bytes": self.bytes,
+            "maxBytes": self.max_bytes,
+        }
+
+    def report(self):
+        lookups = self.hits + self.misses
+        if lookups == 0:
+            return
+        print(
+            f"🖼️ Image cache: {self.hits}/{lookups} hits "
+            f"({self.hits / lookups:.0%}), {self.evictions} evictions, "
+            f"{self.bytes / 1024 / 1024:.1f}/{self.max_bytes / 1024 / 1024:.0f} MiB"
+        )
+
+
+def get_cache() -> ImageCache:
+    """The process wide cache, sized from PLATES_IMAGE_CACHE_MB on first use."""
+    global _cache
+    if _cache is None:
+        mb = float(os.environ.get(CACHE_ENV, DEFAULT_CACHE_MB))
+        _cache = ImageCache(int(mb * 1024 * 1024))
+    return _cache
+
+
+def imread(path: str | Path, flags: int = cv2.IMREAD_COLOR) -> Optional[np.ndarray]:
+    """Drop-in for cv2.imread that goes through the process wide cache."""
+    return get_cache().imread(path, flags)
@@ -1,27 +1,491 @@
-from pathlib import Path
-from LicensePlateProcess import LicensePlateProcess
-from readPlates import read_text, recognize_text
+"""
+Plate pipeline CLI. Every stage imports its framework (torch / ultralytics,
+paddlex) only when it runs, so database and export commands start in a
+fraction of a second.
+
+    python main.py detect [--crop]   # YOLO bounds, or detect + crop in one pass
+    python main.py crop              # crop from the bounds saved by detect
+    python main.py recognize         # DB text detector preprocessing
+    python main.py read              # OCR the cropped plates into the database
+    python main.py reprocess --max-yolo-conf 0.5 --stale-ocr  # re-run a selection
+    python main.py db list|search|file|delete|quarantine|jobs|backup
+    python main.py export            # compact results.jsonl into results.json
+    python main.py firestore [--full] # plate changes as Firestore upload batches
+    python main.py watch             # process images as they are dropped in
+
+Without a command it runs `read`, like main.py always did. --import-time
+reports how long each lazily imported module took to load. --config (or
+PLATES_CONFIG) points at the tuned settings written by benchmarks.tune.
+"""
+
+import time
+
+_started = time.perf_counter()
+
+import argparse  # noqa: E402
+import importlib  # noqa: E402
+import json  # noqa: E402
+import os  # noqa: E402
+import sys  # noqa: E402
+from pathlib import Path  # noqa: E402
+from typing import List, Tuple  # noqa: E402
+
+import metrics  # noqa: E402
+import pipelineConfig  # noqa: E402
+import profiler  # noqa: E402
+import resourceScheduler  # noqa: E402
+
+# Thread budgets have to be exported before torch / paddle are imported
+scheduler = resourceScheduler.configure()
+
+# Use raw strings (r"...") or forward slashes for paths to avoid escape character issues
+MODEL_PATH = r"source/license-plate-finetune-v1x.pt"
+INPUT_FOLDER = Path("source/images/input")
+OUTPUT_PATH = INPUT_FOLDER.parent / "output"
+BOUNDS_FILE = "bounds.json"
+
+# (module, seconds, modules pulled in) for --import-time
+_import_times: List[Tuple[str, float, int]] = []
+
+
+def lazy_import(name: str):
+    """Import a module on first use, recording how long it took."""
+    if name in sys.modules:
+        return sys.modules[name]
+    before = len(sys.modules)
+    started = time.perf_counter()
+    module = importlib.import_module(name)
+    elapsed = time.perf_counter() - started
+    _import_times.append((name, elapsed, len(sys.modules) - before))
+    return module
+
+
+def report_import_times():
+    print(
+        f"🚀 Ready in {_ready - _started:.3f}s, "
+        f"{_startup_modules} modules at startup"
+    )
+    for name, seconds, count in _import_times:
+        print(f"   {seconds:7.3f}s {name} (+{count} modules)")
+
+
+def load_framework(name: str):
+    """Import a heavy framework, then hand it its thread budget."""
+    module = lazy_import(name)
+    scheduler.apply()
+    return module
+
+
+def _db_name() -> str:
+    return lazy_import("readPlates").DB_NAME
+
+
+def _crop_store(args):
+    return args.output / "crops" if args.crop_store else None
+
+
+def cmd_detect(args):
+    if not args.crop:
+        # Detection alone takes no queue, budget or store, don't let a
+        # flag look like it did something
+        ignored = [
+            "--" + name.replace("_", "-")
+            for name, default in args.stage_defaults.items()
+            if getattr(args, name) != default
+        ]
+        if ignored:
+            sys.exit(f"❌ detect without --crop ignores {', '.join(ignored)}")
+    load_framework("ultralytics")
+    LicensePlateProcess = lazy_import("LicensePlateProcess").LicensePlateProcess
+    processor = LicensePlateProcess(model_path=args.model)
+
+    if args.crop:
+        ImageManager = lazy_import("ImageManager").ImageManager
+        processor.run(
+            str(args.input),
+            args.output,
+            queue=ImageManager(_db_name()) if args.queue else None,
+            timeouts={"detect": args.timeout, "crop": args.timeout}
+            if args.timeout
+            else None,
+            db=ImageManager(_db_name()),
+            bounded_memory=args.bounded,
+            crop_store=_crop_store(args),
+        )
+        return
+
+    bounds = processor.detect_plate_bbox(args.input)
+    args.output.mkdir(parents=True, exist_ok=True)
+    with open(args.output / BOUNDS_FILE, "w", encoding="utf-8") as f:
+        json.dump(
+            {
+                name: {
+                    "bbox": [[int(x), int(y)] for x, y in bound["bbox"]],
+                    "confidence": bound["confidence"],
+                }
+                for name, bound in bounds.items()
+            },
+            f,
+            indent=4,
+        )
+    print(f"✅ Saved bounds of {len(bounds)} images to {args.output / BOUNDS_FILE}")
+
+
+def cmd_crop(args):
+    LicensePlateProcess = lazy_import("LicensePlateProcess").LicensePlateProcess
+    # No model, cropping only needs the saved bounds
+    processor = LicensePlateProcess(model_path=None)
+    with open(args.output / BOUNDS_FILE, encoding="utf-8") as f:
+        bounds = json.load(f)
+
+    detected_plates_path = args.output / "detectedPlates"
+    missed_plates_path = args.output / "missedPlates"
+    detected_plates_path.mkdir(parents=True, exist_ok=True)
+    missed_plates_path.mkdir(parents=True, exist_ok=True)
+    crop_store = _crop_store(args)
+    cropped = 0
+    for name, bound in bounds.items():
+        cropped += bool(
+            processor.crop_plate(
+                args.input / name,
+                bound,
+                detected_plates_path,
+                missed_plates_path,
+                str(crop_store) if crop_store else None,
+            )
+        )
+    print(f"✅ Cropped {cropped}/{len(bounds)} plates")
+
+
+def cmd_recognize(args):
+    readPlates = lazy_import("readPlates")
+    (args.output / "bitImages").mkdir(exist_ok=True, parents=True)
+    readPlates.recognize_text(str(args.output / "detectedPlates"))
+
+
+def cmd_read(args):
+    load_framework("paddlex")
+    readPlates = lazy_import("readPlates")
+    readPlates.read_text(
+        str(args.output / "detectedPlates"),
+        use_queue=args.queue,
+        timeout=args.timeout,
+        bounded_memory=args.bounded,
+        crop_store=_crop_store(args),
+    )
+
+
+def cmd_reprocess(args):
+    image_manager = lazy_import("ImageManager")
+    ImageManager = image_manager.ImageManager
+    helpers = lazy_import("helpers")
+    readPlates = lazy_import("readPlates")
+    detect_criteria = dict(
+        max_yolo_confidence=args.max_yolo_conf,
+        detect_model=helpers.model_version(args.model) if args.stale_detect else None,
+        tiers=args.tier,
+    )
+    read_criteria = dict(
+        max_ocr_confidence=args.max_ocr_conf,
+        ocr_model=readPlates.ocr_model_version() if args.stale_ocr else None,
+    )
+    if not any(detect_criteria.values()) and not any(read_criteria.values()):
+        sys.exit("❌ reprocess needs at least one selection option")
+
+    # Only names are kept, the rows stream
+    with ImageManager(_db_name()) as db:
+        db.create_table()
+        to_detect, to_read = [], []
+        for names, criteria in ((to_detect, detect_criteria), (to_read, read_criteria)):
+            if any(criteria.values()):
+                for row in db.select_for_reprocessing(**criteria):
+                    names.append(row["fileName"])
+                    if args.dry_run:
+                        print(json.dumps(dict(row), ensure_ascii=False))
+    # A new crop needs a new read
+    to_read = sorted(set(to_read) | set(to_detect))
+    print(f"🔁 {len(to_detect)} images to detect again, {len(to_read)} to read again")
+    if args.dry_run or not to_read:
+        return
+
+    crop_store = _crop_store(args)
+    if to_detect:
+        load_framework("ultralytics")
+        LicensePlateProcess = lazy_import("LicensePlateProcess").LicensePlateProcess
+        paths = [args.input / name for name in to_detect]
+        LicensePlateProcess(model_path=args.model).run(
+            str(args.input),
+            args.output,
+            db=ImageManager(_db_name()),
+            crop_store=crop_store,
+            paths=[path for path in paths if path.exists()],
+        )
+        # The crop from before is still on disk when the plate is missed
+        # now, reading it would store the old crop's text again
+        with ImageManager(_db_name()) as db:
+            tiers = db.get_crop_tiers(to_detect)
+        cropped = (image_manager.TIER_YOLO, image_manager.TIER_DB_FALLBACK)
+        missed = {name for name in to_detect if tiers.get(name) not in cropped}
+        if missed:
+            print(f"⚠️ {len(missed)} images have no plate crop any more, not read")
+            to_read = [name for name in to_read if name not in missed]
+        if not to_read:
+            return
+
+    load_framework("paddlex")
+    detected = args.output / "detectedPlates"
+    readPlates.read_text(
+        str(detected),
+        timeout=args.timeout,
+        crop_store=crop_store,
+        paths=[detected / name for name in to_read],
+        replace=True,
+    )
+
+
+def cmd_db(args):
+    ImageManager = lazy_import("ImageManager").ImageManager
+    with ImageManager(_db_name()) as db:
+        db.create_table()
+        # Rows are printed as they stream, a large table never sits in memory
+        if args.action == "list":
+            rows = db.iter_images()
+        elif args.action == "search":
+            rows = db.iter_images(text=args.value)
+        elif args.action == "file":
+            rows = db.iter_images(file_name=args.value)
+        elif args.action == "delete":
+            db.delete_by_id(int(args.value))
+            return
+        elif args.action == "quarantine":
+            db.create_quarantine_table()
+            rows = db.get_quarantined(args.value)
+        elif args.action == "jobs":
+            db.create_jobs_table()
+            print(json.dumps(db.job_counts(args.value or "read"), indent=4))
+            return
+        else:
+            db.backup_database()
+            return
+        for row in rows:
+            print(json.dumps(dict(row), ensure_ascii=False))
+
+
+def cmd_export(args):
+    readPlates = lazy_import("readPlates")
+    resultsExporter = lazy_import("resultsExporter")
+    count = resultsExporter.compact(
+        readPlates.RESULTS_LOG_PATH, readPlates.RESULTS_PATH
+    )
+    if count is None:
+        print(f"⚠️ No {readPlates.RESULTS_LOG_PATH} to export")
+    else:
+        print(f"✅ Exported {count} plates to {readPlates.RESULTS_PATH}")
+
+
+def cmd_firestore(args):
+    ImageManager = lazy_import("ImageManager").ImageManager
+    firestoreExport = lazy_import("firestoreExport")
+    with ImageManager(_db_name()) as db:
+        firestoreExport.export(
+            db,
+            args.export_dir or firestoreExport.EXPORT_DIR,
+            full=args.full,
+            since=args.since,
+        )
+
+
+def cmd_watch(args):
+    watchFolder = lazy_import("watchFolder")
+    watchFolder.watch(args.input, args.output, settle=args.settle, poll=args.poll)
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="License plate pipeline")
+    parser.add_argument("--input", type=Path, default=INPUT_FOLDER)
+    parser.add_argument("--output", type=Path, default=OUTPUT_PATH)
+    parser.add_argument(
+        "--import-time", action="store_true", help="Report lazy import times"
+    )
+    parser.add_argument(
+        "--log-level",
+        choices=("debug", "info", "warning", "error"),
+        help="info silences per-row output (PLATES_LOG_LEVEL)",
+    )
+    parser.add_argument(
+        "--config",
+        help=f"Pipeline settings file (PLATES_CONFIG, default "
+        f"{pipelineConfig.DEFAULT_CONFIG_PATH})",
+    )
+    parser.add_argument(
+        "--profile",
+        metavar="MODES",
+        help="cprofile,tracemalloc,sample or all (PLATES_PROFILE)",
+    )
+    parser.add_argument(
+        "--profile-dir", help="Parent of the per-run profile folders"
+    )
+    parser.add_argument(
+        "--metrics-dir",
+        help="Write metrics.prom, metrics.json and trace.jsonl here",
+    )
+    sub = parser.add_subparsers(dest="command")
+
+    # Options shared by the stages that can use the queue / budgets / store,
+    # each stage only takes the ones it honors. The PLATES_* env vars keep
+    # working as defaults.
+    stage_defaults = {
+        "queue": os.environ.get("PLATES_QUEUE") == "1",
+        "timeout": float(os.environ["PLATES_TIMEOUT"])
+        if "PLATES_TIMEOUT" in os.environ
+        else None,
+        "bounded": False,
+        "crop_store": os.environ.get("PLATES_CROP_STORE") == "1",
+    }
+    run_options = argparse.ArgumentParser(add_help=False)
+    run_options.add_argument(
+        "--queue",
+        action="store_true",
+        default=stage_defaults["queue"],
+        help="Lease work from the shared 'jobs' table",
+    )
+    run_options.add_argument(
+        "--bounded", action="store_true", help="Scan in chunks, keep memory flat"
+    )
+    timeout_option = argparse.ArgumentParser(add_help=False)
+    timeout_option.add_argument(
+        "--timeout",
+        type=float,
+        default=stage_defaults["timeout"],
+        help="Per-image budget in seconds, stalled images are quarantined",
+    )
+    store_option = argparse.ArgumentParser(add_help=False)
+    store_option.add_argument(
+        "--crop-store",
+        action="store_true",
+        default=stage_defaults["crop_store"],
+        help="Pack crops into output/crops instead of one file each",
+    )
+    stage_options = [run_options, timeout_option, store_option]
+
+    detect = sub.add_parser(
+        "detect",
+        parents=stage_options,
+        help="Find plates with YOLO",
+        description="The stage options only apply with --crop",
+    )
+    detect.add_argument("--model", default=MODEL_PATH)
+    detect.add_argument("--crop", action="store_true", help="Crop in the same pass")
+    detect.set_defaults(func=cmd_detect, stage_defaults=stage_defaults)
+
+    crop = sub.add_parser(
+        "crop", parents=[store_option], help="Crop from saved bounds"
+    )
+    crop.set_defaults(func=cmd_crop)
+
+    recognize = sub.add_parser("recognize", help="DB text detector preprocessing")
+    recognize.set_defaults(func=cmd_recognize)
+
+    read = sub.add_parser(
+        "read", parents=stage_options, help="OCR the cropped plates"
+    )
+    read.set_defaults(func=cmd_read)
+
+    reprocess = sub.add_parser(
+        "reprocess",
+        parents=[timeout_option, store_option],
+        help="Detect / read again the images an upgrade could change",
+    )
+    reprocess.add_argument("--model", default=MODEL_PATH)
+    reprocess.add_argument(
+        "--max-yolo-conf", type=float, help="Detected with a confidence below this"
+    )
+    reprocess.add_argument(
+        "--max-ocr-conf", type=float, help="Read with a confidence below this"
+    )
+    reprocess.add_argument(
+        "--stale-detect", action="store_true", help="Detected by another --model"
+    )
+    reprocess.add_argument(
+        "--stale-ocr", action="store_true", help="Read by another PaddleX version"
+    )
+    reprocess.add_argument(
+        "--tier",
+        nargs="+",
+        choices=("yolo", "db_fallback", "missed", "no_box"),
+        help="Crop came from (or failed at) one of these tiers",
+    )
+    reprocess.add_argument(
+        "--dry-run", action="store_true", help="Print the selection only"
+    )
+    reprocess.set_defaults(func=cmd_reprocess)
+
+    db = sub.add_parser("db", help="Query or maintain plates.db")
+    db.add_argument(
+        "action",
+        choices=("list", "search", "file", "delete", "quarantine", "jobs", "backup"),
+    )
+    db.add_argument("value", nargs="?", help="Text, file name, id or stage")
+    db.set_defaults(func=cmd_db)
+
+    export = sub.add_parser("export", help="Compact results.jsonl into results.json")
+    export.set_defaults(func=cmd_export)
+
+    firestore = sub.add_parser(
+        "firestore", help="Write plate changes as Firestore upload batches"
+    )
+    firestore.add_argument(
+        "--export-dir", help="Export folders and watermark (source/firestore)"
+    )
+    firestore.add_argument(
+        "--full", action="store_true", help="Every plate, not just the changes"
+    )
+    firestore.add_argument(
+        "--since", type=int, help="Changes after this version, not the watermark"
+    )
+    firestore.set_defaults(func=cmd_firestore)
+
+    watch = sub.add_parser("watch", help="Process images as they are dropped in")
+    watch.add_argument("--settle", type=float, default=2.0)
+    watch.add_argument("--poll", action="store_true")
+    watch.set_defaults(func=cmd_watch)
+    return parser
 
 
 if __name__ == "__main__":
-    # Settings
-    # Use raw strings (r"...") or forward slashes for paths to avoid escape character issues
-    MODEL_PATH = r"source/license-plate-finetune-v1x.pt"
-
-    # Image to process
-    target_folder = Path("source/images/input")
-    target_folder.mkdir(parents=True, exist_ok=True)
-
-    output_path = target_folder.parent / "output"
-
-    cropped_text_output_path = output_path / "bitImages"
-    cropped_text_output_path.mkdir(exist_ok=True, parents=True)
-    detected_plates_path = output_path / "detectedPlates"
-
-    if 1:
-        # Execution
-        # TODO convert to one by one
-        # processor = LicensePlateProcess(model_path=MODEL_PATH)
-        # processor.run(str(target_folder), output_path)
-        # plates = recognize_text(str(detected_plates_path))
-        reads = read_text(str(detected_plates_path))
+    parser = build_parser()
+    args = parser.parse_args()
+    if args.command is None:
+        # Old behaviour: `python main.py` reads the detected plates,
+        # PLATES_WATCH=1 keeps watching the input folder instead
+        command = "watch" if os.environ.get("PLATES_WATCH") == "1" else "read"
+        args = parser.parse_args([*sys.argv[1:], command])
+
+    # Through the environment so StageRunner workers inherit them
+    if args.log_level:
+        os.environ[metrics.LOG_LEVEL_ENV] = args.log_level
+        metrics.set_log_level(args.log_level)
+    if args.metrics_dir:
+        os.environ[metrics.METRICS_DIR_ENV] = args.metrics_dir
+    if args.profile:
+        os.environ[profiler.PROFILE_ENV] = args.profile
+    if args.profile_dir:
+        os.environ[profiler.PROFILE_DIR_ENV] = args.profile_dir
+    if args.config:
+        os.environ[pipelineConfig.CONFIG_ENV] = args.config
+    # Load now so a broken config fails before any model is loaded
+    pipelineConfig.configure()
+
+    _ready = time.perf_counter()
+    _startup_modules = len(sys.modules)
+    if args.command in ("detect", "read", "reprocess", "watch"):
+        scheduler.report()
+    scheduler.apply()
+    try:
+        args.func(args)
+    finally:
+        metrics.export()
+        if metrics.log_enabled("info"):
+            metrics.get_metrics().report()
+        if args.import_time:
+            report_import_times()
@@ -0,0 +1,260 @@
+"""
+Counters, per-stage latency histograms and per-image trace spans.
+
+    with span("ocr", image="plate12.jpg"):
+        ...
+    count("plates_images_total", stage="crop", result="missed")
+    gauge("plates_db_queue_depth", 12)
+
+Stages are decode, yolo, db_fallback, crop, ocr and db_insert. With
+PLATES_METRICS_DIR set, export() writes metrics.prom (Prometheus text
+format) and metrics.json (counts, mean, p50/p95/p99 per stage) there, and
+every span is appended to trace.jsonl as it finishes. Worker processes
+started by StageRunner append to the same trace, their counters stay in
+the worker.
+
+log() replaces the pipeline's prints. PLATES_LOG_LEVEL=info silences the
+per-row output (inserted / skipped / box found), warning or error leave
+only problems. The default, debug, prints everything as before.
+"""
+
+import json
+import os
+import threading
+import time
+from bisect import bisect_left
+from collections import defaultdict
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple
+
+METRICS_DIR_ENV = "PLATES_METRICS_DIR"
+LOG_LEVEL_ENV = "PLATES_LOG_LEVEL"
+LOG_LEVELS = {"debug": 10, "info": 20, "warning": 30, "error": 40}
+
+# Upper bounds in seconds, from a cached decode to a stalled OCR call
+BUCKETS = (
+    0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0,
+)  # fmt: skip
+
+_metrics = None
+_log_level = LOG_LEVELS.get(os.environ.get(LOG_LEVEL_ENV, "debug"), 10)
+
+Labels = Tuple[Tuple[str, str], ...]
+
+
+class Histogram:
+    """Cumulative-bucket histogram, the layout Prometheus expects."""
+
+    def __init__(self):
+        self.buckets = [0] * (len(BUCKETS) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, seconds: float):
+        self.buckets[bisect_left(BUCKETS, seconds)] += 1
+        self.count += 1
+        self.sum += seconds
+
+    def quantile(self, q: float) -> float:
+        """Estimate, interpolating linearly inside the bucket that holds q."""
+        if self.count == 0:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for i, in_bucket in enumerate(self.buckets):
+            if seen + in_bucket >= rank and in_bucket:
+                lower = BUCKETS[i - 1] if i > 0 else 0.0
+                upper = BUCKETS[i] if i < len(BUCKETS) else BUCKETS[-1]
+                return lower + (upper - lower) * (rank - seen) / in_bucket
+            seen += in_bucket
+        return BUCKETS[-1]
+
+
+class Metrics:
+    """Process wide registry. Thread safe, spans can come from any thread."""
+
+    def __init__(self, trace_path: Optional[str | Path] = None):
+        self.counters: Dict[Tuple[str, Labels], float] = defaultdict(float)
+        # Last value wins, e.g. a queue's depth
+        self.gauges: Dict[Tuple[str, Labels], float] = {}
+        self.histograms: Dict[str, Histogram] = defaultdict(Histogram)
+        self.lock = threading.Lock()
+        self.trace = None
+        if trace_path is not None:
+            Path(trace_path).parent.mkdir(parents=True, exist_ok=True)
+            self.trace = open(trace_path, "a", encoding="utf-8", buffering=1)
+
+    def count(self, name: str, value: float = 1, **labels: str):
+        key = (name, tuple(sorted(labels.items())))
+        with self.lock:
+            self.counters[key] += value
+
+    def gauge(self, name: str, value: float, **labels: str):
+        key = (name, tuple(sorted(labels.items())))
+        with self.lock:
+            self.gauges[key] = value
+
+    def observe(
+        self,
+        stage: str,
+        seconds: float,
+        image: Optional[str] = None,
+        error: Optional[str] = None,
+    ):
+        """Record one stage duration, and its trace span if tracing."""
+        with self.lock:
+            self.histograms[stage].observe(seconds)
+            if error is not None:
+                self.counters[("plates_stage_errors_total", (("stage", stage),))] += 1
+            if self.trace is not None:
+                self.trace.write(
+                    json.dumps(
+                        {
+                            "stage": stage,
+                            "image": image,
+                            "start": time.time() - seconds,
+                            "seconds": seconds,
+                            "pid": os.getpid(),
+                            "error": error,
+                        }
+                    )
+                    + "\n"
+                )
+
+    @contextmanager
+    def span(self, stage: str, image: Optional[str] = None):
+        started = time.perf_counter()
+        error = None
+        try:
+            yield
+        except BaseException as e:
+            error = f"{type(e).__name__}: {e}"
+            raise
+        finally:
+            self.observe(stage, time.perf_counter() - started, image, error)
+
+    def summary(self) -> Dict[str, Any]:
+        with self.lock:
+            stages = {
+                stage: {
+                    "count": hist.count,
+                    "seconds": hist.sum,
+                    "mean": hist.sum / hist.count if hist.count else 0.0,
+                    "p50": hist.quantile(0.50),
+                    "p95": hist.quantile(0.95),
+                    "p99": hist.quantile(0.99),
+                }
+                for stage, hist in self.histograms.items()
+            }
+            counters = [
+                {"name": name, "labels": dict(labels), "value": value}
+                for (name, labels), value in sorted(self.counters.items())
+            ]
+            gauges = [
+                {"name": name, "labels": dict(labels), "value": value}
+                for (name, labels), value in sorted(self.gauges.items())
+            ]
+        return {"stages": stages, "counters": counters, "gauges": gauges}
+
+    def to_prometheus(self) -> str:
+        lines = [
+            "# HELP plates_stage_seconds Time spent per image in each pipeline stage",
+            "# TYPE plates_stage_seconds histogram",
+        ]
+        with self.lock:
+            for stage, hist in sorted(self.histograms.items()):
+                cumulative = 0
+                for bound, in_bucket in zip((*BUCKETS, "+Inf"), hist.buckets):
+                    cumulative += in_bucket
+                    lines.append(
+                        f'plates_stage_seconds_bucket{{stage="{stage}",le="{bound}"}} '
+                        f"{cumulative}"
+                    )
+                lines.append(f'plates_stage_seconds_sum{{stage="{stage}"}} {hist.sum}')
+                lines.append(f'plates_stage_seconds_count{{stage="{stage}"}} {hist.count}')
+
+            typed = set()
+            for (name, labels), value in sorted(self.counters.items()):
+                if name not in typed:
+                    lines.append(f"# TYPE {name} counter")
+                    typed.add(name)
+                label_text = ",".join(f'{key}="{val}"' for key, val in labels)
+                lines.append(f"{name}{{{label_text}}} {value:g}")
+
+            for (name, labels), value in sorted(self.gauges.items()):
+                if name not in typed:
+                    lines.append(f"# TYPE {name} gauge")
+                    typed.add(name)
+                label_text = ",".join(f'{key}="{val}"' for key, val in labels)
+                lines.append(f"{name}{{{label_text}}} {value:g}")
+        return "\n".join(lines) + "\n"
+
+    def export(self, folder: str | Path):
+        """Write metrics.prom and metrics.json atomically into folder."""
+        folder = Path(folder)
+        folder.mkdir(parents=True, exist_ok=True)
+        for name, text in (
+            ("metrics.prom", self.to_prometheus()),
+            ("metrics.json", json.dumps(self.summary(), indent=4)),
+        ):
+            tmp_path = folder / f"{name}.tmp"
+            tmp_path.write_text(text, encoding="utf-8")
+            os.replace(tmp_path, folder / name)
+
+    def report(self):
+        """Print where the time went, slowest stage first."""
+        stages = self.summary()["stages"]
+        for stage, info in sorted(stages.items(), key=lambda kv: -kv[1]["seconds"]):
+            print(
+                f"📊 {stage}: {info['count']} spans, {info['seconds']:.2f}s total, "
+                f"mean={info['mean']:.3f}s p95≈{info['p95']:.3f}s"
+            )
+
+    def close(self):
+        if self.trace is not None:
+            self.trace.close()
+            self.trace = None
+
+
+def get_metrics() -> Metrics:
+    """The process wide registry, tracing into PLATES_METRICS_DIR if set."""
+    global _metrics
+    if _metrics is None:
+        folder = os.environ.get(METRICS_DIR_ENV)
+        _metrics = Metrics(Path(folder) / "trace.jsonl" if folder else None)
+    return _metrics
+
+
+def span(stage: str, image: Optional[str] = None):
+    return get_metrics().span(stage, image)
+
+
+def count(name: str, value: float = 1, **labels: str):
+    get_metrics().count(name, value, **labels)
+
+
+def gauge(name: str, value: float, **labels: str):
+    get_metrics().gauge(name, value, **labels)
+
+
+def export():
+    """Write the exporters' files if PLATES_METRICS_DIR is set."""
+    folder = os.environ.get(METRICS_DIR_ENV)
+    if folder:
+        get_metrics().export(folder)
+
+
+def set_log_level(level: str):
+    global _log_level
+    _log_level = LOG_LEVELS[level]
+
+
+def log_enabled(level: str) -> bool:
+    return LOG_LEVELS[level] >= _log_level
+
+
+def log(message: str, level: str = "info"):
+    """print() that respects PLATES_LOG_LEVEL."""
+    if LOG_LEVELS[level] >= _log_level:
+        print(message)
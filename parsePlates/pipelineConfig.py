@@ -0,0 +1,85 @@
+"""
+Tunable pipeline settings, loaded once per process from a JSON file.
+
+    PLATES_CONFIG=source/pipeline.json python main.py detect --crop
+    python main.py --config source/pipeline.json read
+
+The file only needs the keys it changes, everything else keeps the
+defaults below (the values the pipeline always used). benchmarks.tune
+writes this file from a sweep over labelled images.
+"""
+
+import json
+import os
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+CONFIG_ENV = "PLATES_CONFIG"
+DEFAULT_CONFIG_PATH = "source/pipeline.json"
+
+DEFAULTS: Dict[str, Any] = {
+    # YOLO input size and images per inference call in detect_plate_bbox
+    "yolo_imgsz": 640,
+    "yolo_batch": 10,
+    # Detections below this confidence are re-located with the DB detector
+    "fallback_confidence": 0.7,
+    # Width plate crops are resized to before OCR
+    "crop_width": 768,
+    # DB text detector input size and thresholds in find_largest_textbox
+    "db_input_size": 736,
+    "db_binary_threshold": 0.3,
+    "db_polygon_threshold": 0.5,
+    # Height tolerance when grouping OCR boxes into the plate's text line
+    "ocr_rel_tol": 0.2,
+}
+
+_config = None
+
+
+def load_config(path: Optional[str | Path] = None) -> Dict[str, Any]:
+    """
+    DEFAULTS overridden by the file at path, PLATES_CONFIG or
+    source/pipeline.json. A missing default file is fine, a missing
+    explicit one or an unknown key is an error.
+    """
+    explicit = path or os.environ.get(CONFIG_ENV)
+    path = Path(explicit or DEFAULT_CONFIG_PATH)
+    config = dict(DEFAULTS)
+    if not path.exists():
+        if explicit:
+            raise FileNotFoundError(f"Pipeline config not found: {path}")
+        return config
+
+    with open(path, encoding="utf-8") as f:
+        overrides = json.load(f)
+    unknown = set(overrides) - set(DEFAULTS)
+    if unknown:
+        raise ValueError(f"Unknown keys in {path}: {', '.join(sorted(unknown))}")
+    for key, value in overrides.items():
+        # Keep ints ints, a tuned 0.65 threshold stays a float
+        config[key] = type(DEFAULTS[key])(value)
+    return config
+
+
+def configure(config: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """Install the process wide settings, loaded from the config file if None."""
+    global _config
+    _config = {**DEFAULTS, **config} if config is not None else load_config()
+    return _config
+
+
+def get_config() -> Dict[str, Any]:
+    """The process wide settings, loaded on first use."""
+    if _config is None:
+        return configure()
+    return _config
+
+
+def save_config(config: Dict[str, Any], path: str | Path):
+    """Write the keys that differ from DEFAULTS, atomically."""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    changed = {key: value for key, value in config.items() if DEFAULTS[key] != value}
+    tmp_path = path.with_suffix(path.suffix + ".tmp")
+    tmp_path.write_text(json.dumps(changed, indent=4), encoding="utf-8")
+    os.replace(tmp_path, path)
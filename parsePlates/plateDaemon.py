@@ -0,0 +1,296 @@
+"""
+Long-running worker that keeps the YOLO model, the DB text detector and the
+PaddleX OCR pipeline loaded between jobs.
+
+    python plateDaemon.py serve                # start the warm worker
+    python plateDaemon.py submit <image|folder> # detect, crop and read
+    python plateDaemon.py ping | stop
+
+submit sends the job over a Unix socket to a running daemon. If none is
+running (or the OS has no Unix sockets) it loads the models and runs the
+job in-process. Either way it prints the same JSON. Jobs are handled one at
+a time, the models aren't safe to share between threads.
+"""
+
+import argparse
+import json
+import os
+import socket
+import socketserver
+import sys
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import metrics
+import resourceScheduler
+
+# Relative paths, like the rest of the pipeline, resolve from the
+# daemon's working directory
+MODEL_PATH = "source/license-plate-finetune-v1x.pt"
+OUTPUT_PATH = "source/images/output"
+SOCKET_ENV = "PLATES_SOCKET"
+SOCKET_PATH = os.environ.get(SOCKET_ENV, "source/plates.sock")
+
+
+class PlateWorker:
+    """The loaded models and database, plus the per-job pipeline."""
+
+    def __init__(self, model_path: str = MODEL_PATH, db_name: Optional[str] = None):
+        # Heavy imports happen here so the client side stays fast
+        from ImageManager import ImageManager
+        from LicensePlateProcess import LicensePlateProcess
+        from plateIndex import PlateIndex
+        from readPlates import DB_NAME, _create_ocr, _ocr_plate, ocr_model_version
+
+        started = time.perf_counter()
+        self.processor = LicensePlateProcess(model_path=model_path)
+        self.ocr = _create_ocr()
+        self.ocr_plate = _ocr_plate
+        self.ocr_model = ocr_model_version()
+        self.db = ImageManager(db_name or DB_NAME)
+        self.db.create_table()
+        self.plate_index = PlateIndex.from_db(self.db)
+        self.load_seconds = time.perf_counter() - started
+        print(f"🔥 Models loaded in {self.load_seconds:.1f}s")
+
+    def run(
+        self,
+        target: str | Path | List[str | Path],
+        output_path: str | Path = OUTPUT_PATH,
+        replace: bool = False,
+    ) -> List[Dict[str, Any]]:
+        """
+        Detect, crop and read one image, a list of images or every image in
+        a folder, storing new plates in the database. With replace, images
+        that already have a record get their text updated.
+
+        Returns:
+            One {'fileName', 'detected', 'text', 'rowId', 'suggestion'} dict
+            per image, suggestion being the nearest corrected plate to the text
+        """
+        from helpers import IMAGE_EXTS
+
+        output_path = Path(output_path)
+        if isinstance(target, list):
+            images = [Path(path) for path in target]
+        elif (target := Path(target)).is_dir():
+            images = sorted(
+                path for path in target.iterdir() if path.suffix.lower() in IMAGE_EXTS
+            )
+        elif target.is_file():
+            images = [target]
+        else:
+            raise FileNotFoundError(f"No such image or folder: {target}")
+
+        detected_plates_path = output_path / "detectedPlates"
+        missed_plates_path = output_path / "missedPlates"
+        reads_path = output_path / "reads"
+        detected_plates_path.mkdir(parents=True, exist_ok=True)
+        missed_plates_path.mkdir(parents=True, exist_ok=True)
+
+        # Corrections made on the site since the last job
+        self.plate_index.refresh(self.db)
+        bounds = self.processor.detect_plate_bbox([str(path) for path in images])
+        results = []
+        for img_path in images:
+            result = {
+                "fileName": img_path.name,
+                "detected": False,
+                "text": None,
+                "rowId": None,
+                "suggestion": None,
+            }
+            bound = bounds.get(img_path.name)
+            tier = None
+            if bound is not None:
+                tier = self.processor.crop_plate(
+                    img_path, bound, detected_plates_path, missed_plates_path
+                )
+            if tier is not None:
+                result["detected"] = True
+                reads = self.ocr_plate(
+                    self.ocr, detected_plates_path / img_path.name, reads_path
+                )
+                if reads:
+                    text, _, confidence = reads[0]
+                    result["text"] = text
+                    result["suggestion"] = self.plate_index.suggest(text)
+                    row_id = self.db.insert(
+                        text,
+                        img_path.name,
+                        ocr_confidence=confidence,
+                        ocr_model=self.ocr_model,
+                    )
+                    if not row_id and replace:
+                        row_id = self.db.update_text(
+                            img_path.name, text, confidence, self.ocr_model
+                        )
+                    result["rowId"] = row_id or None
+            # Last, so an image with a detections row was fully handled
+            # and watch-folder catch-up can skip it
+            self.processor.record_detection(self.db, img_path.name, bound, tier)
+            results.append(result)
+        return results
+
+    def handle(self, request: Dict[str, Any]) -> Dict[str, Any]:
+        """Answer one decoded request."""
+        command = request.get("command")
+        if command == "ping":
+            return {"ok": True, "pid": os.getpid(), "loadSeconds": self.load_seconds}
+        if command == "process":
+            started = time.perf_counter()
+            results = self.run(request["path"], request.get("output", OUTPUT_PATH))
+            # Keep the exported metrics current for a scraper
+            metrics.export()
+            return {
+                "ok": True,
+                "mode": "daemon",
+                "results": results,
+                "elapsed": time.perf_counter() - started,
+            }
+        return {"ok": False, "error": f"Unknown command: {command}"}
+
+
+class _RequestHandler(socketserver.StreamRequestHandler):
+    """One JSON line in, one JSON line out."""
+
+    def handle(self):
+        try:
+            request = json.loads(self.rfile.readline())
+            if request.get("command") == "stop":
+                self.server.stopping = True
+                response = {"ok": True}
+            else:
+                response = self.server.worker.handle(request)
+        except Exception as e:
+            response = {"ok": False, "error": f"{type(e).__name__}: {e}"}
+        self.wfile.write(json.dumps(response).encode("utf-8") + b"\n")
+
+
+def serve(
+    socket_path: str = SOCKET_PATH,
+    model_path: str = MODEL_PATH,
+    db_name: Optional[str] = None,
+):
+    """Load everything once, then answer jobs until a 'stop' request."""
+    if not hasattr(socket, "AF_UNIX"):
+        sys.exit("❌ Unix sockets are not available on this platform")
+    if submit({"command": "ping"}, socket_path) is not None:
+        sys.exit(f"❌ A daemon is already listening on {socket_path}")
+    # Left behind by a daemon that didn't shut down cleanly
+    if os.path.exists(socket_path):
+        os.unlink(socket_path)
+
+    scheduler = resourceScheduler.configure()
+    worker = PlateWorker(model_path, db_name)
+    scheduler.apply()
+    scheduler.report()
+
+    server = socketserver.UnixStreamServer(socket_path, _RequestHandler)
+    os.chmod(socket_path, 0o600)
+    server.worker = worker
+    server.stopping = False
+    print(f"✅ Listening on {socket_path}")
+    try:
+        while not server.stopping:
+            server.handle_request()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        os.unlink(socket_path)
+        print("👋 Daemon stopped")
+
+
+def submit(
+    request: Dict[str, Any],
+    socket_path: str = SOCKET_PATH,
+    timeout: Optional[float] = None,
+) -> Optional[Dict[str, Any]]:
+    """
+    Send a request to the daemon.
+
+    Returns:
+        The decoded response, or None if no daemon is listening
+    """
+    if not hasattr(socket, "AF_UNIX"):
+        return None
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    sock.settimeout(timeout)
+    try:
+        sock.connect(socket_path)
+    except (FileNotFoundError, ConnectionRefusedError):
+        sock.close()
+        return None
+
+    with sock, sock.makefile("rwb") as stream:
+        stream.write(json.dumps(request).encode("utf-8") + b"\n")
+        stream.flush()
+        return json.loads(stream.readline())
+
+
+def process(
+    path: str | Path,
+    output_path: str | Path = OUTPUT_PATH,
+    socket_path: str = SOCKET_PATH,
+    fallback: bool = True,
+) -> Dict[str, Any]:
+    """Run a job on the daemon if one is up, otherwise in this process."""
+    request = {
+        "command": "process",
+        # The daemon may run from another directory
+        "path": str(Path(path).absolute()),
+        "output": str(Path(output_path).absolute()),
+    }
+    response = submit(request, socket_path)
+    if response is not None or not fallback:
+        return response or {"ok": False, "error": f"No daemon on {socket_path}"}
+
+    print("🐢 No daemon running, loading models in-process", file=sys.stderr)
+    scheduler = resourceScheduler.configure()
+    worker = PlateWorker()
+    scheduler.apply()
+    started = time.perf_counter()
+    results = worker.run(path, output_path)
+    return {
+        "ok": True,
+        "mode": "in-process",
+        "results": results,
+        "elapsed": time.perf_counter() - started,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Warm plate detection / OCR worker")
+    parser.add_argument("--socket", default=SOCKET_PATH)
+    sub = parser.add_subparsers(dest="command", required=True)
+    serve_cmd = sub.add_parser("serve", help="Load the models and wait for jobs")
+    serve_cmd.add_argument("--model", default=MODEL_PATH)
+    serve_cmd.add_argument("--db", help="Database file, readPlates.DB_NAME by default")
+    submit_cmd = sub.add_parser("submit", help="Process an image or a folder")
+    submit_cmd.add_argument("path")
+    submit_cmd.add_argument("--output", default=OUTPUT_PATH)
+    submit_cmd.add_argument(
+        "--no-fallback", action="store_true", help="Fail instead of running in-process"
+    )
+    sub.add_parser("ping", help="Check whether a daemon is running")
+    sub.add_parser("stop", help="Stop the running daemon")
+    args = parser.parse_args()
+
+    if args.command == "serve":
+        serve(args.socket, args.model, args.db)
+        return
+
+    if args.command == "submit":
+        response = process(args.path, args.output, args.socket, not args.no_fallback)
+    else:
+        response = submit({"command": args.command}, args.socket)
+        if response is None:
+            response = {"ok": False, "error": f"No daemon on {args.socket}"}
+    print(json.dumps(response, indent=4))
+    sys.exit(0 if response.get("ok") else 1)
+
+
+if __name__ == "__main__":
+    main()
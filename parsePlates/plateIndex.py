@@ -0,0 +1,284 @@
+"""
+In-memory fuzzy index of known plate texts for correction suggestions.
+
+    index = PlateIndex.from_db(db)
+    index.suggest("ABC 12B")        # {'plate': 'ABC 128', 'distance': 1, ...}
+    index.add("XYZ 99Q", "XYZ 999")  # a row corrected since the index was built
+    index.refresh(db)               # every row corrected since, by version
+
+Plates are short (6-8 characters), so the index is on bigrams, not
+trigrams. With trigrams, a plate that is two edits away from a known one
+can share a single gram with it, which filters almost nothing. Each
+posting list is an array('i') of entry ids. A lookup counts the shared
+bigrams with one numpy bincount over the query's posting lists. Entries
+that share enough of them then go through a vectorised character-count
+bound, and only the few that are left get a banded Levenshtein distance.
+At 100k plates a lookup takes about 0.3ms, and p95 stays under 1ms
+(python -m benchmarks.fuzzy).
+
+Only hand-corrected plates are indexed. A row's correctedText is indexed
+as itself, and its OCR text is indexed pointing at the correction, so a
+read that repeats an old mistake suggests the fix for it. OCR reads that
+nobody corrected are left out, so a suggestion is always a verified plate
+and never another unchecked read. This also keeps the index the size of
+the corrections, not of every plate read.
+
+A long running reader (the daemon, watch mode, read_text) calls refresh()
+before each job. It indexes the rows changed since the database version
+the index last saw (see ImageManager.create_table), so corrections made
+on the site reach suggestions without a restart.
+"""
+
+from array import array
+from collections import defaultdict
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+GRAM_SIZE = 2
+DEFAULT_MAX_DISTANCE = 2
+# Histogram slot per character: digits, letters, then one for anything else
+ALPHABET = {c: i for i, c in enumerate("0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZ")}
+OTHER_SLOT = len(ALPHABET)
+
+
+def normalize(text: Optional[str]) -> str:
+    """Plate text as compared: upper case letters and digits only."""
+    return "".join(c for c in (text or "").upper() if c.isalnum())
+
+
+def grams(key: str) -> set:
+    padded = f"${key}$"
+    return {padded[i : i + GRAM_SIZE] for i in range(len(padded) - GRAM_SIZE + 1)}
+
+
+def histogram(key: str) -> np.ndarray:
+    counts = np.zeros(OTHER_SLOT + 1, dtype=np.int16)
+    for c in key:
+        counts[ALPHABET.get(c, OTHER_SLOT)] += 1
+    return counts
+
+
+def bounded_distance(a: str, b: str, max_distance: int) -> int:
+    """
+    Levenshtein distance of a and b, or max_distance + 1 as soon as it is
+    certain to be larger. Only cells within max_distance of the diagonal
+    are computed.
+    """
+    too_far = max_distance + 1
+    if abs(len(a) - len(b)) > max_distance:
+        return too_far
+    # A shared prefix or suffix doesn't change the distance, and for a
+    # near match it leaves only a character or two to compare
+    start = 0
+    shortest = min(len(a), len(b))
+    while start < shortest and a[start] == b[start]:
+        start += 1
+    end = 0
+    while end < shortest - start and a[-1 - end] == b[-1 - end]:
+        end += 1
+    a = a[start : len(a) - end]
+    b = b[start : len(b) - end]
+    if len(a) > len(b):
+        a, b = b, a
+    if not a:
+        return len(b) if len(b) <= max_distance else too_far
+
+    previous = list(range(len(b) + 1))
+    for i, ca in enumerate(a, start=1):
+        low = max(1, i - max_distance)
+        high = min(len(b), i + max_distance)
+        current = [too_far] * (len(b) + 1)
+        current[0] = i
+        best = i if low == 1 else too_far
+        left = current[low - 1]
+        for j in range(low, high + 1):
+            value = previous[j - 1] + (ca != b[j - 1])
+            if previous[j] + 1 < value:
+                value = previous[j] + 1
+            if left + 1 < value:
+                value = left + 1
+            current[j] = left = value
+            if value < best:
+                best = value
+        if best > max_distance:
+            return too_far
+        previous = current
+    return min(previous[-1], too_far)
+
+
+class PlateIndex:
+    """
+    Bigram inverted index over normalized plate texts.
+
+    Each entry is a normalized key, a correction or the OCR read it
+    replaced, and the corrected plate it suggests. A key keeps the first
+    correction it was learned from.
+    """
+
+    def __init__(self, max_distance: int = DEFAULT_MAX_DISTANCE):
+        self.max_distance = max_distance
+        self.keys: List[str] = []
+        self.plates: List[str] = []
+        self.seen: List[int] = []
+        # Database change counter the index is current with, see refresh
+        self.version = 0
+        self.ids: Dict[str, int] = {}
+        self.postings: Dict[str, array] = defaultdict(lambda: array("i"))
+        # Character counts per entry, grown by doubling
+        self.histograms = np.zeros((1024, OTHER_SLOT + 1), dtype=np.int16)
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    def add(
+        self, text: Optional[str], corrected_text: Optional[str] = None
+    ) -> Optional[int]:
+        """
+        Index one row's correction and the OCR text it replaced. Returns the
+        id of the correction's entry, None for a row nobody corrected, which
+        isn't indexed.
+        """
+        plate = (corrected_text or "").strip()
+        if not plate:
+            return None
+        target = self._put(normalize(plate), plate)
+        key = normalize(text)
+        if key and target is not None:
+            self._put(key, plate)
+        return target
+
+    def _put(self, key: str, plate: str) -> Optional[int]:
+        if not key:
+            return None
+        entry = self.ids.get(key)
+        if entry is not None:
+            self.seen[entry] += 1
+            return entry
+
+        entry = len(self.keys)
+        self.ids[key] = entry
+        self.keys.append(key)
+        self.plates.append(plate)
+        self.seen.append(1)
+        if entry == len(self.histograms):
+            self.histograms = np.concatenate(
+                (self.histograms, np.zeros_like(self.histograms))
+            )
+        self.histograms[entry] = histogram(key)
+        for gram in grams(key):
+            self.postings[gram].append(entry)
+        return entry
+
+    def lookup(
+        self, text: str, max_distance: Optional[int] = None, limit: int = 5
+    ) -> List[dict]:
+        """
+        The closest corrected plates to text, nearest first. Ties go to the
+        most often seen.
+        """
+        max_distance = self.max_distance if max_distance is None else max_distance
+        key = normalize(text)
+        if not key:
+            return []
+        entry = self.ids.get(key)
+        if entry is not None and limit == 1:
+            return [self._match(entry, 0)]
+
+        query = grams(key)
+        lists = [
+            np.frombuffer(self.postings[gram], dtype=np.int32)
+            for gram in query
+            if gram in self.postings
+        ]
+        if not lists:
+            return []
+        shared = np.bincount(np.concatenate(lists))
+        # Every edit breaks at most GRAM_SIZE of the query's grams
+        needed = max(1, len(query) - GRAM_SIZE * max_distance)
+        candidates = np.flatnonzero(shared >= needed)
+        # An edit changes the character counts by at most 2 in total, a
+        # cheap vectorised bound that drops most candidates before the
+        # per-entry distance
+        differences = np.abs(self.histograms[candidates] - histogram(key)).sum(axis=1)
+        candidates = candidates[differences <= 2 * max_distance]
+        # Most shared grams first, so a close match is found early
+        candidates = candidates[np.argsort(-shared[candidates], kind="stable")]
+
+        # Best (distance, entry) per suggested plate, an OCR key and its
+        # correction shouldn't both take a slot
+        best: Dict[str, Tuple[int, int]] = {}
+        bound = max_distance
+        for entry, count in zip(candidates.tolist(), shared[candidates].tolist()):
+            # The fewest edits that could explain the missing grams
+            if -(-(len(query) - count) // GRAM_SIZE) > bound:
+                break
+            distance = bounded_distance(key, self.keys[entry], bound)
+            if distance > bound:
+                continue
+            plate = self.plates[entry]
+            if plate not in best or self._rank((distance, entry)) < self._rank(
+                best[plate]
+            ):
+                best[plate] = (distance, entry)
+            if len(best) >= limit:
+                bound = sorted(best.values(), key=self._rank)[limit - 1][0]
+        matches = sorted(best.values(), key=self._rank)[:limit]
+        return [self._match(entry, distance) for distance, entry in matches]
+
+    def suggest(self, text: str, max_distance: Optional[int] = None) -> Optional[dict]:
+        """The nearest corrected plate to an OCR read, or None."""
+        matches = self.lookup(text, max_distance, limit=1)
+        return matches[0] if matches else None
+
+    def _rank(self, match: Tuple[int, int]):
+        distance, entry = match
+        return (distance, -self.seen[entry])
+
+    def _match(self, entry: int, distance: int) -> dict:
+        return {
+            "plate": self.plates[entry],
+            "distance": distance,
+            "seen": self.seen[entry],
+        }
+
+    @classmethod
+    def from_rows(
+        cls,
+        rows: Iterable[Tuple[Optional[str], Optional[str]]],
+        max_distance: int = DEFAULT_MAX_DISTANCE,
+    ) -> "PlateIndex":
+        """Build from (text, correctedText) pairs, skipping uncorrected ones."""
+        index = cls(max_distance)
+        for text, corrected_text in rows:
+            index.add(text, corrected_text)
+        return index
+
+    def refresh(self, db) -> int:
+        """
+        Index the rows of an ImageManager changed since the last refresh (or
+        since from_db). Uncorrected rows are skipped as in add().
+
+        Returns:
+            Number of corrected rows added
+        """
+        until = db.current_version()
+        if until <= self.version:
+            return 0
+        added = 0
+        columns = ("text", "correctedText")
+        for row in db.iter_changes(self.version, until, columns=columns):
+            if self.add(row["text"], row["correctedText"]) is not None:
+                added += 1
+        self.version = until
+        return added
+
+    @classmethod
+    def from_db(cls, db, max_distance: int = DEFAULT_MAX_DISTANCE) -> "PlateIndex":
+        """Build from the corrected rows of an ImageManager's 'images' table."""
+        # Taken first, a row corrected during the build is picked up by the
+        # next refresh
+        version = db.current_version()
+        index = cls.from_rows(db.get_plate_texts(corrected_only=True), max_distance)
+        index.version = version
+        return index
@@ -0,0 +1,273 @@
+"""
+Opt-in profiling of pipeline stages.
+
+    PLATES_PROFILE=cprofile,tracemalloc,sample python main.py read
+    python main.py --profile all read
+
+Stages are the functions decorated with @profiled (run / detect / crop,
+read_text / ocr, recognize_text and the ImageManager queries) or blocks
+wrapped in profile_stage(). cProfile stages are exclusive: while a db query
+inside read_text runs, its time goes to 'db', not 'read'.
+
+- cprofile:    one cProfile per stage, dumped as <stage>-<pid>.prof
+- tracemalloc: snapshots at the boundaries of top-level stages, the
+               biggest allocation differences go into the summary
+- sample:      a thread samples every thread's stack, written as
+               stacks-<pid>.collapsed for flamegraph.pl / speedscope
+
+Everything goes into one directory per run under PLATES_PROFILE_DIR, with
+summary-<pid>.json / .txt listing the top functions and allocations per
+stage. StageRunner workers inherit the run directory and add their own
+files. With PLATES_PROFILE unset the decorators cost one function call.
+"""
+
+import atexit
+import contextlib
+import cProfile
+import functools
+import json
+import os
+import pstats
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter, defaultdict
+from contextlib import contextmanager, nullcontext
+from pathlib import Path
+from typing import Dict, List, Optional
+
+PROFILE_ENV = "PLATES_PROFILE"
+PROFILE_DIR_ENV = "PLATES_PROFILE_DIR"
+# Set by the first process so workers write into the same run directory
+RUN_DIR_ENV = "PLATES_PROFILE_RUN_DIR"
+DEFAULT_PROFILE_DIR = "source/profiles"
+MODES = ("cprofile", "tracemalloc", "sample")
+SAMPLE_INTERVAL = 0.005
+TOP_N = 15
+# The profiler's own allocations, the snapshots and the stage() context
+# manager, are left out of the per-stage summary
+IGNORED_ALLOCATION_FILES = (tracemalloc.__file__, __file__, contextlib.__file__)
+
+_session = None
+_configured = False
+_session_lock = threading.Lock()
+
+
+class ProfileSession:
+    def __init__(
+        self, modes: List[str], run_dir: Path, interval: float = SAMPLE_INTERVAL
+    ):
+        self.modes = set(modes)
+        self.run_dir = run_dir
+        self.run_dir.mkdir(parents=True, exist_ok=True)
+        self.profiles: Dict[str, cProfile.Profile] = defaultdict(cProfile.Profile)
+        self.calls: Counter = Counter()
+        self.seconds: Dict[str, float] = defaultdict(float)
+        self.allocations: Dict[str, Counter] = defaultdict(Counter)
+        self.peak_memory: Dict[str, int] = defaultdict(int)
+        # Stage stack per thread id, read by the sampler
+        self.stacks: Dict[int, List[str]] = {}
+        self.samples: Counter = Counter()
+        self.finished = False
+
+        if "tracemalloc" in self.modes and not tracemalloc.is_tracing():
+            tracemalloc.start()
+        self.sampler = None
+        if "sample" in self.modes:
+            self.interval = interval
+            self.stop_sampling = threading.Event()
+            self.sampler = threading.Thread(
+                target=self._sample_loop, name="profiler-sampler", daemon=True
+            )
+            self.sampler.start()
+        atexit.register(self.finish)
+
+    def _stack(self) -> List[str]:
+        return self.stacks.setdefault(threading.get_ident(), [])
+
+    @contextmanager
+    def stage(self, name: str):
+        stack = self._stack()
+        if stack and stack[-1] == name:
+            # Recursion into the same stage (run -> crop_plate -> ...)
+            yield
+            return
+
+        # cProfile and tracemalloc snapshots only make sense on one thread
+        on_main = threading.current_thread() is threading.main_thread()
+        outer = stack[-1] if stack else None
+        use_cprofile = on_main and "cprofile" in self.modes
+        before = None
+        if on_main and outer is None and "tracemalloc" in self.modes:
+            before = tracemalloc.take_snapshot()
+
+        if use_cprofile:
+            if outer is not None:
+                self.profiles[outer].disable()
+            self.profiles[name].enable()
+        stack.append(name)
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.seconds[name] += time.perf_counter() - started
+            self.calls[name] += 1
+            stack.pop()
+            if use_cprofile:
+                self.profiles[name].disable()
+                if outer is not None:
+                    self.profiles[outer].enable()
+            if before is not None:
+                self._record_allocations(name, before)
+
+    def _record_allocations(self, name: str, before: tracemalloc.Snapshot):
+        ignore = [tracemalloc.Filter(False, path) for path in IGNORED_ALLOCATION_FILES]
+        after = tracemalloc.take_snapshot().filter_traces(ignore)
+        for diff in after.compare_to(before.filter_traces(ignore), "lineno")[:TOP_N]:
+            frame = diff.traceback[0]
+            self.allocations[name][f"{frame.filename}:{frame.lineno}"] += diff.size_diff
+        peak = tracemalloc.get_traced_memory()[1]
+        self.peak_memory[name] = max(self.peak_memory[name], peak)
+        tracemalloc.reset_peak()
+
+    def _sample_loop(self):
+        own = threading.get_ident()
+        while not self.stop_sampling.wait(self.interval):
+            for ident, frame in sys._current_frames().items():
+                if ident == own:
+                    continue
+                stack = self.stacks.get(ident)
+                names = []
+                while frame is not None:
+                    code = frame.f_code
+                    names.append(f"{Path(code.co_filename).stem}:{code.co_name}")
+                    frame = frame.f_back
+                root = stack[-1] if stack else "other"
+                self.samples[";".join([root, *reversed(names)])] += 1
+
+    def _top_functions(self, name: str) -> List[dict]:
+        stats = pstats.Stats(self.profiles[name])
+        rows = sorted(stats.stats.items(), key=lambda item: -item[1][3])[:TOP_N]
+        return [
+            {
+                "function": f"{Path(filename).name}:{line}({func})",
+                "calls": calls,
+                "tottime": tottime,
+                "cumtime": cumtime,
+            }
+            for (filename, line, func), (_, calls, tottime, cumtime, _) in rows
+        ]
+
+    def _top_samples(self, name: str) -> List[dict]:
+        leaves = Counter()
+        for stack, hits in self.samples.items():
+            frames = stack.split(";")
+            if frames[0] == name and len(frames) > 1:
+                leaves[frames[-1]] += hits
+        return [
+            {"frame": frame, "samples": hits}
+            for frame, hits in leaves.most_common(TOP_N)
+        ]
+
+    def summary(self) -> Dict[str, dict]:
+        result = {}
+        for name in sorted(self.calls, key=lambda stage: -self.seconds[stage]):
+            info = {"calls": self.calls[name], "seconds": self.seconds[name]}
+            if "cprofile" in self.modes and name in self.profiles:
+                info["topFunctions"] = self._top_functions(name)
+            if name in self.allocations:
+                info["peakTracedBytes"] = self.peak_memory[name]
+                info["topAllocations"] = [
+                    {"line": line, "bytes": size}
+                    for line, size in self.allocations[name].most_common(TOP_N)
+                ]
+            if self.samples:
+                info["topSamples"] = self._top_samples(name)
+            result[name] = info
+        return result
+
+    def finish(self):
+        """Write the profiles, stacks and summary. Safe to call twice."""
+        if self.finished:
+            return
+        self.finished = True
+        if self.sampler is not None:
+            self.stop_sampling.set()
+            self.sampler.join()
+
+        pid = os.getpid()
+        for name, profile in self.profiles.items():
+            profile.dump_stats(self.run_dir / f"{name}-{pid}.prof")
+        if self.samples:
+            stacks_path = self.run_dir / f"stacks-{pid}.collapsed"
+            with open(stacks_path, "w", encoding="utf-8") as f:
+                for stack, hits in sorted(self.samples.items()):
+                    f.write(f"{stack} {hits}\n")
+
+        summary = self.summary()
+        with open(self.run_dir / f"summary-{pid}.json", "w", encoding="utf-8") as f:
+            json.dump(summary, f, indent=4)
+        with open(self.run_dir / f"summary-{pid}.txt", "w", encoding="utf-8") as f:
+            for name, info in summary.items():
+                f.write(f"== {name}: {info['calls']} calls, {info['seconds']:.3f}s\n")
+                for row in info.get("topFunctions", []):
+                    f.write(
+                        f"  {row['cumtime']:9.3f}s cum {row['tottime']:9.3f}s own "
+                        f"{row['calls']:>8} {row['function']}\n"
+                    )
+                for row in info.get("topAllocations", []):
+                    f.write(f"  {row['bytes'] / 1024:+10.1f} KiB {row['line']}\n")
+                for row in info.get("topSamples", []):
+                    f.write(f"  {row['samples']:>8} samples {row['frame']}\n")
+        print(f"🔬 Profile written to {self.run_dir}")
+
+
+def get_session() -> Optional[ProfileSession]:
+    """The process wide session, started from PLATES_PROFILE on first use."""
+    global _session, _configured
+    if _configured:
+        return _session
+    # Worker threads can reach their first stage at the same time as main
+    with _session_lock:
+        if _configured:
+            return _session
+        modes = os.environ.get(PROFILE_ENV, "")
+        if modes:
+            modes = MODES if modes == "all" else modes.split(",")
+            unknown = set(modes) - set(MODES)
+            if unknown:
+                raise ValueError(f"Unknown {PROFILE_ENV} modes: {', '.join(unknown)}")
+            run_dir = os.environ.get(RUN_DIR_ENV)
+            if run_dir is None:
+                base = os.environ.get(PROFILE_DIR_ENV, DEFAULT_PROFILE_DIR)
+                run_dir = str(Path(base) / time.strftime("%Y%m%d-%H%M%S"))
+                os.environ[RUN_DIR_ENV] = run_dir
+            _session = ProfileSession(list(modes), Path(run_dir))
+        _configured = True
+    return _session
+
+
+def profile_stage(name: str):
+    """Profile a block as stage name, a no-op unless profiling is on."""
+    session = get_session()
+    if session is None:
+        return nullcontext()
+    return session.stage(name)
+
+
+def profiled(stage: str):
+    """Decorator form of profile_stage."""
+
+    def decorate(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            session = get_session()
+            if session is None:
+                return fn(*args, **kwargs)
+            with session.stage(stage):
+                return fn(*args, **kwargs)
+
+        return wrapper
+
+    return decorate
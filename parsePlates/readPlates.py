@@ -1,26 +1,45 @@
+from functools import lru_cache
+from importlib import metadata
 import json
 import os
+import time
 from pathlib import Path
-from paddlex import create_pipeline
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
 import numpy as np
 import cv2
 
 
 from helpers import (
+    chunked,
     expand_bbox,
     find_largest_textbox,
     get_line_length,
     group_boxes_by_height,
     points_to_xyxy,
+    scan_images,
+    SCAN_CHUNK_SIZE,
     xyxy_to_points,
 )
-from ImageManager import ImageManager
+from cropStore import open_store
+from dbWriter import WriteBehindWriter
+from imageCache import get_cache, imread
+from ImageManager import ImageManager, default_worker_id
+from metrics import count, log, span
+from pipelineConfig import get_config
+from plateIndex import PlateIndex
+from profiler import profiled
+from resultsExporter import JsonlResultsExporter, compact
+from resourceScheduler import get_scheduler, stage
+from timeBudget import LatencyRecorder, StageFailed, StageRunner
 
 
 # Database file name
 DB_NAME = "source/images/plates.db"
+RESULTS_PATH = "source/images/results.json"
+RESULTS_LOG_PATH = "source/images/results.jsonl"
 
 
+@profiled("recognize")
 def recognize_text(plates_dir_path: str):
     """
     Recognize text in a license plate image using PaddleOCR + DB detector
@@ -42,6 +61,9 @@ def recognize_text(plates_dir_path: str):
     bit_image_path.mkdir(exist_ok=True, parents=True)
     # reads_path.mkdir(exist_ok=True)
 
+    # One set of scratch arrays for the whole folder, each plate's images
+    # are views into them
+    scratch = Scratch()
     for filename in os.listdir(plates_path):
         if not filename.lower().endswith((".jpg", ".jpeg", ".png")):
             continue
@@ -50,72 +72,16 @@ def recognize_text(plates_dir_path: str):
         image_path_bit = bit_image_path / filename
 
         # ---------------------------------------------------------
-        # 2. Read, resize, and preprocess image
+        # 2. Read the image, grayscale straight from the decoder
         # ---------------------------------------------------------
-        img = cv2.imread(str(image_path), cv2.IMREAD_GRAYSCALE)
-        # img = cv2.resize(img, (img.shape, IMG_SIZE))
-        im_bw = cv2.threshold(img, 155, 255, cv2.THRESH_BINARY | cv2.THRESH_OTSU)[1]
-
-        # ---------------------------------------------------------
-        # 3. Detect plate bounding box using DB detector
-        # ---------------------------------------------------------
-        # boxes, _ = detector.detect(
-        #     cv2.cvtColor(im_bw, cv2.COLOR_GRAY2BGR)
-        # )  # boxes shape: (N, 4, 2) – pick the biggest
-        largest_box = find_largest_textbox(cv2.cvtColor(img, cv2.COLOR_GRAY2BGR))
-        if largest_box is None:
-            print(f"No plate detected in {filename}, trying BW image")
-            largest_box = find_largest_textbox(cv2.cvtColor(im_bw, cv2.COLOR_GRAY2BGR))
-            img = im_bw
-            if largest_box is None:
-                print(f"No plate detected in {filename}")
-                continue
-        # boxes, _ = sort_boxes_by_area(boxes, ascending=False)
-        # print(boxes[0])
-        # Take the biggest box
-        # = boxes[0]  # change if needed (e.g., by area)
-        x1 = int(min(largest_box[:, 0]))
-        y1 = int(min(largest_box[:, 1]))
-        x2 = int(max(largest_box[:, 0]))
-        y2 = int(max(largest_box[:, 1]))
-        bbox = [x1, y1, x2, y2]
-        # print(bbox)
-        if len(bbox) == 0:
-            print("no bbox found for img:", filename)
+        img = imread(image_path, cv2.IMREAD_GRAYSCALE)
+        if img is None:
             continue
 
-        # ---------------------------------------------------------
-        # 4. Expand the bounding box slightly
-        # ---------------------------------------------------------
-        expanded_bbox = expand_bbox(
-            xyxy_to_points(bbox), img.shape, margin=int(IMG_SIZE * 0.2)
-        )
-        x1, y1, x2, y2 = points_to_xyxy(expanded_bbox)
-
-        # ---------------------------------------------------------
-        # 5. Crop the plate and run Canny + line drawing (like test.py)
-        # ---------------------------------------------------------
-        plate_crop = img[y1:y2, x1:x2]
-        # gray = plate_crop  # cv2.cvtColor(plate_crop, cv2.COLOR_BGR2GRAY)
-        # show_image(gray)
-
-        # # Canny
-        # edges = cv2.Canny(gray, 50, 200, apertureSize=3)
-
-        # # Hough lines (probabilistic)
-        # lines = cv2.HoughLinesP(
-        #     edges, 1, np.pi / 180, threshold=100, minLineLength=30, maxLineGap=5
-        # )
-
-        # # Draw lines on the cropped image
-        # if lines is not None:
-        #     for l in lines:
-        #         x_start, y_start, x_end, y_end = l[0]
-        #         cv2.line(plate_crop, (x_start, y_start), (x_end, y_end), (0, 255, 0), 2)
-
+        plate_crop = _preprocess_plate(img, scratch, filename, IMG_SIZE)
+        if plate_crop is None:
+            continue
         # Save the processed image (for debugging / visualisation)
-        plate_crop = cv2.GaussianBlur(plate_crop, (5, 5), 0)
-        plate_crop = cv2.cvtColor(plate_crop, cv2.COLOR_GRAY2BGR)
         cv2.imwrite(str(image_path_bit), plate_crop)
 
     # ---------------------------------------------------------
@@ -149,7 +115,332 @@ def recognize_text(plates_dir_path: str):
     print(f"[{filename}] Plate text: {plate_text}")
 
 
-def read_text(read_images_path: Path | str):
+class Scratch:
+    """
+    Grow-only scratch arrays for per-image work. get() hands out a view of
+    the requested shape into the largest array asked for so far, so a
+    folder of plates allocates a handful of times instead of per image.
+    A view is only valid until the next get() of the same name.
+    """
+
+    def __init__(self):
+        self.arrays: Dict[str, np.ndarray] = {}
+
+    def get(self, name: str, shape: Tuple[int, ...], dtype=np.uint8) -> np.ndarray:
+        base = self.arrays.get(name)
+        if base is None or base.dtype != dtype or base.ndim != len(shape):
+            base = self.arrays[name] = np.empty(shape, dtype)
+        elif any(have < want for have, want in zip(base.shape, shape)):
+            grown = tuple(max(have, want) for have, want in zip(base.shape, shape))
+            base = self.arrays[name] = np.empty(grown, dtype)
+        return base[tuple(slice(0, n) for n in shape)]
+
+    def bgr(self, name: str, gray: np.ndarray) -> np.ndarray:
+        """gray as 3 channels, written into the scratch array name."""
+        return cv2.cvtColor(
+            gray, cv2.COLOR_GRAY2BGR, dst=self.get(name, (*gray.shape, 3))
+        )
+
+
+def _preprocess_plate(
+    img: np.ndarray,
+    scratch: Scratch,
+    filename: str = "",
+    img_size: int = 768,
+    detect=find_largest_textbox,
+) -> Optional[np.ndarray]:
+    """
+    recognize_text's work on one grayscale plate image: find the text box
+    with the DB detector, falling back to an Otsu binarised copy, then crop
+    it with a margin and blur it.
+
+    img is only read, it may be an image cache entry. The Otsu image is
+    computed only when the plain one finds nothing, and the crop is a view,
+    blurred and expanded to BGR in scratch arrays.
+
+    Returns:
+        The BGR crop (a view into scratch) or None if no text was found
+    """
+    largest_box = detect(scratch.bgr("detect", img))
+    if largest_box is None:
+        log(f"No plate detected in {filename}, trying BW image", "debug")
+        img = cv2.threshold(
+            img,
+            155,
+            255,
+            cv2.THRESH_BINARY | cv2.THRESH_OTSU,
+            dst=scratch.get("bw", img.shape),
+        )[1]
+        largest_box = detect(scratch.bgr("detect", img))
+        if largest_box is None:
+            log(f"No plate detected in {filename}", "debug")
+            return None
+
+    # Expand the text box slightly
+    x1, y1 = largest_box.min(axis=0)
+    x2, y2 = largest_box.max(axis=0)
+    expanded_bbox = expand_bbox(
+        xyxy_to_points([int(x1), int(y1), int(x2), int(y2)]),
+        img.shape,
+        margin=int(img_size * 0.2),
+    )
+    x1, y1, x2, y2 = points_to_xyxy(expanded_bbox)
+
+    plate_crop = img[y1:y2, x1:x2]
+    blurred = cv2.GaussianBlur(
+        plate_crop, (5, 5), 0, dst=scratch.get("blur", plate_crop.shape)
+    )
+    return scratch.bgr("crop", blurred)
+
+
+def _plate_text(res) -> Optional[Tuple[str, float]]:
+    """
+    The plate text of one OCR result: the lines of the largest boxes'
+    height, left to right, and the lowest score among them. None if
+    nothing was recognized.
+
+    Works on indices into rec_boxes, so each line's text and score is a
+    lookup instead of a search for its box. The handful of boxes per
+    plate are plain lists, numpy scalars would cost more than they save.
+    """
+    rec_boxes = res["rec_boxes"]
+    if rec_boxes is None or len(rec_boxes) == 0:
+        return None
+    boxes = rec_boxes.tolist() if isinstance(rec_boxes, np.ndarray) else rec_boxes
+    # Largest first, the sort is stable so equal areas keep their order
+    by_area = sorted(
+        range(len(boxes)),
+        key=lambda i: (boxes[i][2] - boxes[i][0]) * (boxes[i][3] - boxes[i][1]),
+        reverse=True,
+    )
+    group = group_boxes_by_height(
+        [boxes[i] for i in by_area],
+        rel_tol=get_config()["ocr_rel_tol"],
+        return_indices=True,
+    )[0]
+    line = sorted(
+        (by_area[j] for j in group), key=lambda i: boxes[i][0] + boxes[i][2]
+    )
+    texts = res["rec_texts"]
+    scores = res["rec_scores"]
+    text = " ".join([texts[i] for i in line]).strip()
+    confidence = min(1.0, *(float(scores[i]) for i in line))
+    return text, confidence
+
+
+def _create_ocr():
+    """Build the PaddleX OCR pipeline with the scheduler's OCR thread budget."""
+    # Imported here so DB-only commands don't pay for paddle
+    from paddlex import create_pipeline
+
+    scheduler = get_scheduler()
+    return create_pipeline(
+        pipeline="OCR",
+        pp_option=scheduler.paddle_option() if scheduler else None,
+    )
+
+
+@lru_cache(maxsize=1)
+def ocr_model_version() -> str:
+    """The PaddleX release the OCR pipeline comes from, stored with every read."""
+    try:
+        return f"paddlex-{metadata.version('paddlex')}"
+    except metadata.PackageNotFoundError:
+        return "paddlex"
+
+
+@profiled("ocr")
+def _ocr_plate(
+    ocr, image_path: Path, reads_path: Path, crop_store: Optional[str] = None
+) -> List[Tuple[str, str, float]]:
+    """
+    OCR one plate crop and join the text lines of the tallest boxes.
+
+    The crop is decoded through the image cache and handed to paddle as an
+    array. It is shared and read-only: a paddle step writing into its
+    input would raise ValueError rather than corrupt the cache. With
+    crop_store it comes from the CropStore (kind is the crop folder's name)
+    and the visualisations are packed under 'reads'.
+
+    Returns:
+        (plate text, input path, confidence) for every result with
+        recognized text, confidence being the lowest score of its lines
+    """
+    store = None
+    if crop_store is None:
+        source = imread(image_path)
+    else:
+        store = open_store(crop_store)
+        source = store.get_image(image_path.parent.name, image_path.name)
+    if source is None:
+        return []
+
+    with stage("ocr"), span("ocr", image_path.name):
+        results = list(
+            ocr.predict(
+                source,
+                use_textline_orientation=False,
+                use_doc_orientation_classify=False,
+                # lang="en",
+                use_doc_unwarping=False,
+            )
+        )
+
+    reads = []
+    # results.sort(key=lambda x: x["input_path"])
+    for res in results:
+        read = _plate_text(res) if res else None
+        if read is not None:
+            log(f"box found for {image_path.name}", "debug")
+            # res.print()
+            _save_read(reads_path, image_path, res, store)
+            plate_text, confidence = read
+            reads.append((plate_text, str(image_path), confidence))
+    count("plates_images_total", stage="ocr", result="read" if reads else "empty")
+    return reads
+
+
+def _save_read(reads_path: Path, image_path: Path, res, store=None):
+    """
+    Write what save_to_img / save_to_json would, named after image_path
+    since array inputs have no input_path. With a store they are packed
+    into the 'reads' kind instead.
+    """
+    data = json.dumps(res.json, ensure_ascii=False, indent=4).encode("utf-8")
+    if store is None:
+        reads_path.mkdir(parents=True, exist_ok=True)
+        (reads_path / f"{image_path.stem}_res.json").write_bytes(data)
+    else:
+        store.put("reads", f"{image_path.stem}_res.json", data)
+
+    for key, img in res.img.items():
+        name = f"{image_path.stem}_{key}.png"
+        # PIL images are RGB, cv2 expects BGR. Swapped in place in the one
+        # copy out of PIL
+        rgb = np.array(img)
+        bgr = cv2.cvtColor(rgb, cv2.COLOR_RGB2BGR, dst=rgb)
+        if store is None:
+            cv2.imwrite(str(reads_path / name), bgr)
+        else:
+            store.put_image("reads", name, bgr)
+
+
+def _iter_read_paths(
+    read_images_path: Path,
+    db: ImageManager,
+    worker_id: Optional[str] = None,
+    batch_size: int = 10,
+    bounded_memory: bool = False,
+    crop_store: Optional[str] = None,
+    paths: Optional[List[Path]] = None,
+    flush: Optional[Callable[[], Dict[str, str]]] = None,
+) -> Iterator[Path]:
+    """
+    Yields the plate crops to read. Without a worker id the folder is listed,
+    otherwise the folder seeds the shared 'read' jobs and paths come from the
+    batches this worker leases. flush() runs before a leased batch is marked
+    done and returns {file name: error} for the crops whose rows could not
+    be written, their jobs are marked failed.
+
+    In bounded-memory mode the folder is scanned in sorted chunks instead of
+    being listed and sorted as a whole.
+
+    With crop_store the names come from the store's index instead of the
+    folder, as read_images_path / name. paths replaces either listing.
+    """
+    if paths is not None:
+        chunks = chunked(paths)
+    elif crop_store is not None:
+        names = open_store(crop_store).names(read_images_path.name)
+        chunks = chunked(
+            (read_images_path / name for name in names if name.endswith(".jpg")),
+            SCAN_CHUNK_SIZE,
+        )
+    elif bounded_memory:
+        chunks = scan_images(read_images_path, exts=(".jpg",))
+    else:
+        chunks = [
+            sorted(x for x in read_images_path.iterdir() if x.name.endswith(".jpg"))
+        ]
+
+    if worker_id is None:
+        for chunk in chunks:
+            yield from chunk
+        return
+
+    db.create_jobs_table()
+    for chunk in chunks:
+        db.enqueue_jobs("read", [str(x) for x in chunk])
+
+    def before_complete(batch):
+        failed = flush() if flush else {}
+        return {
+            job["id"]: failed[name]
+            for job in batch
+            if (name := Path(job["filePath"]).name) in failed
+        }
+
+    for batch in db.iter_job_batches(
+        "read", worker_id, batch_size, before_complete=before_complete
+    ):
+        for i, job in enumerate(batch):
+            yield Path(job["filePath"])
+            db.heartbeat_jobs([job["id"] for job in batch[i + 1 :]], worker_id)
+
+
+def _suggest(plate_index: PlateIndex, text: str, file_name: str) -> Optional[dict]:
+    """The nearest corrected plate to a new read, logged when it differs."""
+    suggestion = plate_index.suggest(text)
+    if suggestion is not None and suggestion["plate"] != text:
+        log(
+            f"💡 {file_name}: '{text}' looks like '{suggestion['plate']}' "
+            f"(distance {suggestion['distance']})"
+        )
+    return suggestion
+
+
+@profiled("read")
+def read_text(
+    read_images_path: Path | str,
+    use_queue: bool = False,
+    worker_id: Optional[str] = None,
+    timeout: Optional[float] = None,
+    bounded_memory: bool = False,
+    compact_results: Optional[bool] = None,
+    crop_store: Optional[str | Path] = None,
+    paths: Optional[List[Path]] = None,
+    replace: bool = False,
+):
+    """
+    OCR every plate crop in read_images_path and store the text in the db.
+
+    With use_queue the crops are pulled from the 'jobs' table so several
+    workers can share one database file, worker_id naming this one in the
+    leases (host and pid by default). worker_id is ignored without use_queue.
+
+    With a timeout (seconds per image) OCR runs in a worker process. Crops
+    that exceed it or crash the worker are quarantined and skipped.
+
+    Rows are written behind the OCR by a dbWriter thread that commits them
+    in groups. Every stored plate is appended to results.jsonl once its
+    group is committed, keyed by its database row id. A leased job batch is
+    marked done only once its rows are committed. Crops whose group failed
+    to commit are quarantined at 'write' and their jobs marked failed.
+
+    With compact_results the log is rewritten into results.json at the
+    end. With bounded_memory the folder is scanned in chunks and nothing is
+    kept per image, so memory stays flat for 100k+ image folders.
+    Compaction holds one offset per plate, so it defaults to off in
+    bounded-memory mode and on otherwise.
+
+    With crop_store (the folder LicensePlateProcess.run packed its crops
+    into) the crops are read from the store instead of read_images_path.
+
+    paths (crop paths, e.g. from ImageManager.select_for_reprocessing) is
+    the work list instead of the whole folder. With replace, crops that
+    already have a record are read again and their text, OCR confidence
+    and model version updated, rather than skipped.
+    """
     toReturn = []
     if type(read_images_path) == str:
         read_images_path = Path(read_images_path)
@@ -160,13 +451,21 @@ def read_text(read_images_path: Path | str):
 
     # if file_count == 0:
     #     return
-    ocr = create_pipeline(pipeline="OCR")
-
-    to_export_dict = dict()
+    # Isolated: the OCR pipeline lives in a worker process that is
+    # restarted whenever an image blows its time budget
+    runner = StageRunner(_create_ocr, isolated=timeout is not None)
+    latency = LatencyRecorder(max_samples=10_000 if bounded_memory else None)
+    reads_path = read_images_path.parent / "reads"
+    plate_text = ""
+
+    exporter = JsonlResultsExporter(RESULTS_LOG_PATH)
     db = ImageManager(DB_NAME)
     db.create_table()
     db.backup_database()
-    count = 0
+    plate_index = PlateIndex.from_db(db)
+    # Crops that time out, and rows that fail to commit
+    db.create_quarantine_table()
+    stored = 0
 
     # ocr = PaddleOCR(
     #     use_textline_orientation=False,
@@ -174,76 +473,108 @@ def read_text(read_images_path: Path | str):
     #     lang="en",
     #     use_doc_unwarping=False,
     # )
-    files_to_process = sorted(
-        [x.name for x in read_images_path.iterdir() if x.name.endswith(".jpg")]
-    )
+    # A worker id alone doesn't switch to the queue
+    worker_id = (worker_id or default_worker_id()) if use_queue else None
+    if crop_store is not None:
+        # Workers get the root, not the store, so the runner stays picklable
+        crop_store = str(crop_store)
+
+    writer = WriteBehindWriter(DB_NAME, replace=replace)
+    failed_writes: Dict[str, str] = {}
+
+    def export_committed():
+        for done in writer.completed():
+            if done.error:
+                # Quarantined under 'write', not 'ocr', so the next run
+                # reads the crop again
+                db.quarantine(done.file_name, "write", 0.0, done.error)
+                failed_writes[done.file_name] = done.error
+            elif done.row_id:
+                exporter.append(
+                    done.row_id,
+                    done.text,
+                    done.file_name,
+                    str(done.context[0].absolute()),
+                    done.context[1],
+                )
 
-    for file_name in files_to_process:
-        if len(db.search_by_filename(file_name)) > 0:
-            continue
+    def flush_writes() -> Dict[str, str]:
+        """Wait for the queued rows, then hand over the failed ones."""
+        writer.flush()
+        export_committed()
+        failed = dict(failed_writes)
+        failed_writes.clear()
+        return failed
+
+    try:
+        for image_path in _iter_read_paths(
+            read_images_path,
+            db,
+            worker_id,
+            bounded_memory=bounded_memory,
+            crop_store=crop_store,
+            paths=paths,
+            flush=flush_writes,
+        ):
+            file_name = image_path.name
+            if not replace and db.has_file(file_name):
+                continue
+            if timeout is not None and db.is_quarantined(file_name, "ocr"):
+                continue
 
-        results = list(
-            ocr.predict(
-                str(read_images_path / file_name),
-                use_textline_orientation=False,
-                use_doc_orientation_classify=False,
-                # lang="en",
-                use_doc_unwarping=False,
-            )
-        )
-        # results.sort(key=lambda x: x["input_path"])
-        for res in results:
-            plate_text = ""
-            # read_path = Path(f"{bit_image_path}")
-
-            if res and len(res["rec_boxes"]) > 0:
-                # file_path = Path(res["input_path"])
-                sorted_by_area = sorted(
-                    res["rec_boxes"],
-                    key=lambda b: (int(b[2]) - int(b[0]))
-                    * int((b[3]) - int(b[1])),  # width × height
-                    reverse=True,  # largest first
+            started = time.perf_counter()
+            try:
+                reads = runner.call(
+                    "ocr",
+                    _ocr_plate,
+                    image_path,
+                    reads_path,
+                    crop_store,
+                    timeout=timeout,
                 )
-                boxes = group_boxes_by_height(sorted_by_area, rel_tol=0.2)[0]
-                boxes.sort(key=lambda box: box[0] + box[2])
-                print(f"box found for {file_name}")
-                # plate_text = result[0][0][1]  # first detected text
-                # for res in result:
-                # if len(res["rec_boxes"]) == 0:
-                #     continue
-                # res.print()
-                res.save_to_img(str(read_images_path.parent / "reads"))
-                res.save_to_json(str(read_images_path.parent / "reads"))
-                for box in boxes:
-                    # res.save_to_json("output")
-                    # maxVal = max(res["rec_boxes"], key=lambda x: get_line_length(x))
-                    index = np.where(res["rec_boxes"] == box)[0][0]
-                    plate_text += res["rec_texts"][index] + " "
-                # if len(plate_text) > 0:
-                #     os.rename(str(file_path), str(read_read_dir / file_path.name))
-
-                final_plate_text = plate_text.rstrip().lstrip()
-                toReturn.append(final_plate_text)
-                filePath = Path(res["input_path"])
-                count = count + 1
-
-                db.insert(final_plate_text, filePath.name)
-
-                to_export_dict[filePath.name] = {
-                    "text": final_plate_text,
-                    "fileName": filePath.name,
-                    "filePath": str(filePath.absolute()),
-                    "id": count,
-                }
-    # to_export_dict = to_export_dict  # .values()
-    # print(to_export_dict)
-    # print(db.get_all())
-    with open("source/images/results.json", "w") as json_file:
-        json.dump(to_export_dict, json_file, indent=4)
-        # f.write(str(self.bounds))
+            except StageFailed as e:
+                db.quarantine(file_name, e.stage, e.elapsed, e.message)
+                continue
+            finally:
+                latency.record("ocr", file_name, time.perf_counter() - started)
+
+            # Corrections made on the site while this runs
+            plate_index.refresh(db)
+            for final_plate_text, input_path, confidence in reads:
+                plate_text = final_plate_text
+                if not bounded_memory:
+                    toReturn.append(final_plate_text)
+                filePath = Path(input_path)
+                stored = stored + 1
+
+                suggestion = _suggest(plate_index, final_plate_text, filePath.name)
+                writer.put(
+                    final_plate_text,
+                    filePath.name,
+                    ocr_confidence=confidence,
+                    ocr_model=ocr_model_version(),
+                    context=(filePath, suggestion),
+                )
+            export_committed()
+    finally:
+        runner.close()
+        # Every row is on disk before the results log is closed
+        writer.close()
+        export_committed()
+        exporter.close()
+
+    if compact_results is None:
+        compact_results = not bounded_memory
+    if compact_results:
+        compact(RESULTS_LOG_PATH, RESULTS_PATH)
 
     # Save OCR result
     # with open(read_path / "notes", "w+", encoding="utf-8") as f:
     #     f.write(plate_text)
 
-    print(f"[{toReturn}] Plate text: {plate_text}")
+    latency.report()
+    get_cache().report()
+    if bounded_memory:
+        print(f"[{stored} plates] Last plate text: {plate_text}")
+    else:
+        print(f"[{toReturn}] Plate text: {plate_text}")
@@ -0,0 +1,267 @@
+import os
+import sys
+from contextlib import contextmanager, nullcontext
+from typing import Dict, List, Optional, Set
+
+# Stages that own a native thread pool:
+# - yolo: torch (ultralytics) plate detection
+# - db:   OpenCV DNN text detector in find_largest_textbox
+# - ocr:  paddle (paddlex) OCR pipeline
+STAGES = ("yolo", "db", "ocr")
+
+# Thread pools sized from the environment when the native library loads
+THREAD_ENV_VARS = (
+    "OMP_NUM_THREADS",
+    "MKL_NUM_THREADS",
+    "OPENBLAS_NUM_THREADS",
+    "NUMEXPR_NUM_THREADS",
+)
+
+# e.g. PLATES_THREADS="yolo=4;db=2;ocr=2"
+THREADS_ENV = "PLATES_THREADS"
+# e.g. PLATES_AFFINITY="yolo=0-3;db=4,5;ocr=6-7"
+AFFINITY_ENV = "PLATES_AFFINITY"
+
+_scheduler = None
+
+
+def available_cores() -> int:
+    """Number of cores this process is allowed to run on."""
+    if hasattr(os, "sched_getaffinity"):
+        return len(os.sched_getaffinity(0))
+    return os.cpu_count() or 1
+
+
+def _thread_ids() -> List[int]:
+    """Native ids of every thread in this process, [0] off Linux."""
+    try:
+        return [int(tid) for tid in os.listdir("/proc/self/task")]
+    except OSError:
+        return [0]
+
+
+def parse_cpu_set(spec: str) -> Set[int]:
+    """
+    Parse a CPU list like '0-3,6' into a set of core ids.
+
+    Args:
+        spec: Comma separated cores or inclusive ranges
+
+    Returns:
+        Set of core ids
+    """
+    cpus = set()
+    for part in spec.split(","):
+        part = part.strip()
+        if not part:
+            continue
+        if "-" in part:
+            start, end = part.split("-", 1)
+            if int(end) < int(start):
+                raise ValueError(f"CPU range '{part}' runs backwards")
+            cpus.update(range(int(start), int(end) + 1))
+        else:
+            cpus.add(int(part))
+    return cpus
+
+
+def _parse_stage_map(spec: str) -> Dict[str, str]:
+    stage_map = {}
+    for entry in spec.split(";"):
+        entry = entry.strip()
+        if not entry:
+            continue
+        name, _, value = entry.partition("=")
+        name = name.strip().lower()
+        if name not in STAGES:
+            raise ValueError(f"Unknown stage '{name}', expected one of {STAGES}")
+        stage_map[name] = value.strip()
+    return stage_map
+
+
+def default_budgets(total_cores: int) -> Dict[str, int]:
+    """
+    Split the cores between stages. Detection and OCR get the bulk of the
+    cores, the DB fallback only runs on low confidence plates.
+    """
+    db = max(1, total_cores // 4)
+    yolo = max(1, (total_cores - db) // 2)
+    ocr = max(1, total_cores - db - yolo)
+    return {"yolo": yolo, "db": db, "ocr": ocr}
+
+
+class ResourceScheduler:
+    """
+    Assigns each pipeline stage a thread budget and an optional CPU affinity
+    set so torch, paddle and OpenCV don't each size their pool to every core.
+
+    Usage:
+    - apply_env() before torch / paddlex are imported
+    - apply() once the process is up, then report()
+    - wrap stage work in stage("yolo" | "db" | "ocr") to pin the process,
+      native thread pools included, to the stage's cores
+    """
+
+    def __init__(
+        self,
+        budgets: Optional[Dict[str, int]] = None,
+        affinity: Optional[Dict[str, Set[int]]] = None,
+        total_cores: Optional[int] = None,
+    ):
+        self.total_cores = total_cores or available_cores()
+        self.budgets = default_budgets(self.total_cores)
+        if budgets:
+            self.budgets.update(budgets)
+        self.affinity = affinity or {}
+
+        for name, cpus in self.affinity.items():
+            # A stage never gets more threads than cores it may run on
+            if cpus:
+                self.budgets[name] = min(self.budgets[name], len(cpus))
+
+    @classmethod
+    def from_env(cls) -> "ResourceScheduler":
+        """Build a scheduler from PLATES_THREADS / PLATES_AFFINITY."""
+        budgets = {
+            name: max(1, int(value))
+            for name, value in _parse_stage_map(os.environ.get(THREADS_ENV, "")).items()
+        }
+        affinity = {
+            name: parse_cpu_set(value)
+            for name, value in _parse_stage_map(
+                os.environ.get(AFFINITY_ENV, "")
+            ).items()
+        }
+        return cls(budgets=budgets, affinity=affinity)
+
+    @property
+    def max_threads(self) -> int:
+        return max(self.budgets.values())
+
+    def apply_env(self):
+        """
+        Export OMP/MKL thread counts. Only has an effect if called before
+        torch and paddle are imported, their pools are sized on load.
+        """
+        late = [name for name in ("torch", "paddle") if name in sys.modules]
+        if late:
+            print(f"⚠️ {', '.join(late)} already imported, thread env vars ignored")
+
+        for var in THREAD_ENV_VARS:
+            os.environ.setdefault(var, str(self.max_threads))
+        # Read by paddle when no predictor option is passed
+        os.environ.setdefault("CPU_NUM", str(self.budgets["ocr"]))
+
+    def apply(self):
+        """
+        Push the budgets into the libraries that are already imported. Never
+        imports them itself, so call it again after loading torch.
+        """
+        cv2 = sys.modules.get("cv2")
+        if cv2 is not None:
+            cv2.setNumThreads(self.budgets["db"])
+
+        torch = sys.modules.get("torch")
+        if torch is not None:
+            torch.set_num_threads(self.budgets["yolo"])
+            try:
+                torch.set_num_interop_threads(1)
+            except RuntimeError:
+                # Can only be set once, before any inter-op work started
+                pass
+
+    def paddle_option(self):
+        """
+        Predictor option for paddlex.create_pipeline carrying the OCR budget,
+        or None if paddlex isn't installed.
+        """
+        try:
+            from paddlex.inference.utils.pp_option import PaddlePredictorOption
+        except ImportError:
+            return None
+
+        option = PaddlePredictorOption()
+        option.cpu_threads = self.budgets["ocr"]
+        return option
+
+    @contextmanager
+    def stage(self, name: str):
+        """
+        Pin the whole process to the stage's cores for the block.
+
+        sched_setaffinity only moves the thread it is given, so every thread
+        is pinned, including the native pools torch and paddle started
+        earlier. Threads started inside the block get the stage's cores and
+        are moved back with the rest when it ends.
+        """
+        cpus = self.affinity.get(name)
+        if not cpus or not hasattr(os, "sched_setaffinity"):
+            yield
+            return
+
+        own = os.sched_getaffinity(0)
+        previous = {}
+        for tid in _thread_ids():
+            try:
+                previous[tid] = os.sched_getaffinity(tid)
+                os.sched_setaffinity(tid, cpus)
+            except OSError:
+                # The thread exited in between
+                pass
+        try:
+            yield
+        finally:
+            for tid in _thread_ids():
+                try:
+                    os.sched_setaffinity(tid, previous.get(tid, own))
+                except OSError:
+                    pass
+
+    def effective(self) -> Dict[str, Dict[str, object]]:
+        """What the libraries actually report, per stage."""
+        report = {
+            name: {
+                "budget": self.budgets[name],
+                "affinity": sorted(self.affinity.get(name, [])) or "all",
+            }
+            for name in STAGES
+        }
+
+        cv2 = sys.modules.get("cv2")
+        if cv2 is not None:
+            report["db"]["effective"] = cv2.getNumThreads()
+        torch = sys.modules.get("torch")
+        if torch is not None:
+            report["yolo"]["effective"] = torch.get_num_threads()
+        report["ocr"]["effective"] = int(os.environ.get("CPU_NUM", 0)) or None
+        return report
+
+    def report(self):
+        """Print the thread / core assignment for each stage."""
+        env = ", ".join(f"{var}={os.environ.get(var)}" for var in THREAD_ENV_VARS)
+        print(f"🧵 {self.total_cores} cores available ({env})")
+        for name, info in self.effective().items():
+            line = f"   {name:<5} budget={info['budget']} cores={info['affinity']}"
+            if info.get("effective") is not None:
+                line += f" effective={info['effective']}"
+            print(line)
+
+
+def configure(scheduler: Optional[ResourceScheduler] = None) -> ResourceScheduler:
+    """Install the process wide scheduler and export its env vars."""
+    global _scheduler
+    _scheduler = scheduler or ResourceScheduler.from_env()
+    _scheduler.apply_env()
+    return _scheduler
+
+
+def get_scheduler() -> Optional[ResourceScheduler]:
+    return _scheduler
+
+
+def stage(name: str):
+    """Stage context of the configured scheduler, a no-op if none is set."""
+    if _scheduler is None:
+        return nullcontext()
+    return _scheduler.stage(name)
+
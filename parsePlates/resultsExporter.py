@@ -0,0 +1,185 @@
+import json
+import os
+import time
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+
+class StreamingResultsWriter:
+    """
+    Writes results.json one entry at a time instead of dumping a dict
+    built up over the whole run.
+
+    The output matches json.dump(results, f, indent=4) of a
+    {fileName: entry} dict. Entries go to a temp file next to the target,
+    which replaces results.json only on close, so a crash never leaves a
+    truncated export behind.
+    """
+
+    def __init__(self, path: str | Path):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.tmp_path = self.path.with_name(self.path.name + ".tmp")
+        self.file = open(self.tmp_path, "w", encoding="utf-8")
+        self.count = 0
+
+    def write(self, key: str, entry: Dict[str, Any]):
+        """Append one {key: entry} pair to the export."""
+        # Middle lines of a one-key dict dumped with indent=4, so the output
+        # is byte-identical to dumping the whole dict at once
+        lines = json.dumps({key: entry}, indent=4).split("\n")[1:-1]
+        self.file.write(("{\n" if self.count == 0 else ",\n") + "\n".join(lines))
+        self.count += 1
+
+    def close(self):
+        """Finish the JSON document and atomically move it into place."""
+        if self.file.closed:
+            return
+        self.file.write("\n}" if self.count else "{}")
+        self.file.flush()
+        os.fsync(self.file.fileno())
+        self.file.close()
+        os.replace(self.tmp_path, self.path)
+
+    def abort(self):
+        """Drop the temp file, leaving results.json as it was."""
+        if not self.file.closed:
+            self.file.close()
+        self.tmp_path.unlink(missing_ok=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        # A partial export is valid JSON, it must not replace the last one
+        if exc_type is not None:
+            self.abort()
+        else:
+            self.close()
+
+
+class JsonlResultsExporter:
+    """
+    Append-only export of recognized plates, one JSON line per plate,
+    written as soon as the plate is stored.
+
+    Lines carry the database row id, so ids stay unique across runs, and a
+    crash loses at most the lines since the last fsync. compact() turns the
+    log into the results.json shape the rest of the tooling reads.
+    """
+
+    def __init__(
+        self,
+        path: str | Path,
+        fsync_every: int = 50,
+        fsync_interval: float = 5.0,
+    ):
+        """
+        Args:
+            path: JSONL file to append to (created if missing)
+            fsync_every: Lines written between fsyncs
+            fsync_interval: Max seconds between fsyncs while lines arrive
+        """
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        torn = self.path.exists() and not _ends_with_newline(self.path)
+        self.file = open(self.path, "a", encoding="utf-8")
+        if torn:
+            # Don't glue the first new line onto a line torn by a crash
+            self.file.write("\n")
+        self.fsync_every = fsync_every
+        self.fsync_interval = fsync_interval
+        self.pending = 0
+        self.last_sync = time.monotonic()
+
+    def append(
+        self,
+        row_id: int,
+        text: str,
+        file_name: str,
+        file_path: str,
+        suggestion: Optional[Dict[str, Any]] = None,
+    ):
+        """
+        Write one plate and fsync if the batch is full. suggestion is the
+        PlateIndex match for text, stored only when there is one.
+        """
+        entry = {
+            "text": text,
+            "fileName": file_name,
+            "filePath": file_path,
+            "id": row_id,
+        }
+        if suggestion is not None:
+            entry["suggestion"] = suggestion
+        self.file.write(json.dumps(entry) + "\n")
+        self.file.flush()
+        self.pending += 1
+        if (
+            self.pending >= self.fsync_every
+            or time.monotonic() - self.last_sync >= self.fsync_interval
+        ):
+            self.sync()
+
+    def sync(self):
+        """Force written lines to disk."""
+        if self.file.closed:
+            return
+        self.file.flush()
+        os.fsync(self.file.fileno())
+        self.pending = 0
+        self.last_sync = time.monotonic()
+
+    def close(self):
+        if self.file.closed:
+            return
+        self.sync()
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+
+def _ends_with_newline(path: Path) -> bool:
+    with open(path, "rb") as f:
+        if f.seek(0, os.SEEK_END) == 0:
+            return True
+        f.seek(-1, os.SEEK_END)
+        return f.read(1) == b"\n"
+
+
+def compact(jsonl_path: str | Path, json_path: str | Path) -> Optional[int]:
+    """
+    Rewrite a JSONL export as a {fileName: entry} results.json, atomically.
+
+    The log is read twice so only the file offset of each plate is held in
+    memory. When a plate was exported more than once the last line wins, and
+    a torn last line from a crash is skipped.
+
+    Returns:
+        Number of plates in the compacted file, None if there was no log
+    """
+    jsonl_path = Path(jsonl_path)
+    if not jsonl_path.exists():
+        return None
+
+    offsets: Dict[str, int] = {}
+    with open(jsonl_path, "rb") as log:
+        offset = log.tell()
+        for line in iter(log.readline, b""):
+            try:
+                offsets[json.loads(line)["fileName"]] = offset
+            except (ValueError, KeyError):
+                print(f"⚠️ Skipping malformed line at byte {offset} of {jsonl_path}")
+            offset = log.tell()
+
+        with StreamingResultsWriter(json_path) as writer:
+            for file_name, offset in offsets.items():
+                log.seek(offset)
+                writer.write(file_name, json.loads(log.readline()))
+
+    print(f"✅ Compacted {len(offsets)} plates into {json_path}")
+    return len(offsets)
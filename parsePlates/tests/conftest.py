@@ -0,0 +1,32 @@
+"""
+Shared fixtures. Run from parsePlates/:
+
+    python -m pytest tests
+"""
+
+import sys
+from pathlib import Path
+
+import pytest
+
+# The pipeline modules import each other flat, as when run from parsePlates/
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import metrics  # noqa: E402
+
+
+@pytest.fixture(autouse=True)
+def quiet_logs():
+    level = metrics._log_level
+    metrics.set_log_level("warning")
+    yield
+    metrics._log_level = level
+
+
+@pytest.fixture
+def db(tmp_path):
+    from ImageManager import ImageManager
+
+    with ImageManager(str(tmp_path / "plates.db")) as manager:
+        manager.create_table()
+        yield manager
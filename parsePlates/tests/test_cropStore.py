@@ -0,0 +1,90 @@
+import numpy as np
+import pytest
+
+from cropStore import PACK_NAME, CropStore, pack_name
+
+
+@pytest.fixture
+def store(tmp_path):
+    with CropStore(tmp_path / "store") as store:
+        yield store
+
+
+def test_put_get_and_skip_same_bytes(store):
+    assert store.put("detectedPlates", "plate1.jpg", b"one")
+    assert not store.put("detectedPlates", "plate1.jpg", b"one")
+    assert store.get("detectedPlates", "plate1.jpg") == b"one"
+    assert store.get("detectedPlates", "plate2.jpg") is None
+    assert ("detectedPlates", "plate1.jpg") in store
+
+
+def test_put_image_round_trip(store):
+    img = np.full((20, 40, 3), 127, dtype=np.uint8)
+    store.put_image("detectedPlates", "plate1.png", img)
+    assert np.array_equal(store.get_image("detectedPlates", "plate1.png"), img)
+
+
+def test_names_are_sorted_and_paged(store):
+    for i in reversed(range(7)):
+        store.put("reads", f"p{i}.json", b"{}")
+    assert list(store.names("reads", page_size=3)) == [f"p{i}.json" for i in range(7)]
+
+
+def _overwritten(store):
+    store.put("detectedPlates", "plate1.jpg", b"old" * 100)
+    store.put("detectedPlates", "plate1.jpg", b"new")
+    store.put("detectedPlates", "plate2.jpg", b"two")
+
+
+def test_compact_reclaims_and_keeps_crops(store):
+    _overwritten(store)
+    assert store.compact() == 300
+    assert store.pack_path.name == pack_name(1)
+    assert [p.name for p in store.root.glob("*.pack")] == [pack_name(1)]
+    assert store.get("detectedPlates", "plate1.jpg") == b"new"
+
+    with CropStore(store.root) as reopened:
+        assert reopened.get("detectedPlates", "plate2.jpg") == b"two"
+        reopened.put("detectedPlates", "plate3.jpg", b"three")
+        assert reopened.get("detectedPlates", "plate3.jpg") == b"three"
+
+
+def test_crash_before_commit_keeps_old_pack(store, monkeypatch):
+    _overwritten(store)
+
+    def crash(generation, moves):
+        raise KeyboardInterrupt
+
+    monkeypatch.setattr(store, "_commit_pack", crash)
+    with pytest.raises(KeyboardInterrupt):
+        store.compact()
+    monkeypatch.undo()
+
+    with CropStore(store.root) as reopened:
+        assert reopened.pack_path.name == PACK_NAME
+        assert reopened.get("detectedPlates", "plate1.jpg") == b"new"
+        # The half-done generation is cleared by the next compaction
+        reopened.compact()
+        assert [p.name for p in store.root.glob("*.pack")] == [pack_name(1)]
+        assert reopened.get("detectedPlates", "plate2.jpg") == b"two"
+
+
+def test_crash_after_commit_uses_new_pack(store, monkeypatch):
+    _overwritten(store)
+    calls = []
+    original = store._remove_stale_packs
+
+    def crash():
+        calls.append(1)
+        if len(calls) == 2:
+            raise KeyboardInterrupt
+        original()
+
+    monkeypatch.setattr(store, "_remove_stale_packs", crash)
+    with pytest.raises(KeyboardInterrupt):
+        store.compact()
+
+    with CropStore(store.root) as reopened:
+        assert reopened.pack_path.name == pack_name(1)
+        assert reopened.get("detectedPlates", "plate1.jpg") == b"new"
+        assert reopened.get("detectedPlates", "plate2.jpg") == b"two"
@@ -0,0 +1,126 @@
+import threading
+import time
+
+import pytest
+
+from dbWriter import WriteBehindWriter, WriterClosed
+
+
+@pytest.fixture
+def db_name(db):
+    return db.db_name
+
+
+def test_flush_is_a_durability_barrier(db, db_name):
+    with WriteBehindWriter(db_name, group_window=0.05) as writer:
+        for i in range(25):
+            writer.put(f"T{i}", f"plate{i}.jpg", context=i)
+        assert writer.flush(timeout=10)
+        # Committed rows are visible to another connection
+        assert len(db.get_all()) == 25
+        results = list(writer.completed())
+    assert [done.context for done in results] == list(range(25))
+    assert all(done.row_id and done.error is None for done in results)
+
+
+def test_full_groups_commit_without_waiting_out_the_window(db, db_name):
+    with WriteBehindWriter(db_name, group_size=10, group_window=30) as writer:
+        started = time.monotonic()
+        for i in range(30):
+            writer.put(f"T{i}", f"plate{i}.jpg")
+        assert writer.flush(timeout=10)
+        assert time.monotonic() - started < 10
+    assert len(db.get_all()) == 30
+
+
+def test_failed_group_reports_every_record(db, db_name):
+    db.conn.execute(
+        """
+        CREATE TRIGGER reject_bad BEFORE INSERT ON images
+        WHEN NEW.text = 'BAD' BEGIN SELECT RAISE(ABORT, 'rejected'); END
+    """
+    )
+    with WriteBehindWriter(db_name, group_size=3, group_window=0.5) as writer:
+        for text in ("OK1", "BAD", "OK2", "OK3"):
+            writer.put(text, f"{text}.jpg")
+        writer.flush(timeout=10)
+        results = {done.text: done for done in writer.completed()}
+
+    # The first group rolled back as a whole, the writer kept going
+    for text in ("OK1", "BAD", "OK2"):
+        assert results[text].row_id is None
+        assert "rejected" in results[text].error
+    assert results["OK3"].row_id is not None
+    assert [row["text"] for row in db.get_all()] == ["OK3"]
+
+
+def test_existing_file_is_skipped_unless_replacing(db, db_name):
+    db.insert("OLD", "plate.jpg")
+    with WriteBehindWriter(db_name) as writer:
+        writer.put("NEW", "plate.jpg")
+        writer.flush(timeout=10)
+        (skipped,) = writer.completed()
+    assert skipped.row_id is None and skipped.error is None
+
+    with WriteBehindWriter(db_name, replace=True) as writer:
+        writer.put("NEW", "plate.jpg")
+    assert [row["text"] for row in db.get_all()] == ["NEW"]
+
+
+def test_put_after_close(db_name):
+    writer = WriteBehindWriter(db_name)
+    writer.close()
+    with pytest.raises(WriterClosed):
+        writer.put("T", "plate.jpg")
+
+
+def test_producers_keep_queue_order(db, db_name):
+    with WriteBehindWriter(db_name, max_queue=5, group_window=0.01) as writer:
+
+        def produce(prefix):
+            for i in range(40):
+                writer.put(f"{prefix}{i}", f"{prefix}{i}.jpg")
+
+        threads = [threading.Thread(target=produce, args=(p,)) for p in "ab"]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert writer.flush(timeout=10)
+    assert len(db.get_all()) == 80
+
+
+def test_flush_commits_the_partial_group_now(db, db_name):
+    with WriteBehindWriter(db_name, group_size=100, group_window=30) as writer:
+        writer.put("T", "plate.jpg")
+        started = time.monotonic()
+        assert writer.flush(timeout=10)
+        assert time.monotonic() - started < 5
+    assert len(db.get_all()) == 1
+
+
+def test_close_returns_when_the_thread_died_on_a_full_queue(db_name, monkeypatch):
+    committing = threading.Event()
+    release = threading.Event()
+
+    def dying_commit(self, db, group):
+        committing.set()
+        release.wait(10)
+        raise RuntimeError("disk gone")
+
+    monkeypatch.setattr(WriteBehindWriter, "_commit", dying_commit)
+    writer = WriteBehindWriter(db_name, max_queue=2, group_size=1)
+    writer.put("T0", "plate0.jpg")
+    committing.wait(10)
+    writer.put("T1", "plate1.jpg")
+    writer.put("T2", "plate2.jpg")
+    assert writer.queue.full()
+    release.set()
+    writer.thread.join(10)
+
+    closer = threading.Thread(target=writer.close, daemon=True)
+    closer.start()
+    closer.join(5)
+    assert not closer.is_alive()
+    with pytest.raises(WriterClosed):
+        writer.flush(timeout=1)
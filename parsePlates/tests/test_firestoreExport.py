@@ -0,0 +1,96 @@
+import json
+
+import pytest
+
+import firestoreExport
+from firestoreExport import export, load_watermark, plate_id
+
+
+@pytest.fixture
+def export_dir(tmp_path):
+    return tmp_path / "firestore"
+
+
+def _batches(summary, export_dir):
+    ops = {"insert": [], "update": [], "delete": []}
+    folder = export_dir / summary["folder"]
+    for name in summary["batches"]:
+        batch = json.loads((folder / name).read_text(encoding="utf-8"))
+        for op, items in batch.items():
+            ops[op] += items
+    return ops
+
+
+def test_delta_sorts_inserts_updates_and_deletes(db, export_dir):
+    # Row ids 1.. and plate numbers 101.. differ, the docs use the plate's
+    db.insert("ABC 123", "plate101.jpg")
+    second = db.insert("XYZ 999", "plate102.jpg")
+    summary = export(db, export_dir)
+    assert summary["insert"] == 2
+
+    db.update_text("plate101.jpg", "ABC 128")
+    db.delete_by_id(second)
+    db.insert("NEW 111", "plate103.jpg")
+    ops = _batches(export(db, export_dir), export_dir)
+    assert ops["insert"] == [{"id": "103", "title": "NEW 111"}]
+    assert ops["update"] == [{"id": "101", "title": "ABC 128"}]
+    assert ops["delete"] == ["102"]
+    assert export(db, export_dir) is None
+
+
+def test_doc_id_is_the_plate_number_in_the_file_name(db, export_dir):
+    db.insert("ABC 123", "plate007.jpg")
+    db.insert("XYZ 999", "IMG_42_copy3.jpg")
+    db.insert("NO NUM", "plate.jpg")
+    ops = _batches(export(db, export_dir), export_dir)
+    # Parsed like server/index.ts: the first number, without leading zeros
+    assert [doc["id"] for doc in ops["insert"]] == ["7", "42"]
+    assert plate_id("plate330.jpg") == "330"
+    assert plate_id("plate.jpg") is None
+
+
+def test_redo_since_classifies_against_that_version(db, export_dir):
+    db.insert("ABC 123", "plate11.jpg")
+    db.insert("XYZ 999", "plate12.jpg")
+    export(db, export_dir)
+    since = load_watermark(export_dir)["version"]
+    db.insert("NEW 111", "plate13.jpg")
+    failed = export(db, export_dir)
+
+    # The upload of the second export failed, redo it
+    redo = export(db, export_dir, since=since)
+    ops = _batches(redo, export_dir)
+    assert ops["insert"] == [{"id": "13", "title": "NEW 111"}]
+    assert ops["update"] == []
+    # Written next to the failed export, not over it
+    assert redo["folder"] != failed["folder"]
+    assert _batches(failed, export_dir)["insert"] == ops["insert"]
+
+
+def test_full_export_is_all_inserts(db, export_dir):
+    db.insert("ABC 123", "plate21.jpg", corrected_text="ABC 128")
+    export(db, export_dir)
+    summary = export(db, export_dir, full=True)
+    ops = _batches(summary, export_dir)
+    assert ops["insert"] == [{"id": "21", "title": "ABC 128"}]
+    snapshot = export_dir / summary["folder"] / firestoreExport.SNAPSHOT_FILE
+    assert json.loads(snapshot.read_text(encoding="utf-8")) == ops["insert"]
+
+
+def test_batches_respect_the_limit(db, export_dir):
+    db.insert_batch(
+        [(f"T{i}", f"plate{i}.jpg", None, None, None) for i in range(7)]
+    )
+    summary = export(db, export_dir, batch_size=3)
+    assert summary["batches"] == [f"batch-{n:04d}.json" for n in (1, 2, 3)]
+    assert len(_batches(summary, export_dir)["insert"]) == 7
+
+
+def test_old_watermark_without_history(export_dir):
+    export_dir.mkdir()
+    (export_dir / firestoreExport.WATERMARK_FILE).write_text(
+        json.dumps({"version": 5, "maxId": 3})
+    )
+    watermark = load_watermark(export_dir)
+    assert firestoreExport.uploaded_max_id(watermark, 5) == 3
+    assert firestoreExport.uploaded_max_id(watermark, 4) == 0
@@ -0,0 +1,35 @@
+import numpy as np
+
+import helpers
+from helpers import find_largest_textbox, sort_boxes_by_area
+
+SMALL = [[0, 0], [10, 0], [10, 5], [0, 5]]
+LARGE = [[0, 0], [40, 0], [40, 20], [0, 20]]
+MEDIUM = [[5, 5], [25, 5], [25, 15], [5, 15]]
+
+
+def test_sort_boxes_by_area():
+    boxes, areas = sort_boxes_by_area([SMALL, LARGE, MEDIUM])
+    assert boxes == [LARGE, MEDIUM, SMALL]
+    assert areas == [800, 200, 50]
+    boxes, _ = sort_boxes_by_area([SMALL, LARGE, MEDIUM], ascending=True)
+    assert boxes == [SMALL, MEDIUM, LARGE]
+    assert sort_boxes_by_area([]) == ([], [])
+
+
+class FakeDetector:
+    def __init__(self, boxes):
+        self.boxes = boxes
+
+    def detect(self, img):
+        return self.boxes, [0.9] * len(self.boxes)
+
+
+def test_find_largest_textbox(monkeypatch):
+    img = np.zeros((32, 64, 3), np.uint8)
+    detector = FakeDetector([np.array(SMALL), np.array(LARGE)])
+    monkeypatch.setattr(helpers, "_db_text_detector", lambda *args: detector)
+    assert np.array_equal(find_largest_textbox(img), LARGE)
+
+    detector.boxes = []
+    assert find_largest_textbox(img) is None
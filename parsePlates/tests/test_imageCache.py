@@ -0,0 +1,44 @@
+import cv2
+import numpy as np
+import pytest
+
+from imageCache import ImageCache
+
+
+@pytest.fixture
+def image(tmp_path):
+    path = tmp_path / "plate1.png"
+    cv2.imwrite(str(path), np.zeros((10, 10, 3), dtype=np.uint8))
+    return path
+
+
+def test_second_read_hits(image):
+    cache = ImageCache(1024 * 1024)
+    first = cache.imread(image)
+    assert cache.imread(image) is first
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_cached_arrays_are_read_only(image):
+    img = ImageCache(1024 * 1024).imread(image)
+    with pytest.raises(ValueError):
+        img[0, 0] = 255
+    # Slices are views of the cached array, still read-only
+    with pytest.raises(ValueError):
+        img[2:4, 2:4] += 1
+
+
+def test_evicts_least_recently_used_by_bytes():
+    cache = ImageCache(250)
+    for key in "abc":
+        cache.get_or_load(key, lambda: np.zeros(100, dtype=np.uint8))
+    assert list(cache.entries) == ["b", "c"]
+    assert cache.evictions == 1
+
+
+def test_rewritten_file_misses(image):
+    cache = ImageCache(1024 * 1024)
+    cache.imread(image)
+    cv2.imwrite(str(image), np.full((12, 10, 3), 255, dtype=np.uint8))
+    assert cache.imread(image).shape == (12, 10, 3)
+    assert cache.misses == 2
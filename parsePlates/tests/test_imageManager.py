@@ -0,0 +1,176 @@
+import sqlite3
+
+import pytest
+
+from ImageManager import (
+    IMAGE_MIGRATIONS,
+    TIER_MISSED,
+    TIER_NO_BOX,
+    TIER_YOLO,
+    ImageManager,
+    tuple_factory,
+)
+
+
+def test_processed_names_include_images_without_a_plate(db):
+    db.insert("ABC 123", "read.jpg")
+    db.record_detection("read.jpg", TIER_YOLO, 0.9, [[0, 0], [1, 0], [1, 1], [0, 1]])
+    db.record_detection("empty.jpg", TIER_NO_BOX)
+    assert sorted(db.iter_processed_names()) == ["empty.jpg", "read.jpg"]
+
+
+def test_crop_tiers_of_many_names(db):
+    names = [f"plate{i}.jpg" for i in range(1200)]
+    for i, name in enumerate(names):
+        db.record_detection(name, TIER_YOLO if i % 2 else TIER_NO_BOX)
+    tiers = db.get_crop_tiers(names + ["unknown.jpg"])
+    assert len(tiers) == 1200
+    assert tiers["plate1.jpg"] == TIER_YOLO
+    assert tiers["plate2.jpg"] == TIER_NO_BOX
+
+
+def test_select_for_reprocessing_pages_both_branches(db):
+    for i in range(20):
+        name = f"plate{i:02d}.jpg"
+        if i % 4:
+            db.insert(f"T{i}", name, ocr_confidence=i / 20, ocr_model="ocr-1")
+        # Every fourth image was missed, a detection without an image row
+        tier = TIER_YOLO if i % 4 else TIER_MISSED
+        db.record_detection(name, tier, i / 20, model="yolo-1" if i < 10 else "yolo-2")
+
+    rows = list(db.select_for_reprocessing(max_yolo_confidence=0.5, page_size=3))
+    assert [row["fileName"] for row in rows] == [f"plate{i:02d}.jpg" for i in range(10)]
+    assert [row["id"] is None for row in rows[:4]] == [True, False, False, False]
+
+    # OCR criteria never match a missed plate
+    rows = db.select_for_reprocessing(max_ocr_confidence=0.3, page_size=2)
+    expected = ["plate01.jpg", "plate02.jpg", "plate03.jpg", "plate05.jpg"]
+    assert [row["fileName"] for row in rows] == expected
+
+    # Detected by an older model, or missed
+    rows = db.select_for_reprocessing(
+        tiers=(TIER_MISSED,), detect_model="yolo-2", page_size=4
+    )
+    expected = [f"plate{i:02d}.jpg" for i in range(10)] + ["plate12.jpg", "plate16.jpg"]
+    assert [row["fileName"] for row in rows] == expected
+
+
+def _fill(db, count=25):
+    for i in range(count):
+        db.insert(f"{'ABC' if i % 3 else 'XYZ'} {i:03d}", f"plate{i:03d}.jpg")
+    return [row[0] for row in db.iter_query("SELECT id FROM images ORDER BY id")]
+
+
+def test_iter_images_returns_every_row_once_across_pages(db):
+    ids = _fill(db)
+    # 25 rows, pages of 7 and of exactly the table size, then filters
+    for page_size in (1, 7, 25, 100):
+        rows = db.iter_images(page_size=page_size, row_factory=tuple_factory)
+        assert [row[0] for row in rows] == ids
+    rows = db.iter_images(columns=["fileName"], after_id=ids[9], page_size=4)
+    assert [row["id"] for row in rows] == ids[10:]
+    rows = db.iter_images(text="XYZ", page_size=3)
+    assert [row["id"] for row in rows] == ids[::3]
+    rows = db.iter_images(where="id % 2 = 0", file_name="plate", page_size=2)
+    assert [row["id"] for row in rows] == [i for i in ids if i % 2 == 0]
+
+
+def test_iter_images_allows_writes_between_pages(db):
+    ids = _fill(db)
+    seen = []
+    for row in db.iter_images(page_size=7):
+        seen.append(row["id"])
+        db.update_text(row["fileName"], row["text"].lower())
+    assert seen == ids
+    assert all(row["text"].islower() for row in db.iter_images())
+
+
+def test_iter_query_streams_every_row_once(db):
+    ids = _fill(db)
+    rows = db.iter_query("SELECT id FROM images ORDER BY id", page_size=4)
+    assert [row["id"] for row in rows] == ids
+
+
+def test_iter_images_raises_instead_of_truncating(db):
+    _fill(db)
+    with pytest.raises(sqlite3.Error):
+        list(db.iter_images(where="no_such_column = 1"))
+    # A page failing after the first one must not look like the end
+    rows = db.iter_images(page_size=7)
+    assert next(rows)["id"] == 1
+    db.conn.execute("DROP TABLE images")
+    with pytest.raises(sqlite3.Error):
+        list(rows)
+
+
+def _legacy_db(path):
+    """An 'images' table as the first release created it, with rows."""
+    conn = sqlite3.connect(path)
+    conn.execute(
+        """
+        CREATE TABLE images (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            text TEXT NOT NULL,
+            fileName TEXT NOT NULL,
+            correctedText TEXT
+        )
+    """
+    )
+    conn.executemany(
+        "INSERT INTO images (text, fileName, correctedText) VALUES (?, ?, ?)",
+        [("ABC 123", "a.jpg", None), ("XYZ 999", "b.jpg", "XYZ 998")],
+    )
+    conn.commit()
+    conn.close()
+
+
+def test_legacy_database_is_migrated(tmp_path):
+    path = str(tmp_path / "legacy.db")
+    _legacy_db(path)
+    with ImageManager(path) as db:
+        db.create_table()
+        columns = {row[1] for row in db.conn.execute("PRAGMA table_info(images)")}
+        assert set(IMAGE_MIGRATIONS) <= columns
+        rows = db.get_all()
+        assert [row["correctedText"] for row in rows] == [None, "XYZ 998"]
+        assert all(row["ocrModel"] is None for row in rows)
+
+        # Old rows count as changed once, in id order
+        assert db.current_version() == 2
+        assert [row["id"] for row in db.iter_changes(0)] == [1, 2]
+
+        # Running it again leaves the versions alone
+        db.create_table()
+        assert db.current_version() == 2
+
+        new_id = db.insert("NEW 111", "c.jpg")
+        db.update_text("a.jpg", "ABC 128")
+        db.delete_by_id(2)
+        assert [row["id"] for row in db.iter_changes(2)] == [new_id, 1]
+        assert [row["id"] for row in db.iter_deletions(2)] == [2]
+        assert db.current_version() == 5
+
+
+def test_tombstones_gain_the_file_name(tmp_path):
+    path = str(tmp_path / "legacy.db")
+    _legacy_db(path)
+    conn = sqlite3.connect(path)
+    # Change tracking as it was before tombstones kept the file name
+    conn.executescript(
+        """
+        CREATE TABLE deletedImages (
+            id INTEGER PRIMARY KEY,
+            version INTEGER NOT NULL,
+            deletedAt TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP
+        );
+        CREATE TRIGGER images_track_delete AFTER DELETE ON images
+        BEGIN
+            INSERT OR REPLACE INTO deletedImages (id, version) VALUES (OLD.id, 0);
+        END;
+    """
+    )
+    conn.close()
+    with ImageManager(path) as db:
+        db.create_table()
+        db.delete_by_id(2)
+        assert [row["fileName"] for row in db.iter_deletions(0)] == ["b.jpg"]
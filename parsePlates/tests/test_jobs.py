@@ -0,0 +1,216 @@
+"""
+The 'jobs' queue, and read_text workers sharing it from several processes
+with the OCR stubbed out.
+"""
+
+import multiprocessing as mp
+import os
+from pathlib import Path
+
+import pytest
+
+from ImageManager import JOB_DONE, JOB_LEASED, JOB_PENDING, ImageManager
+
+WORKERS = 4
+CROPS = 60
+
+
+def test_claim_leases_each_job_once(db):
+    db.create_jobs_table()
+    assert db.enqueue_jobs("read", [f"p{i}.jpg" for i in range(25)]) == 25
+    # Enqueueing the same folder again is a no-op
+    assert db.enqueue_jobs("read", ["p0.jpg"]) == 0
+
+    first = db.claim_jobs("read", "a", batch_size=10)
+    second = db.claim_jobs("read", "b", batch_size=10)
+    assert len(first) == len(second) == 10
+    assert not {job["id"] for job in first} & {job["id"] for job in second}
+    assert db.job_counts("read") == {JOB_LEASED: 20, JOB_PENDING: 5}
+
+
+def test_expired_lease_is_claimed_again(db):
+    db.create_jobs_table()
+    db.enqueue_jobs("read", ["p0.jpg", "p1.jpg"])
+    dead = db.claim_jobs("read", "dead", lease_seconds=-1)
+    assert len(dead) == 2
+
+    retried = db.claim_jobs("read", "alive")
+    assert [job["attempts"] for job in retried] == [2, 2]
+    # The dead worker's lease is gone, completing it changes nothing
+    assert db.complete_jobs([job["id"] for job in dead], "dead") == 0
+    assert db.complete_jobs([job["id"] for job in retried], "alive") == 2
+    assert db.job_counts("read") == {JOB_DONE: 2}
+
+
+def test_requeue_expired_jobs(db):
+    db.create_jobs_table()
+    db.enqueue_jobs("read", ["p0.jpg"])
+    db.claim_jobs("read", "dead", lease_seconds=-1)
+    assert db.requeue_expired_jobs("read") == 1
+    assert db.job_counts("read") == {JOB_PENDING: 1}
+
+
+def test_job_failed_after_max_attempts(db):
+    db.create_jobs_table()
+    db.enqueue_jobs("read", ["p0.jpg"])
+    for _ in range(3):
+        db.claim_jobs("read", "dead", lease_seconds=-1)
+    assert db.claim_jobs("read", "alive") == []
+    assert db.job_counts("read") == {"failed": 1}
+
+
+def _stub_read_text(workdir: Path, ocr_log: Path):
+    """Point readPlates at workdir and replace the OCR with a log line."""
+    import readPlates
+
+    os.chdir(workdir)
+    readPlates.DB_NAME = str(workdir / "plates.db")
+    readPlates.RESULTS_LOG_PATH = str(ocr_log.with_suffix(".jsonl"))
+    readPlates.RESULTS_PATH = str(ocr_log.with_suffix(".json"))
+
+    def fake_ocr(ocr, image_path, reads_path, crop_store=None):
+        with open(ocr_log, "a", encoding="utf-8") as f:
+            f.write(image_path.name + "\n")
+        return [(image_path.stem.upper(), str(image_path), 0.9)]
+
+    readPlates._create_ocr = lambda: None
+    readPlates._ocr_plate = fake_ocr
+    return readPlates
+
+
+def _read_worker(workdir: str, worker_id: str):
+    import metrics
+
+    metrics.set_log_level("warning")
+    workdir = Path(workdir)
+    readPlates = _stub_read_text(workdir, workdir / f"ocr-{worker_id}.log")
+    readPlates.read_text(
+        workdir / "detectedPlates",
+        use_queue=True,
+        worker_id=worker_id,
+        compact_results=False,
+    )
+
+
+def _crops(workdir: Path) -> Path:
+    crops = workdir / "detectedPlates"
+    crops.mkdir()
+    for i in range(CROPS):
+        (crops / f"p{i:03d}.jpg").touch()
+    return crops
+
+
+def test_workers_process_each_crop_once(tmp_path):
+    crops = _crops(tmp_path)
+    with ImageManager(str(tmp_path / "plates.db")) as db:
+        db.create_table()
+        db.create_jobs_table()
+        db.enqueue_jobs("read", sorted(str(path) for path in crops.iterdir()))
+        # A worker that died holding a batch, its lease already ran out
+        abandoned = db.claim_jobs("read", "dead", batch_size=10, lease_seconds=-1)
+
+    context = mp.get_context("spawn")
+    workers = [
+        context.Process(target=_read_worker, args=(str(tmp_path), f"w{i}"))
+        for i in range(WORKERS)
+    ]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join(120)
+        assert worker.exitcode == 0
+
+    ocr_calls = []
+    for log_path in tmp_path.glob("ocr-*.log"):
+        ocr_calls += log_path.read_text(encoding="utf-8").split()
+    assert sorted(ocr_calls) == sorted(path.name for path in crops.iterdir())
+
+    with ImageManager(str(tmp_path / "plates.db")) as db:
+        assert db.job_counts("read") == {JOB_DONE: CROPS}
+        assert len(db.get_all()) == CROPS
+        cursor = db.conn.execute(
+            "SELECT attempts FROM jobs WHERE id IN (%s)"
+            % ",".join(str(job["id"]) for job in abandoned)
+        )
+        assert {attempts for (attempts,) in cursor} == {2}
+
+
+def test_worker_id_without_queue_lists_the_folder(tmp_path, monkeypatch):
+    crops = _crops(tmp_path)
+    import readPlates
+
+    # Saved first so the stubs are undone after the test
+    monkeypatch.chdir(tmp_path)
+    for name in (
+        "DB_NAME",
+        "RESULTS_LOG_PATH",
+        "RESULTS_PATH",
+        "_create_ocr",
+        "_ocr_plate",
+    ):
+        monkeypatch.setattr(readPlates, name, getattr(readPlates, name))
+    _stub_read_text(tmp_path, tmp_path / "ocr.log")
+
+    readPlates.read_text(crops, worker_id="w0", compact_results=False)
+
+    with ImageManager(readPlates.DB_NAME) as db:
+        assert len(db.get_all()) == CROPS
+        tables = db.conn.execute(
+            "SELECT name FROM sqlite_master WHERE name = 'jobs'"
+        ).fetchall()
+        assert tables == []
+
+
+def test_batches_complete_after_their_rows_commit(tmp_path, monkeypatch):
+    crops = _crops(tmp_path)
+    (crops / "bad.jpg").touch()
+    import readPlates
+
+    monkeypatch.chdir(tmp_path)
+    for name in (
+        "DB_NAME",
+        "RESULTS_LOG_PATH",
+        "RESULTS_PATH",
+        "_create_ocr",
+        "_ocr_plate",
+    ):
+        monkeypatch.setattr(readPlates, name, getattr(readPlates, name))
+    _stub_read_text(tmp_path, tmp_path / "ocr.log")
+    with ImageManager(readPlates.DB_NAME) as db:
+        db.create_table()
+        # Fails the whole group 'BAD' is committed in
+        db.conn.execute(
+            """
+            CREATE TRIGGER reject_bad BEFORE INSERT ON images
+            WHEN NEW.text = 'BAD' BEGIN SELECT RAISE(ABORT, 'rejected'); END
+        """
+        )
+
+    unwritten = []
+    complete_jobs = ImageManager.complete_jobs
+
+    def checked_complete(self, job_ids, worker, error=None):
+        if error is None:
+            unwritten.extend(
+                self.conn.execute(
+                    """
+                    SELECT j.filePath FROM jobs j
+                    LEFT JOIN images i ON i.fileName = substr(j.filePath, ?)
+                    WHERE i.id IS NULL AND j.id IN (%s)
+                """
+                    % ",".join("?" * len(job_ids)),
+                    (len(str(crops)) + 2, *job_ids),
+                ).fetchall()
+            )
+        return complete_jobs(self, job_ids, worker, error)
+
+    monkeypatch.setattr(ImageManager, "complete_jobs", checked_complete)
+    readPlates.read_text(crops, use_queue=True, compact_results=False)
+
+    assert unwritten == []
+    with ImageManager(readPlates.DB_NAME) as db:
+        failed = {row["fileName"] for row in db.get_quarantined("write")}
+        assert "bad.jpg" in failed
+        counts = db.job_counts("read")
+        assert counts == {JOB_DONE: CROPS + 1 - len(failed), "failed": len(failed)}
+        assert len(db.get_all()) == CROPS + 1 - len(failed)
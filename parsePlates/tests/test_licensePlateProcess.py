@@ -0,0 +1,74 @@
+"""LicensePlateProcess.run with a stand-in for the YOLO model."""
+
+import cv2
+import numpy as np
+import pytest
+
+import imageCache
+from imageCache import ImageCache
+from LicensePlateProcess import LicensePlateProcess
+
+IMAGES = 30
+SIDE = 100
+
+
+class _Array(np.ndarray):
+    """Stands in for a torch tensor: .cpu().numpy()."""
+
+    def cpu(self):
+        return self
+
+    def numpy(self):
+        return np.asarray(self)
+
+
+class _Boxes:
+    def __init__(self, img):
+        h, w = img.shape[:2]
+        self.xyxy = np.array([[10, 20, w - 10, h - 20]], dtype=np.float32).view(_Array)
+        self.conf = np.array([0.95])
+
+    def __len__(self):
+        return len(self.xyxy)
+
+
+class _Result:
+    def __init__(self, img):
+        self.boxes = _Boxes(img)
+        self.speed = {"inference": 1.0}
+
+
+class FakeYOLO:
+    def __init__(self):
+        self.calls = []
+
+    def __call__(self, images, **options):
+        self.calls.append(len(images))
+        return [_Result(img) for img in images]
+
+
+@pytest.fixture
+def folder(tmp_path):
+    images = tmp_path / "images"
+    images.mkdir()
+    for i in range(IMAGES):
+        img = np.full((SIDE, SIDE, 3), i, dtype=np.uint8)
+        cv2.imwrite(str(images / f"plate{i:02d}.png"), img)
+    return images
+
+
+def test_crop_reuses_the_detect_decode(tmp_path, folder, monkeypatch):
+    # Room for about one YOLO batch (10 images) of decodes
+    cache = ImageCache(12 * SIDE * SIDE * 3)
+    monkeypatch.setattr(imageCache, "_cache", cache)
+    processor = LicensePlateProcess(None)
+    processor.model = FakeYOLO()
+
+    processor.run(folder, tmp_path / "output")
+
+    assert processor.model.calls == [10, 10, 10]
+    crops = sorted(p.name for p in (tmp_path / "output/detectedPlates").iterdir())
+    assert crops == sorted(p.name for p in folder.iterdir())
+    # One decode per image, detect_plate_bbox and crop_plate both hit it
+    assert cache.misses == IMAGES
+    assert cache.hits == 2 * IMAGES
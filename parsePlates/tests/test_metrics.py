@@ -0,0 +1,96 @@
+import json
+
+import pytest
+
+import metrics
+from metrics import BUCKETS, Histogram, Metrics
+
+
+def test_quantiles_interpolate_inside_buckets():
+    hist = Histogram()
+    for _ in range(100):
+        hist.observe(0.02)
+    # All in the (0.01, 0.025] bucket
+    assert 0.01 < hist.quantile(0.5) <= 0.025
+    assert hist.quantile(0.99) <= 0.025
+    assert Histogram().quantile(0.5) == 0.0
+
+    hist.observe(1000)
+    assert hist.buckets[-1] == 1
+    assert hist.quantile(1.0) == BUCKETS[-1]
+
+
+def test_summary_counts_stages_counters_and_gauges():
+    registry = Metrics()
+    registry.observe("ocr", 0.2, image="a.jpg")
+    registry.observe("ocr", 0.4, image="b.jpg", error="Timeout")
+    registry.count("plates_images_total", stage="crop", result="missed")
+    registry.count("plates_images_total", 2, stage="crop", result="missed")
+    registry.gauge("plates_db_queue_depth", 7)
+    registry.gauge("plates_db_queue_depth", 3)
+
+    summary = registry.summary()
+    assert summary["stages"]["ocr"]["count"] == 2
+    assert summary["stages"]["ocr"]["mean"] == pytest.approx(0.3)
+    counters = {c["name"]: c for c in summary["counters"]}
+    assert counters["plates_images_total"]["value"] == 3
+    assert counters["plates_images_total"]["labels"] == {
+        "result": "missed",
+        "stage": "crop",
+    }
+    assert counters["plates_stage_errors_total"]["labels"] == {"stage": "ocr"}
+    assert summary["gauges"] == [
+        {"name": "plates_db_queue_depth", "labels": {}, "value": 3}
+    ]
+
+
+def test_prometheus_text():
+    registry = Metrics()
+    registry.observe("yolo", 0.003)
+    registry.count("plates_db_commits_total", result="ok")
+    registry.gauge("plates_db_queue_depth", 4)
+    lines = registry.to_prometheus().splitlines()
+
+    buckets = [line for line in lines if line.startswith("plates_stage_seconds_b")]
+    assert len(buckets) == len(BUCKETS) + 1
+    # Cumulative: 0 below the observation, 1 from its bucket up to +Inf
+    assert buckets[0].endswith(" 0") and buckets[-1].endswith(" 1")
+    assert 'plates_stage_seconds_bucket{stage="yolo",le="+Inf"} 1' in lines
+    assert "# TYPE plates_db_commits_total counter" in lines
+    assert 'plates_db_commits_total{result="ok"} 1' in lines
+    assert "# TYPE plates_db_queue_depth gauge" in lines
+    assert "plates_db_queue_depth{} 4" in lines
+
+
+def test_span_traces_errors(tmp_path):
+    registry = Metrics(tmp_path / "trace.jsonl")
+    with registry.span("decode", image="a.jpg"):
+        pass
+    with pytest.raises(ValueError):
+        with registry.span("ocr", image="b.jpg"):
+            raise ValueError("bad crop")
+    registry.close()
+
+    spans = [json.loads(line) for line in open(tmp_path / "trace.jsonl")]
+    assert [(s["stage"], s["image"], s["error"]) for s in spans] == [
+        ("decode", "a.jpg", None),
+        ("ocr", "b.jpg", "ValueError: bad crop"),
+    ]
+
+
+def test_export_writes_both_files(tmp_path):
+    registry = Metrics()
+    registry.observe("crop", 0.01)
+    registry.export(tmp_path / "metrics")
+    summary = json.loads((tmp_path / "metrics" / "metrics.json").read_text())
+    assert summary["stages"]["crop"]["count"] == 1
+    assert (tmp_path / "metrics" / "metrics.prom").exists()
+    assert not list((tmp_path / "metrics").glob("*.tmp"))
+
+
+def test_log_level(capsys):
+    metrics.set_log_level("warning")
+    metrics.log("per row", "info")
+    metrics.log("problem", "warning")
+    assert capsys.readouterr().out == "problem\n"
+    assert not metrics.log_enabled("debug")
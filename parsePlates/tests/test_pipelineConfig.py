@@ -0,0 +1,64 @@
+import json
+
+import pytest
+
+import pipelineConfig
+from pipelineConfig import (
+    CONFIG_ENV,
+    DEFAULTS,
+    configure,
+    get_config,
+    load_config,
+    save_config,
+)
+
+
+@pytest.fixture(autouse=True)
+def fresh_config(monkeypatch, tmp_path):
+    """No process wide settings or config file from outside the test."""
+    monkeypatch.setattr(pipelineConfig, "_config", None)
+    monkeypatch.delenv(CONFIG_ENV, raising=False)
+    monkeypatch.chdir(tmp_path)
+
+
+def test_defaults_without_a_file():
+    assert load_config() == DEFAULTS
+    assert get_config() is get_config()
+
+
+def test_file_overrides_only_its_keys(tmp_path):
+    path = tmp_path / "pipeline.json"
+    path.write_text(json.dumps({"yolo_batch": "16", "ocr_rel_tol": 1}))
+    config = load_config(path)
+    assert config["yolo_batch"] == 16
+    # Keeps the default's type
+    assert isinstance(config["ocr_rel_tol"], float)
+    assert config["crop_width"] == DEFAULTS["crop_width"]
+
+
+def test_env_names_the_file(tmp_path, monkeypatch):
+    path = tmp_path / "tuned.json"
+    path.write_text(json.dumps({"crop_width": 640}))
+    monkeypatch.setenv(CONFIG_ENV, str(path))
+    assert get_config()["crop_width"] == 640
+
+
+def test_missing_explicit_file_and_unknown_keys(tmp_path):
+    with pytest.raises(FileNotFoundError):
+        load_config(tmp_path / "missing.json")
+    path = tmp_path / "pipeline.json"
+    path.write_text(json.dumps({"yolo_batchsize": 16}))
+    with pytest.raises(ValueError, match="yolo_batchsize"):
+        load_config(path)
+
+
+def test_save_writes_only_changes(tmp_path):
+    path = tmp_path / "source" / "pipeline.json"
+    save_config({**DEFAULTS, "fallback_confidence": 0.65}, path)
+    assert json.loads(path.read_text()) == {"fallback_confidence": 0.65}
+    assert load_config(path) == {**DEFAULTS, "fallback_confidence": 0.65}
+
+
+def test_configure_installs_settings():
+    configure({"yolo_imgsz": 320})
+    assert get_config() == {**DEFAULTS, "yolo_imgsz": 320}
@@ -0,0 +1,103 @@
+"""The daemon's socket protocol, with the models stubbed out."""
+
+import shutil
+import socket
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+import pytest
+
+import plateDaemon
+import resourceScheduler
+from plateDaemon import PlateWorker, process, serve, submit
+
+pytestmark = pytest.mark.skipif(
+    not hasattr(socket, "AF_UNIX"), reason="needs Unix sockets"
+)
+
+
+class FakeWorker(PlateWorker):
+    """PlateWorker's request handling without loading any model."""
+
+    def __init__(self, model_path=None, db_name=None):
+        self.load_seconds = 0.0
+
+    def run(self, target, output_path=plateDaemon.OUTPUT_PATH, replace=False):
+        return [{"fileName": Path(target).name, "output": str(output_path)}]
+
+
+@pytest.fixture
+def socket_path(monkeypatch):
+    monkeypatch.setattr(plateDaemon, "PlateWorker", FakeWorker)
+    monkeypatch.setattr(
+        resourceScheduler,
+        "configure",
+        lambda: resourceScheduler.ResourceScheduler(total_cores=1),
+    )
+    # AF_UNIX paths are limited to about 100 bytes, tmp_path can be longer
+    folder = tempfile.mkdtemp(prefix="plates-")
+    yield str(Path(folder) / "plates.sock")
+    shutil.rmtree(folder)
+
+
+def _serve(socket_path):
+    thread = threading.Thread(target=serve, args=(socket_path,), daemon=True)
+    thread.start()
+    deadline = time.monotonic() + 10
+    while submit({"command": "ping"}, socket_path, timeout=1) is None:
+        assert time.monotonic() < deadline, "daemon didn't start"
+        time.sleep(0.02)
+    return thread
+
+
+def test_ping_process_stop(socket_path):
+    thread = _serve(socket_path)
+    assert submit({"command": "ping"}, socket_path)["ok"]
+
+    response = process("plate7.jpg", "out", socket_path)
+    assert response["mode"] == "daemon"
+    assert response["results"][0]["fileName"] == "plate7.jpg"
+    # Paths are sent absolute, the daemon may run from elsewhere
+    assert Path(response["results"][0]["output"]).is_absolute()
+
+    unknown = submit({"command": "reload"}, socket_path)
+    assert not unknown["ok"] and "reload" in unknown["error"]
+
+    assert submit({"command": "stop"}, socket_path) == {"ok": True}
+    thread.join(10)
+    assert not thread.is_alive()
+    assert not Path(socket_path).exists()
+    assert submit({"command": "ping"}, socket_path) is None
+
+
+def test_stale_socket_file_is_replaced(socket_path):
+    # Bound and closed without unlinking, like a daemon that was killed
+    stale = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    stale.bind(socket_path)
+    stale.close()
+    assert Path(socket_path).exists()
+
+    thread = _serve(socket_path)
+    assert submit({"command": "stop"}, socket_path) == {"ok": True}
+    thread.join(10)
+
+
+def test_second_daemon_refuses_to_start(socket_path):
+    thread = _serve(socket_path)
+    try:
+        with pytest.raises(SystemExit):
+            serve(socket_path)
+    finally:
+        submit({"command": "stop"}, socket_path)
+        thread.join(10)
+
+
+def test_in_process_fallback(socket_path):
+    response = process("plate7.jpg", "out", socket_path)
+    assert response["ok"] and response["mode"] == "in-process"
+    assert response["results"][0]["fileName"] == "plate7.jpg"
+
+    refused = process("plate7.jpg", "out", socket_path, fallback=False)
+    assert not refused["ok"]
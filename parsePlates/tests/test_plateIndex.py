@@ -0,0 +1,63 @@
+from plateIndex import PlateIndex, bounded_distance
+
+
+def test_bounded_distance():
+    assert bounded_distance("ABC123", "ABC123", 2) == 0
+    assert bounded_distance("ABC123", "A8C123", 2) == 1
+    assert bounded_distance("ABC123", "ABC1234", 2) == 1
+    # Further than max_distance reports max_distance + 1
+    assert bounded_distance("ABC123", "XYZ789", 2) == 3
+
+
+def test_uncorrected_reads_are_not_suggested():
+    index = PlateIndex.from_rows([("ABC 128", None), ("ABC 12B", None)])
+    assert len(index) == 0
+    assert index.suggest("ABC 123") is None
+
+
+def test_suggests_the_nearest_correction():
+    index = PlateIndex.from_rows([("A8C 123", "ABC 123"), ("XYZ 999", "XYZ 999")])
+    suggestion = index.suggest("ABC 12B")
+    assert suggestion["plate"] == "ABC 123"
+    assert suggestion["distance"] == 1
+
+
+def test_repeated_mistake_suggests_its_fix():
+    index = PlateIndex.from_rows([("A8C 123", "ABC 123")])
+    assert index.suggest("A8C 123") == {"plate": "ABC 123", "distance": 0, "seen": 1}
+
+
+def test_ties_go_to_the_most_seen():
+    index = PlateIndex()
+    index.add("ABC 124", "ABC 124")
+    for _ in range(3):
+        index.add("ABC 125", "ABC 125")
+    assert index.suggest("ABC 12X")["plate"] == "ABC 125"
+
+
+def test_from_db_uses_corrected_rows(db):
+    db.insert("A8C 123", "plate1.jpg", corrected_text="ABC 123")
+    db.insert("ABC 12B", "plate2.jpg")
+    index = PlateIndex.from_db(db)
+    assert index.suggest("ABC 12B")["plate"] == "ABC 123"
+    assert sorted(index.plates) == ["ABC 123", "ABC 123"]
+
+
+def test_refresh_picks_up_new_corrections(db):
+    db.insert("A8C 123", "plate1.jpg", corrected_text="ABC 123")
+    db.insert("XYZ 99Q", "plate2.jpg")
+    index = PlateIndex.from_db(db)
+    assert index.suggest("XYZ 99Q") is None
+    assert index.refresh(db) == 0
+
+    # Corrected on the site while the index is in use
+    with db.conn:
+        db.conn.execute(
+            "UPDATE images SET correctedText = 'XYZ 999' WHERE fileName = ?",
+            ("plate2.jpg",),
+        )
+    db.insert("NEW 111", "plate3.jpg")
+    assert index.refresh(db) == 1
+    assert index.suggest("XYZ 99Q")["plate"] == "XYZ 999"
+    assert index.version == db.current_version()
+    assert index.refresh(db) == 0
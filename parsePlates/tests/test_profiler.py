@@ -0,0 +1,30 @@
+import tracemalloc
+
+import pytest
+
+from profiler import ProfileSession
+
+
+@pytest.fixture
+def session(tmp_path):
+    tracing = tracemalloc.is_tracing()
+    session = ProfileSession(["tracemalloc"], tmp_path)
+    yield session
+    session.finished = True
+    if not tracing:
+        tracemalloc.stop()
+
+
+def test_allocations_exclude_the_profiler(session):
+    with session.stage("read"):
+        kept = [bytearray(1024) for _ in range(200)]
+
+    lines = session.summary()["read"]["topAllocations"]
+    files = {line["line"].rsplit(":", 1)[0] for line in lines}
+    assert any(path.endswith("test_profiler.py") for path in files)
+    assert not any(
+        path.endswith(("profiler.py", "contextlib.py", "tracemalloc.py"))
+        and not path.endswith("test_profiler.py")
+        for path in files
+    )
+    del kept
@@ -0,0 +1,69 @@
+"""
+The reworked recognize_text / read_text loop bodies against the old ones
+kept in benchmarks.hotloops.
+"""
+
+import numpy as np
+import pytest
+
+from benchmarks.hotloops import (
+    FixedDetector,
+    legacy_plate_text,
+    legacy_preprocess,
+    ocr_results,
+    plates,
+)
+from readPlates import Scratch, _plate_text, _preprocess_plate
+
+
+@pytest.fixture(scope="module")
+def images():
+    return plates(12, seed=1)
+
+
+@pytest.mark.parametrize("otsu", [False, True])
+def test_preprocess_matches_the_old_crop(images, otsu):
+    detect = FixedDetector()
+    # One scratch for all, each crop must not depend on the previous one
+    scratch = Scratch()
+    for image in images:
+        detect.fail = otsu
+        crop = _preprocess_plate(image, scratch, detect=detect)
+        detect.fail = otsu
+        assert np.array_equal(crop, legacy_preprocess(image, detect))
+
+
+def test_preprocess_without_text():
+    image = plates(1, seed=2)[0]
+    assert _preprocess_plate(image, Scratch(), detect=lambda img: None) is None
+
+
+def test_plate_text_matches_the_old_text():
+    # Boxes sharing a coordinate are the one intended difference, see below
+    def distinct(res):
+        columns = res["rec_boxes"].T.tolist()
+        return all(len(set(column)) == len(column) for column in columns)
+
+    results = [res for res in ocr_results(300, seed=3) if distinct(res)]
+    assert len(results) > 20
+    for res in results:
+        text, confidence = _plate_text(res)
+        old_text, old_confidence = legacy_plate_text(res)
+        assert text == old_text
+        assert confidence == pytest.approx(old_confidence)
+    empty = {"rec_boxes": np.zeros((0, 4)), "rec_texts": [], "rec_scores": []}
+    assert _plate_text(empty) is None
+
+
+def test_same_y_boxes_keep_their_own_text():
+    res = {
+        "rec_boxes": np.array(
+            [[10, 90, 110, 200], [130, 90, 230, 200], [0, 0, 50, 20]], np.int16
+        ),
+        "rec_texts": ["ABC", "123", "state"],
+        "rec_scores": np.array([0.9, 0.8, 0.99]),
+    }
+    assert _plate_text(res) == ("ABC 123", 0.8)
+    # The old per-box np.where matched any equal coordinate, so the second
+    # box found the first one's row
+    assert legacy_plate_text(res)[0] == "ABC ABC"
@@ -0,0 +1,141 @@
+import os
+import threading
+
+import pytest
+
+import resourceScheduler
+from resourceScheduler import (
+    AFFINITY_ENV,
+    THREAD_ENV_VARS,
+    THREADS_ENV,
+    ResourceScheduler,
+    parse_cpu_set,
+)
+
+
+class FakeAffinity:
+    """sched_get/setaffinity over a fake /proc/self/task."""
+
+    def __init__(self, masks):
+        self.masks = dict(masks)
+        self.calls = []
+
+    def thread_ids(self):
+        return list(self.masks)
+
+    def get(self, tid):
+        return set(self.masks[tid])
+
+    def set(self, tid, cpus):
+        if tid not in self.masks:
+            raise ProcessLookupError(tid)
+        self.calls.append((tid, set(cpus)))
+        self.masks[tid] = set(cpus)
+
+
+@pytest.fixture
+def affinity(monkeypatch):
+    fake = FakeAffinity({0: {0, 1, 2, 3}, 101: {0, 1, 2, 3}, 102: {2, 3}})
+    monkeypatch.setattr(resourceScheduler, "_thread_ids", fake.thread_ids)
+    monkeypatch.setattr(os, "sched_getaffinity", fake.get, raising=False)
+    monkeypatch.setattr(os, "sched_setaffinity", fake.set, raising=False)
+    return fake
+
+
+def test_stage_pins_and_restores_every_thread(affinity):
+    scheduler = ResourceScheduler(affinity={"ocr": {1}}, total_cores=4)
+    with scheduler.stage("ocr"):
+        assert affinity.masks == {0: {1}, 101: {1}, 102: {1}}
+        # Started inside the block, e.g. a pool paddle spun up
+        affinity.masks[103] = {1}
+    # Each back to its own mask, the new one to the caller's
+    assert affinity.masks == {
+        0: {0, 1, 2, 3},
+        101: {0, 1, 2, 3},
+        102: {2, 3},
+        103: {0, 1, 2, 3},
+    }
+
+
+def test_stage_skips_threads_that_exited(affinity):
+    scheduler = ResourceScheduler(affinity={"db": {0}}, total_cores=4)
+    with scheduler.stage("db"):
+        del affinity.masks[101]
+    assert affinity.masks == {0: {0, 1, 2, 3}, 102: {2, 3}}
+
+
+def test_stage_without_affinity_touches_nothing(affinity):
+    with ResourceScheduler(total_cores=4).stage("yolo"):
+        pass
+    assert affinity.calls == []
+
+
+@pytest.mark.skipif(
+    not hasattr(os, "sched_setaffinity") or len(os.sched_getaffinity(0)) < 2,
+    reason="needs two cores to pin to",
+)
+def test_stage_pins_real_threads():
+    own = os.sched_getaffinity(0)
+    core = min(own)
+    started = threading.Event()
+    stop = threading.Event()
+
+    def idle():
+        started.set()
+        stop.wait(10)
+
+    thread = threading.Thread(target=idle)
+    thread.start()
+    started.wait(10)
+    try:
+        with ResourceScheduler(affinity={"ocr": {core}}).stage("ocr"):
+            assert os.sched_getaffinity(thread.native_id) == {core}
+        assert os.sched_getaffinity(thread.native_id) == own
+    finally:
+        stop.set()
+        thread.join()
+
+
+def test_apply_env_exports_thread_counts(monkeypatch):
+    for var in (*THREAD_ENV_VARS, "CPU_NUM"):
+        monkeypatch.delenv(var, raising=False)
+    monkeypatch.setenv("MKL_NUM_THREADS", "1")
+    scheduler = ResourceScheduler({"yolo": 4, "db": 1, "ocr": 3}, total_cores=8)
+    scheduler.apply_env()
+    assert os.environ["OMP_NUM_THREADS"] == "4"
+    # An explicit setting wins
+    assert os.environ["MKL_NUM_THREADS"] == "1"
+    assert os.environ["CPU_NUM"] == "3"
+
+
+def test_from_env(monkeypatch):
+    monkeypatch.setenv(THREADS_ENV, "yolo=4; OCR=2;db=0")
+    monkeypatch.setenv(AFFINITY_ENV, "yolo=0-2,5;ocr=6")
+    scheduler = ResourceScheduler.from_env()
+    assert scheduler.affinity == {"yolo": {0, 1, 2, 5}, "ocr": {6}}
+    # At least one thread, never more than the pinned cores
+    assert scheduler.budgets["db"] == 1
+    assert scheduler.budgets["ocr"] == 1
+    assert scheduler.budgets["yolo"] == 4
+
+
+@pytest.mark.parametrize(
+    "env, value",
+    [
+        (THREADS_ENV, "gpu=2"),
+        (THREADS_ENV, "yolo=many"),
+        (AFFINITY_ENV, "ocr=a-b"),
+        (AFFINITY_ENV, "ocr=6-2"),
+    ],
+)
+def test_from_env_rejects_bad_values(monkeypatch, env, value):
+    monkeypatch.delenv(THREADS_ENV, raising=False)
+    monkeypatch.delenv(AFFINITY_ENV, raising=False)
+    monkeypatch.setenv(env, value)
+    with pytest.raises(ValueError):
+        ResourceScheduler.from_env()
+
+
+def test_parse_cpu_set():
+    assert parse_cpu_set("0-3, 6,,8") == {0, 1, 2, 3, 6, 8}
+    assert parse_cpu_set("") == set()
@@ -0,0 +1,78 @@
+import json
+
+import pytest
+
+from resultsExporter import JsonlResultsExporter, StreamingResultsWriter, compact
+
+
+def test_streamed_output_matches_json_dump(tmp_path):
+    results = {
+        "a.jpg": {"text": "ABC 123", "id": 1},
+        "b.jpg": {"text": "XYZ 999", "id": 2},
+    }
+    with StreamingResultsWriter(tmp_path / "results.json") as writer:
+        for key, entry in results.items():
+            writer.write(key, entry)
+    assert (tmp_path / "results.json").read_text() == json.dumps(results, indent=4)
+
+    with StreamingResultsWriter(tmp_path / "empty.json"):
+        pass
+    assert json.loads((tmp_path / "empty.json").read_text()) == {}
+
+
+def test_compact_keeps_the_last_line(tmp_path):
+    log_path = tmp_path / "results.jsonl"
+    with JsonlResultsExporter(log_path) as exporter:
+        exporter.append(1, "ABC 123", "a.jpg", "/crops/a.jpg")
+        exporter.append(2, "XYZ 999", "b.jpg", "/crops/b.jpg")
+        # a.jpg read again
+        exporter.append(3, "ABC 128", "a.jpg", "/crops/a.jpg")
+
+    assert compact(log_path, tmp_path / "results.json") == 2
+    results = json.loads((tmp_path / "results.json").read_text())
+    assert results["a.jpg"]["text"] == "ABC 128"
+    assert results["a.jpg"]["id"] == 3
+    assert results["b.jpg"]["id"] == 2
+
+
+def test_compact_skips_a_torn_last_line(tmp_path):
+    log_path = tmp_path / "results.jsonl"
+    with JsonlResultsExporter(log_path) as exporter:
+        exporter.append(1, "ABC 123", "a.jpg", "/crops/a.jpg")
+    with open(log_path, "a", encoding="utf-8") as f:
+        f.write('{"text": "XYZ 999", "fileNa')
+
+    assert compact(log_path, tmp_path / "results.json") == 1
+    assert list(json.loads((tmp_path / "results.json").read_text())) == ["a.jpg"]
+
+    # The next run's lines don't get glued onto the torn one
+    with JsonlResultsExporter(log_path) as exporter:
+        exporter.append(2, "XYZ 999", "b.jpg", "/crops/b.jpg")
+    assert compact(log_path, tmp_path / "results.json") == 2
+
+
+def test_failed_compact_leaves_the_old_file(tmp_path, monkeypatch):
+    log_path = tmp_path / "results.jsonl"
+    json_path = tmp_path / "results.json"
+    json_path.write_text('{"old.jpg": {}}')
+    with JsonlResultsExporter(log_path) as exporter:
+        for i in range(3):
+            exporter.append(i, f"T{i}", f"p{i}.jpg", f"/crops/p{i}.jpg")
+
+    write = StreamingResultsWriter.write
+
+    def failing_write(self, key, entry):
+        if self.count == 2:
+            raise OSError("disk full")
+        write(self, key, entry)
+
+    monkeypatch.setattr(StreamingResultsWriter, "write", failing_write)
+    with pytest.raises(OSError):
+        compact(log_path, json_path)
+    assert json_path.read_text() == '{"old.jpg": {}}'
+    assert not list(tmp_path.glob("*.tmp"))
+
+
+def test_no_log_to_compact(tmp_path):
+    assert compact(tmp_path / "missing.jsonl", tmp_path / "results.json") is None
+    assert not (tmp_path / "results.json").exists()
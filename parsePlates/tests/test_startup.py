@@ -0,0 +1,40 @@
+"""
+The CLI starts without the model frameworks, in fresh interpreters (see
+benchmarks.startup for the timing check).
+"""
+
+import subprocess
+import sys
+
+import pytest
+
+from benchmarks.startup import MAIN, measure
+
+
+@pytest.fixture
+def scratch(tmp_path):
+    (tmp_path / "source" / "images").mkdir(parents=True)
+    return tmp_path
+
+
+@pytest.mark.parametrize("argv", [["--help"], ["crop", "--help"]])
+def test_help_imports_no_framework(argv, scratch):
+    # cv2.dnn is registered as soon as cv2 is imported
+    heavy = ("torch", "ultralytics", "paddlex", "cv2.dnn")
+    assert measure(argv, scratch, heavy)["heavy"] == []
+
+
+@pytest.mark.parametrize("argv", [["db", "search", "NONE"], ["export"]])
+def test_light_commands_import_no_framework(argv, scratch):
+    assert measure(argv, scratch)["heavy"] == []
+
+
+def test_detect_rejects_options_it_ignores(tmp_path):
+    result = subprocess.run(
+        [sys.executable, str(MAIN), "detect", "--queue", "--timeout", "5"],
+        cwd=tmp_path,
+        capture_output=True,
+        text=True,
+    )
+    assert result.returncode == 1
+    assert "--queue, --timeout" in result.stderr
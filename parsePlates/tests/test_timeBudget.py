@@ -0,0 +1,44 @@
+import time
+
+import pytest
+
+from timeBudget import LatencyRecorder, StageFailed, StageRunner, StageTimeout
+
+
+def _sleep(state, seconds: float) -> float:
+    time.sleep(seconds)
+    return seconds
+
+
+def _fail(state):
+    raise ValueError("corrupt image")
+
+
+def test_call_without_timeout_uses_default_ceiling():
+    with StageRunner(default_timeout=0.5) as runner:
+        with pytest.raises(StageTimeout):
+            runner.call("crop", _sleep, 30)
+        assert runner.restarts == 1
+        # The restarted worker takes the next image
+        assert runner.call("crop", _sleep, 0, timeout=None) == 0
+
+
+def test_stage_error_is_reported():
+    with StageRunner() as runner:
+        with pytest.raises(StageFailed, match="corrupt image"):
+            runner.call("detect", _fail)
+
+
+def test_not_isolated_runs_in_process():
+    runner = StageRunner(isolated=False)
+    assert runner.call("detect", _sleep, 0) == 0
+    assert runner.process is None
+
+
+def test_latency_summary_keeps_slowest():
+    latency = LatencyRecorder(slowest=2, max_samples=3)
+    for i in range(10):
+        latency.record("ocr", f"p{i}.jpg", i / 10)
+    info = latency.summary()["ocr"]
+    assert info["count"] == 10
+    assert [slow["fileName"] for slow in info["slowest"]] == ["p9.jpg", "p8.jpg"]
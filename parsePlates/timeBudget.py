@@ -0,0 +1,246 @@
+import heapq
+import multiprocessing as mp
+import random
+import time
+from array import array
+from collections import defaultdict
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+# Ceiling for isolated calls without a budget of their own, e.g. a stage
+# left out of a partial timeouts dict. A hung worker is killed after this
+DEFAULT_STAGE_TIMEOUT = 600.0
+
+
+class StageFailed(Exception):
+    """A stage raised, crashed its worker or ran out of time on one image."""
+
+    def __init__(self, stage: str, message: str, elapsed: float):
+        super().__init__(f"[{stage}] {message} after {elapsed:.2f}s")
+        self.stage = stage
+        self.message = message
+        self.elapsed = elapsed
+
+
+class StageTimeout(StageFailed):
+    """The stage exceeded its time budget and the worker was killed."""
+
+
+def _worker_main(conn, init_fn: Optional[Callable], init_args: tuple):
+    """
+    Loop run inside the worker process. The state returned by init_fn (a
+    loaded model, an OCR pipeline) is created once and passed to every call.
+    """
+    state = init_fn(*init_args) if init_fn else None
+    conn.send(("ready", None, 0.0))
+
+    while True:
+        try:
+            message = conn.recv()
+        except EOFError:
+            return
+        if message is None:
+            return
+
+        fn, args = message
+        started = time.perf_counter()
+        try:
+            reply = ("ok", fn(state, *args), time.perf_counter() - started)
+        except Exception as e:
+            reply = ("error", f"{type(e).__name__}: {e}", time.perf_counter() - started)
+
+        try:
+            conn.send(reply)
+        except Exception as e:
+            conn.send(("error", f"Unpicklable result: {e}", reply[2]))
+
+
+class StageRunner:
+    """
+    Runs per-image stage functions with a time budget.
+
+    Isolated runners execute fn(state, *args) in a worker process, so a
+    corrupt JPEG that segfaults OpenCV or a panorama that takes minutes only
+    costs that one image: the worker is killed, restarted and the caller gets
+    a StageFailed to quarantine. Without isolation the call runs in-process
+    and exceptions propagate as before.
+
+    Isolated calls without a timeout still get default_timeout, so no
+    stage can block the run forever.
+    """
+
+    def __init__(
+        self,
+        init_fn: Optional[Callable] = None,
+        init_args: tuple = (),
+        isolated: bool = True,
+        start_method: str = "spawn",
+        default_timeout: float = DEFAULT_STAGE_TIMEOUT,
+    ):
+        self.init_fn = init_fn
+        self.init_args = init_args
+        self.isolated = isolated
+        self.default_timeout = default_timeout
+        # spawn, torch / paddle thread pools don't survive a fork
+        self.context = mp.get_context(start_method)
+        self.process = None
+        self.conn = None
+        self.state = None
+        self.restarts = 0
+
+    def start(self):
+        """Start the worker and wait for its state to finish loading."""
+        if not self.isolated:
+            if self.state is None and self.init_fn:
+                self.state = self.init_fn(*self.init_args)
+            return
+
+        parent_conn, child_conn = self.context.Pipe()
+        self.process = self.context.Process(
+            target=_worker_main,
+            args=(child_conn, self.init_fn, self.init_args),
+            daemon=True,
+        )
+        self.process.start()
+        child_conn.close()
+        self.conn = parent_conn
+        # Model loading doesn't count against the first image's budget
+        try:
+            self.conn.recv()
+        except EOFError:
+            raise RuntimeError("Stage worker died while loading") from None
+
+    def stop(self):
+        """Kill the worker, used after a timeout or crash."""
+        if self.process is None:
+            return
+        if self.process.is_alive():
+            self.process.kill()
+        self.process.join()
+        self.conn.close()
+        self.process = None
+        self.conn = None
+
+    def call(
+        self, stage: str, fn: Callable, *args, timeout: Optional[float] = None
+    ) -> Any:
+        """
+        Run fn(state, *args) within timeout seconds, default_timeout if
+        None.
+
+        Raises:
+            StageTimeout: the budget ran out, the worker was restarted
+            StageFailed: fn raised or the worker crashed
+        """
+        if not self.isolated:
+            self.start()
+            return fn(self.state, *args)
+
+        if self.process is None:
+            self.start()
+
+        if timeout is None:
+            timeout = self.default_timeout
+        started = time.perf_counter()
+        self.conn.send((fn, args))
+
+        if not self.conn.poll(timeout):
+            self.stop()
+            self.restarts += 1
+            raise StageTimeout(stage, "timed out", time.perf_counter() - started)
+
+        try:
+            status, result, elapsed = self.conn.recv()
+        except EOFError:
+            self.stop()
+            self.restarts += 1
+            raise StageFailed(
+                stage, "worker crashed", time.perf_counter() - started
+            ) from None
+
+        if status == "error":
+            raise StageFailed(stage, result, elapsed)
+        return result
+
+    def close(self):
+        """Ask the worker to exit cleanly."""
+        if self.process is not None and self.process.is_alive():
+            self.conn.send(None)
+            self.process.join(timeout=5)
+        self.stop()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+
+def percentile(sorted_values: List[float], pct: float) -> float:
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    rank = max(0, min(len(sorted_values) - 1, round(pct / 100 * len(sorted_values)) - 1))
+    return sorted_values[rank]
+
+
+class LatencyRecorder:
+    """
+    Per-stage, per-image latencies for the batch summary. Only the raw
+    seconds and the few slowest images are kept, not a record per image.
+
+    With max_samples the seconds are reservoir sampled, so memory stays
+    fixed no matter how many images the run covers.
+    """
+
+    def __init__(self, slowest: int = 5, max_samples: Optional[int] = None):
+        self.samples: Dict[str, array] = defaultdict(lambda: array("d"))
+        self.counts: Dict[str, int] = defaultdict(int)
+        self.slowest: Dict[str, List[Tuple[float, str]]] = defaultdict(list)
+        self.keep_slowest = slowest
+        self.max_samples = max_samples
+        self.random = random.Random(0)
+
+    def record(self, stage: str, name: str, seconds: float):
+        self.counts[stage] += 1
+        samples = self.samples[stage]
+        if self.max_samples is None or len(samples) < self.max_samples:
+            samples.append(seconds)
+        else:
+            slot = self.random.randrange(self.counts[stage])
+            if slot < self.max_samples:
+                samples[slot] = seconds
+
+        heap = self.slowest[stage]
+        if len(heap) < self.keep_slowest:
+            heapq.heappush(heap, (seconds, name))
+        else:
+            heapq.heappushpop(heap, (seconds, name))
+
+    def summary(self) -> Dict[str, Dict[str, Any]]:
+        """Count, p50/p95/p99 and the slowest images for each stage."""
+        result = {}
+        for stage, samples in self.samples.items():
+            values = sorted(samples)
+            result[stage] = {
+                "count": self.counts[stage],
+                "p50": percentile(values, 50),
+                "p95": percentile(values, 95),
+                "p99": percentile(values, 99),
+                "max": max(self.slowest[stage])[0] if self.slowest[stage] else 0.0,
+                "slowest": [
+                    {"fileName": name, "seconds": seconds}
+                    for seconds, name in sorted(self.slowest[stage], reverse=True)
+                ],
+            }
+        return result
+
+    def report(self):
+        """Print the per-stage latency summary."""
+        for stage, info in self.summary().items():
+            print(
+                f"⏱️ {stage}: {info['count']} images, "
+                f"p50={info['p50']:.3f}s p95={info['p95']:.3f}s "
+                f"p99={info['p99']:.3f}s max={info['max']:.3f}s"
+            )
+            for slow in info["slowest"]:
+                print(f"   {slow['seconds']:.3f}s {slow['fileName']}")
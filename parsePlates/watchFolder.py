@@ -0,0 +1,271 @@
+"""
+Watch the input folder and push only new or modified images through
+detection, OCR and the database, instead of rerunning the whole batch.
+
+    python watchFolder.py [folder] [--settle 2] [--poll]
+
+Changes come from inotify on Linux, otherwise (or with --poll, e.g. for
+network shares where remote writes raise no events) the folder is polled.
+A file is processed once its size and mtime have been stable for --settle
+seconds, so half-copied uploads are never read. Drop-to-DB latency is
+measured from the file's ctime, the first moment it existed in the folder.
+"""
+
+import argparse
+import ctypes
+import ctypes.util
+import os
+import select
+import struct
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Set, Tuple
+
+import metrics
+import resourceScheduler
+from helpers import IMAGE_EXTS
+
+INPUT_FOLDER = "source/images/input"
+OUTPUT_PATH = "source/images/output"
+SETTLE_SECONDS = 2.0
+POLL_INTERVAL = 1.0
+
+# From sys/inotify.h
+IN_MODIFY = 0x00000002
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+WATCH_MASK = IN_MODIFY | IN_CLOSE_WRITE | IN_MOVED_TO | IN_CREATE
+# struct inotify_event: wd, mask, cookie, len, then the name
+EVENT_HEADER = struct.Struct("iIII")
+
+
+def is_image_name(name: str) -> bool:
+    """Skips hidden and partial files (rsync's .name.XXXX, browser .part)."""
+    return (
+        not name.startswith((".", "~"))
+        and os.path.splitext(name)[1].lower() in IMAGE_EXTS
+    )
+
+
+class InotifyWatcher:
+    """Names of files created, written or moved into folder, via inotify."""
+
+    def __init__(self, folder: Path):
+        libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+        self.fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        if libc.inotify_add_watch(self.fd, os.fsencode(folder), WATCH_MASK) < 0:
+            errno = ctypes.get_errno()
+            os.close(self.fd)
+            raise OSError(errno, f"inotify_add_watch failed on {folder}")
+
+    def poll(self, timeout: float) -> Set[str]:
+        readable, _, _ = select.select([self.fd], [], [], timeout)
+        if not readable:
+            return set()
+        try:
+            data = os.read(self.fd, 64 * 1024)
+        except BlockingIOError:
+            return set()
+
+        names = set()
+        offset = 0
+        while offset < len(data):
+            _, _, _, length = EVENT_HEADER.unpack_from(data, offset)
+            offset += EVENT_HEADER.size
+            name = data[offset : offset + length].rstrip(b"\0")
+            offset += length
+            if name:
+                names.add(os.fsdecode(name))
+        return names
+
+    def close(self):
+        os.close(self.fd)
+
+
+class PollingWatcher:
+    """Names whose size or mtime changed since the previous scan."""
+
+    def __init__(self, folder: Path, interval: float = POLL_INTERVAL):
+        self.folder = folder
+        self.interval = interval
+        self.seen = self._scan()
+
+    def _scan(self) -> Dict[str, Tuple[int, int]]:
+        with os.scandir(self.folder) as entries:
+            return {
+                entry.name: (entry.stat().st_size, entry.stat().st_mtime_ns)
+                for entry in entries
+                if entry.is_file()
+            }
+
+    def poll(self, timeout: float) -> Set[str]:
+        time.sleep(min(timeout, self.interval))
+        current = self._scan()
+        changed = {
+            name for name, stat in current.items() if self.seen.get(name) != stat
+        }
+        self.seen = current
+        return changed
+
+    def close(self):
+        pass
+
+
+def make_watcher(folder: Path, poll: bool = False, interval: float = POLL_INTERVAL):
+    """inotify where available, polling otherwise."""
+    if not poll:
+        try:
+            return InotifyWatcher(folder)
+        except (OSError, AttributeError, TypeError) as e:
+            print(f"⚠️ inotify unavailable ({e}), polling every {interval}s")
+    return PollingWatcher(folder, interval)
+
+
+def _stat(path: Path) -> Optional[os.stat_result]:
+    try:
+        return path.stat()
+    except FileNotFoundError:
+        return None
+
+
+def watch(
+    folder: str | Path = INPUT_FOLDER,
+    output_path: str | Path = OUTPUT_PATH,
+    settle: float = SETTLE_SECONDS,
+    poll: bool = False,
+    interval: float = POLL_INTERVAL,
+    catch_up: bool = True,
+):
+    """
+    Process images as they land in folder until interrupted.
+
+    With catch_up, images already in the folder that the database has no
+    plate or detection for (dropped while nothing was watching) are
+    processed first.
+    """
+    from plateDaemon import PlateWorker
+    from timeBudget import LatencyRecorder
+
+    folder = Path(folder)
+    folder.mkdir(parents=True, exist_ok=True)
+    scheduler = resourceScheduler.get_scheduler() or resourceScheduler.configure()
+    worker = PlateWorker()
+    scheduler.apply()
+
+    watcher = make_watcher(folder, poll, interval)
+    latency = LatencyRecorder()
+    # name -> {'dropped': wall time, 'changed': monotonic time, 'stat': (size, mtime)}
+    pending: Dict[str, dict] = {}
+
+    def notice(name: str, caught_up: bool = False):
+        stat = _stat(folder / name)
+        if stat is None:
+            pending.pop(name, None)
+            return
+        # Backlog found at startup counts from now, not from when it was dropped
+        dropped = time.time() if caught_up else min(stat.st_ctime, time.time())
+        entry = pending.setdefault(name, {"dropped": dropped, "stat": None})
+        entry["changed"] = time.monotonic()
+        entry["stat"] = (stat.st_size, stat.st_mtime_ns)
+
+    def settled() -> List[str]:
+        now = time.monotonic()
+        ready = []
+        for name, entry in list(pending.items()):
+            if now - entry["changed"] < settle:
+                continue
+            stat = _stat(folder / name)
+            if stat is None:
+                del pending[name]
+            elif stat.st_size == 0 or (stat.st_size, stat.st_mtime_ns) != entry["stat"]:
+                # Still being written without raising events (network share)
+                entry["changed"] = now
+                entry["stat"] = (stat.st_size, stat.st_mtime_ns)
+            else:
+                ready.append(name)
+        return ready
+
+    if catch_up:
+        known = set(worker.db.iter_processed_names())
+        with os.scandir(folder) as entries:
+            for entry in entries:
+                if is_image_name(entry.name) and entry.name not in known:
+                    notice(entry.name, caught_up=True)
+        if pending:
+            print(f"📥 {len(pending)} images not in the database yet")
+
+    print(f"👀 Watching {folder.absolute()} ({type(watcher).__name__})")
+    try:
+        while True:
+            timeout = interval
+            if pending:
+                changed = min(entry["changed"] for entry in pending.values())
+                timeout = min(interval, max(0.05, changed + settle - time.monotonic()))
+            for name in watcher.poll(timeout):
+                if is_image_name(name):
+                    notice(name)
+
+            ready = sorted(settled())
+            if not ready:
+                continue
+
+            started = time.time()
+            entries = [pending.pop(name) for name in ready]
+            results = worker.run(
+                [folder / name for name in ready], output_path, replace=True
+            )
+            finished = time.time()
+            for entry, result in zip(entries, results):
+                name = result["fileName"]
+                latency.record("settle", name, started - entry["dropped"])
+                latency.record("pipeline", name, finished - started)
+                if result["rowId"] is None:
+                    print(f"⚠️ {name}: no plate text stored")
+                    continue
+                latency.record("drop-to-db", name, finished - entry["dropped"])
+                print(
+                    f"⏱️ {name}: '{result['text']}' in the database "
+                    f"{finished - entry['dropped']:.1f}s after it was dropped"
+                )
+    except KeyboardInterrupt:
+        pass
+    finally:
+        watcher.close()
+        latency.report()
+        metrics.export()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Process plate images as they arrive")
+    parser.add_argument("folder", nargs="?", default=INPUT_FOLDER)
+    parser.add_argument("--output", default=OUTPUT_PATH)
+    parser.add_argument(
+        "--settle",
+        type=float,
+        default=SETTLE_SECONDS,
+        help="Seconds a file must stay unchanged before it is read",
+    )
+    parser.add_argument("--poll", action="store_true", help="Poll instead of inotify")
+    parser.add_argument("--interval", type=float, default=POLL_INTERVAL)
+    parser.add_argument(
+        "--no-catch-up",
+        action="store_true",
+        help="Ignore images that are already in the folder",
+    )
+    args = parser.parse_args()
+
+    watch(
+        args.folder,
+        args.output,
+        args.settle,
+        args.poll,
+        args.interval,
+        not args.no_catch_up,
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,6 @@
 import admin from 'firebase-admin'
 import fs from 'fs'
+import path from 'path'
 
 import serviceAccount from './license2plate_key.json' assert { type: 'json' }
 
@@ -9,33 +10,85 @@ admin.initializeApp({
 
 const db = admin.firestore()
 
+const collectionName = 'plates'
+
+// node uploadToFirestore.js                  uploads Plate_Zone_Plates.json
+// node uploadToFirestore.js <export folder>  uploads the batch files written
+//                                            by `python main.py firestore`
+const exportFolder = process.argv[2]
 const jsonFilePath = './Plate_Zone_Plates.json'
 
-fs.readFile(jsonFilePath, 'utf8', async (err, data) => {
-  if (err) {
-    console.error('Error reading the JSON file: ', err)
-    return
-  }
+if (exportFolder) {
+  uploadBatches(exportFolder)
+} else {
+  uploadSnapshot(jsonFilePath)
+}
+
+function uploadSnapshot(filePath) {
+  fs.readFile(filePath, 'utf8', async (err, data) => {
+    if (err) {
+      console.error('Error reading the JSON file: ', err)
+      return
+    }
 
-  const jsonData = JSON.parse(data)
+    const jsonData = JSON.parse(data)
 
-  const collectionName = 'plates'
+    const batch = db.batch()
 
-  const batch = db.batch()
+    jsonData.forEach((item) => {
+      const docRef = db.collection(collectionName).doc(item.id)
+      batch.set(docRef, item)
+    })
 
-  jsonData.forEach((item) => {
-    const docRef = db.collection(collectionName).doc(item.id)
-    batch.set(docRef, item)
+    try {
+      await batch.commit()
+      console.log('Data successfully uploaded to Firestore!')
+      await addAndInitializeVoteCountField(collectionName)
+    } catch (error) {
+      console.error('Error uploading data to Firestore: ', error)
+    }
   })
+}
 
-  try {
-    await batch.commit()
-    console.log('Data successfully uploaded to Firestore!')
-    await addAndInitializeVoteCountField(collectionName)
-  } catch (error) {
-    console.error('Error uploading data to Firestore: ', error)
+// Each batch file holds at most 500 writes, one Firestore batch. New plates
+// start with voteCount 0, updates are merged so votes are kept.
+async function uploadBatches(folder) {
+  const files = fs
+    .readdirSync(folder)
+    .filter((name) => /^batch-\d+\.json$/.test(name))
+    .sort()
+
+  for (const name of files) {
+    const ops = JSON.parse(fs.readFileSync(path.join(folder, name), 'utf8'))
+    const batch = db.batch()
+    const collection = db.collection(collectionName)
+
+    ops.insert.forEach((item) => {
+      batch.set(collection.doc(item.id), { ...item, voteCount: 0 })
+    })
+    ops.update.forEach((item) => {
+      batch.set(collection.doc(item.id), item, { merge: true })
+    })
+    ops.delete.forEach((id) => {
+      batch.delete(collection.doc(id))
+    })
+
+    try {
+      await batch.commit()
+      console.log(
+        `${name}: ${ops.insert.length} inserted, ${ops.update.length} updated, ` +
+          `${ops.delete.length} deleted`
+      )
+    } catch (error) {
+      // Batches before this one are committed, re-running the folder
+      // repeats the same writes
+      console.error(`Error uploading ${name}: `, error)
+      process.exitCode = 1
+      return
+    }
   }
-})
+  console.log(`Uploaded ${files.length} batches from ${folder}`)
+}
 
 async function addAndInitializeVoteCountField(collectionName) {
   const snapshot = await db.collection(collectionName).get()
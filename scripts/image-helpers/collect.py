@@ -1,38 +1,181 @@
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+import argparse
+import errno
+import heapq
 import os
 import shutil
 import time
 
 SOURCE_DIR = ""
 DEST_DIR = ""
-os.makedirs(DEST_DIR, exist_ok=True)
-
-def copy_with_retry(src, dest, attempts=20, delay=0.25):
-    for attempt in range(1, attempts + 1):
-      try:
-          shutil.copy2(src, dest)
-          return True
-      except PermissionError as e:
-          print(f"[LOCKED] Attempt {attempt}/{attempts} on {os.path.basename(src)}")
-          time.sleep(delay)
-      except Exception as e:
-          print(f"[ERROR] Unexpected error copying {src}: {e}")
-          return False
-    print(f"Could not copy {src} after {attempts} attempts")
-    return False
-
-for author in os.listdir(SOURCE_DIR):
-    author_path = os.path.join(SOURCE_DIR, author)
-    if not os.path.isdir(author_path):
-        continue
-
-    for filename in os.listdir(author_path):
-        if not filename.lower().endswith(".jpg"):
+# ioctl from linux/fs.h, clones src's extents into dest without copying data
+FICLONE = 0x40049409
+# Errors meaning "this filesystem / OS can't do that", fall back to copying.
+# Not EPERM in general: a locked file raises PermissionError and goes to the
+# retries
+UNSUPPORTED = (errno.EXDEV, errno.EOPNOTSUPP, errno.ENOTTY, errno.EINVAL, errno.ENOSYS)
+# Except from link() and FICLONE, which answer EPERM when hardlinks are
+# refused (fs.protected_hardlinks, filesystems without them)
+REFUSED = {"reflink": (errno.EPERM,), "link": (errno.EPERM,)}
+
+
+def reflink(src, dest):
+    """Clone src into dest (btrfs, xfs, apfs style copy-on-write)."""
+    import fcntl
+
+    with open(src, "rb") as s, open(dest, "wb") as d:
+        fcntl.ioctl(d.fileno(), FICLONE, s.fileno())
+    shutil.copystat(src, dest)
+
+
+def kernel_copy(src, dest):
+    """copy_file_range, the kernel may share extents or copy server side."""
+    size = os.path.getsize(src)
+    with open(src, "rb") as s, open(dest, "wb") as d:
+        copied = 0
+        while copied < size:
+            n = os.copy_file_range(s.fileno(), d.fileno(), size - copied)
+            if n == 0:
+                break
+            copied += n
+    shutil.copystat(src, dest)
+
+
+def hardlink(src, dest):
+    """Point dest at src's inode, replacing any existing dest."""
+    tmp = dest + ".link"
+    # Left behind by a run that stopped between link and replace
+    try:
+        os.unlink(tmp)
+    except FileNotFoundError:
+        pass
+    os.link(src, tmp)
+    os.replace(tmp, dest)
+
+
+def same_filesystem(src_dir, dest_dir):
+    return os.stat(src_dir).st_dev == os.stat(dest_dir).st_dev
+
+
+def copy_one(src, dest, mode):
+    """
+    Copy one file with the cheapest method the mode and filesystem allow.
+    auto tries reflink, then hardlink, then copy_file_range, then a plain copy.
+
+    Returns:
+        How the file got there: 'reflink', 'link', 'kernel' or 'copy'
+    """
+    methods = {
+        "auto": (("reflink", reflink), ("link", hardlink), ("kernel", kernel_copy)),
+        "reflink": (("reflink", reflink), ("kernel", kernel_copy)),
+        "link": (("link", hardlink),),
+        "copy": (),
+    }[mode]
+
+    for name, method in methods:
+        if name == "kernel" and not hasattr(os, "copy_file_range"):
+            continue
+        try:
+            method(src, dest)
+            return name
+        except ImportError:
+            # No fcntl, not a POSIX system
             continue
+        except OSError as e:
+            if e.errno not in UNSUPPORTED + REFUSED.get(name, ()):
+                raise
+
+    shutil.copy2(src, dest)
+    return "copy"
+
+
+def backoff(attempt, delay):
+    return min(delay * 2 ** (attempt - 1), 5.0)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Collect author plate images into one folder")
+    parser.add_argument("--source", default=SOURCE_DIR)
+    parser.add_argument("--dest", default=DEST_DIR)
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument(
+        "--mode",
+        choices=("copy", "auto", "reflink", "link"),
+        default="copy",
+        help="auto/reflink/link avoid copying data when source and dest share a filesystem",
+    )
+    parser.add_argument("--attempts", type=int, default=20)
+    parser.add_argument("--delay", type=float, default=0.25)
+    args = parser.parse_args()
+
+    os.makedirs(args.dest, exist_ok=True)
+    mode = args.mode
+    if mode != "copy" and not same_filesystem(args.source, args.dest):
+        print("Source and destination are on different filesystems, copying")
+        mode = "copy"
+
+    tasks = []
+    for author in os.listdir(args.source):
+        author_path = os.path.join(args.source, author)
+        if not os.path.isdir(author_path):
+            continue
+
+        for filename in os.listdir(author_path):
+            if not filename.lower().endswith(".jpg"):
+                continue
+            tasks.append(
+                (os.path.join(author_path, filename), os.path.join(args.dest, filename))
+            )
+
+    counts = {"reflink": 0, "link": 0, "kernel": 0, "copy": 0}
+    bytes_avoided = 0
+    failed = 0
+    # Locked files wait here until their backoff expires, so they never hold
+    # up a worker thread
+    retries = []
+
+    with ThreadPoolExecutor(max_workers=args.workers) as pool:
+        running = {
+            pool.submit(copy_one, src, dest, mode): (src, dest, 1) for src, dest in tasks
+        }
+        while running or retries:
+            now = time.monotonic()
+            while retries and retries[0][0] <= now:
+                _, src, dest, attempt = heapq.heappop(retries)
+                running[pool.submit(copy_one, src, dest, mode)] = (src, dest, attempt)
+
+            timeout = max(0, retries[0][0] - now) if retries else None
+            done, _ = wait(running, timeout=timeout, return_when=FIRST_COMPLETED)
+            for future in done:
+                src, dest, attempt = running.pop(future)
+                name = os.path.basename(src)
+                try:
+                    method = future.result()
+                except PermissionError:
+                    if attempt >= args.attempts:
+                        print(f"Could not copy {src} after {args.attempts} attempts")
+                        failed += 1
+                    else:
+                        print(f"[LOCKED] Attempt {attempt}/{args.attempts} on {name}")
+                        ready = time.monotonic() + backoff(attempt, args.delay)
+                        heapq.heappush(retries, (ready, src, dest, attempt + 1))
+                    continue
+                except Exception as e:
+                    print(f"[ERROR] Unexpected error copying {src}: {e}")
+                    failed += 1
+                    continue
+
+                counts[method] += 1
+                if method in ("reflink", "link"):
+                    bytes_avoided += os.path.getsize(src)
+                print(f"Copied {name} ({method})")
 
-        src = os.path.join(author_path, filename)
-        dest = os.path.join(DEST_DIR, filename)
+    print(
+        f"Done: {counts['copy']} copied, {counts['reflink']} reflinked, "
+        f"{counts['link']} hardlinked, {counts['kernel']} kernel copies, {failed} failed"
+    )
+    print(f"Bytes avoided: {bytes_avoided / 1024 / 1024:.1f} MiB")
 
-        print(f"Copying {filename}")
-        copy_with_retry(src, dest)
 
-print("Done")
+if __name__ == "__main__":
+    main()
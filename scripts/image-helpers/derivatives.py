@@ -0,0 +1,189 @@
+"""
+Builds smaller WebP and JPEG variants of the normalized plate images for
+the voting site, so a matchup doesn't have to download two 1200x1600 JPEGs.
+
+Each image is decoded once and every width/format is produced from that
+decode. Outputs are named by the source's content hash
+(<hash[:2]>/<hash>-<width>.<ext>), so they can be cached forever, and
+MANIFEST_FILE maps each plate id to its variants. Reruns only rebuild
+images whose content changed, and drop the entries of removed sources.
+"""
+
+from PIL import Image
+from concurrent.futures import ProcessPoolExecutor
+import argparse
+import hashlib
+import json
+import os
+import re
+import time
+
+INPUT_FOLDER = ""
+OUTPUT_FOLDER = ""
+WIDTHS = (320, 640, 1200)
+# Save options per output extension
+FORMATS = {
+    "webp": {"format": "WEBP", "quality": 80, "method": 4},
+    "jpg": {"format": "JPEG", "quality": 82, "optimize": True, "progressive": True},
+}
+VALID_IMAGE_EXTS = (".jpg", ".jpeg", ".png")
+MANIFEST_FILE = "manifest.json"
+HASH_LENGTH = 16
+
+
+def content_hash(path):
+    digest = hashlib.sha1()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()[:HASH_LENGTH]
+
+
+def plate_id(filename):
+    """'plate12.jpg' -> '12', anything else keeps its stem."""
+    stem = os.path.splitext(filename)[0]
+    match = re.fullmatch(r"plate(\d+)", stem)
+    return match.group(1) if match else stem
+
+
+def build_variants(src, output_folder, digest):
+    """
+    Decode src once and write every width in every format.
+
+    Returns:
+        The manifest variants, smallest first
+    """
+    variants = []
+    with Image.open(src) as img:
+        img = img.convert("RGB")
+        for width in sorted(WIDTHS):
+            if width > img.width:
+                continue
+            height = round(img.height * width / img.width)
+            # Each width is resampled from the full decode, not the previous
+            # (already blurred) variant
+            resized = img
+            if width != img.width:
+                resized = img.resize((width, height), Image.Resampling.LANCZOS)
+
+            for ext, options in FORMATS.items():
+                rel_path = f"{digest[:2]}/{digest}-{width}.{ext}"
+                dest = os.path.join(output_folder, rel_path)
+                os.makedirs(os.path.dirname(dest), exist_ok=True)
+                tmp_dest = dest + ".tmp"
+                resized.save(tmp_dest, **options)
+                os.replace(tmp_dest, dest)
+                variants.append(
+                    {
+                        "width": width,
+                        "height": height,
+                        "format": ext,
+                        "path": rel_path,
+                        "bytes": os.path.getsize(dest),
+                    }
+                )
+    return variants
+
+
+def build_one(src, output_folder, digest):
+    try:
+        return build_variants(src, output_folder, digest), None
+    except Exception as e:
+        return None, f"{type(e).__name__}: {e}"
+
+
+def load_manifest(path):
+    if not os.path.exists(path):
+        return {}
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def save_manifest(path, manifest):
+    # Sort '2' before '10'
+    ordered = dict(sorted(manifest.items(), key=lambda kv: (len(kv[0]), kv[0])))
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(ordered, f, indent=4)
+    os.replace(tmp_path, path)
+
+
+def is_current(entry, stat, digest=None):
+    """Size and mtime unchanged, or the content hash still matches."""
+    if entry is None:
+        return False
+    if entry["size"] == stat.st_size and entry["mtime"] == stat.st_mtime:
+        return True
+    return digest is not None and entry["hash"] == digest
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build WebP/JPEG size variants of plate images")
+    parser.add_argument("--input", default=INPUT_FOLDER)
+    parser.add_argument("--output", default=OUTPUT_FOLDER)
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    args = parser.parse_args()
+
+    os.makedirs(args.output, exist_ok=True)
+    manifest_path = os.path.join(args.output, MANIFEST_FILE)
+    manifest = load_manifest(manifest_path)
+
+    todo = []
+    sources = set()
+    for filename in sorted(os.listdir(args.input)):
+        if not filename.lower().endswith(VALID_IMAGE_EXTS):
+            continue
+
+        src = os.path.join(args.input, filename)
+        stat = os.stat(src)
+        key = plate_id(filename)
+        sources.add(key)
+        entry = manifest.get(key)
+        if is_current(entry, stat):
+            continue
+
+        # Touched but same content (e.g. re-copied): only refresh the stat
+        digest = content_hash(src)
+        if is_current(entry, stat, digest):
+            entry.update({"size": stat.st_size, "mtime": stat.st_mtime})
+            continue
+        todo.append((key, filename, src, stat, digest))
+
+    # The variant files stay, another plate with the same content may use them
+    removed = [key for key in manifest if key not in sources]
+    for key in removed:
+        del manifest[key]
+    if removed:
+        print(f"Dropped {len(removed)} removed images from the manifest")
+
+    print(f"{len(todo)} images to build")
+    started = time.perf_counter()
+    built = 0
+    with ProcessPoolExecutor(max_workers=args.workers) as pool:
+        results = pool.map(
+            build_one,
+            [src for _, _, src, _, _ in todo],
+            [args.output] * len(todo),
+            [digest for _, _, _, _, digest in todo],
+        )
+        for (key, filename, _, stat, digest), (variants, error) in zip(todo, results):
+            if error:
+                print(f"[ERROR] {filename}: {error}")
+                continue
+            manifest[key] = {
+                "source": filename,
+                "hash": digest,
+                "size": stat.st_size,
+                "mtime": stat.st_mtime,
+                "variants": variants,
+            }
+            built += 1
+
+    save_manifest(manifest_path, manifest)
+    elapsed = time.perf_counter() - started
+    rate = built / elapsed if elapsed else 0
+    print(f"Built variants for {built} images ({rate:.1f} images/sec)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,150 @@
+"""
+Single-pass replacement for rename.py -> collect.py -> resize.py.
+
+Walks the author directories once, gives every image a stable plate ID,
+decodes it once and writes the cropped, resized plate{id}.jpg straight into
+the output folder. Source files are never renamed or copied. The
+author-to-plate mapping is kept in MAPPING_FILE so reruns keep the same IDs
+and only process new images. It also keeps the next free ID, so the ID of a
+removed image is never handed to a new one (its plate{id}.jpg would be
+kept as already processed).
+"""
+
+import argparse
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from resize import VALID_IMAGE_EXTS, normalize_image
+
+# directory that contains all author directories (which should have plate images)
+SOURCE_DIR = ""
+OUTPUT_FOLDER = ""
+MAPPING_FILE = "plate_authors.json"
+
+
+def load_mapping(path):
+    """
+    Previously assigned plates, keyed by 'author/filename', and the next
+    free plate ID.
+    """
+    if not os.path.exists(path):
+        return {}, 1
+    with open(path, encoding="utf-8") as f:
+        mapping = json.load(f)
+    known = {
+        f"{plate['author']}/{plate['source']}": plate for plate in mapping["plates"]
+    }
+    # Mappings written before nextId was kept
+    next_id = max(
+        mapping.get("nextId", 1),
+        max((plate["id"] for plate in known.values()), default=0) + 1,
+    )
+    return known, next_id
+
+
+def save_mapping(path, plates, next_id):
+    """Write the mapping atomically, with a per-author index of plate IDs."""
+    plates = sorted(plates, key=lambda plate: plate["id"])
+    authors = {}
+    for plate in plates:
+        authors.setdefault(plate["author"], []).append(plate["id"])
+
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(
+            {"plates": plates, "authors": authors, "nextId": next_id}, f, indent=4
+        )
+    os.replace(tmp_path, path)
+
+
+def walk_sources(source_dir, known, next_id=1):
+    """
+    One pass over the author directories. Known images keep their plate ID,
+    new ones are numbered from next_id, in sorted author / file order so a
+    fresh run is reproducible.
+
+    Returns:
+        The plates found and the next free ID
+    """
+    plates = []
+
+    for author in sorted(os.listdir(source_dir)):
+        author_path = os.path.join(source_dir, author)
+        if not os.path.isdir(author_path):
+            continue
+
+        for filename in sorted(os.listdir(author_path)):
+            if not filename.lower().endswith(VALID_IMAGE_EXTS):
+                continue
+
+            plate = known.get(f"{author}/{filename}")
+            if plate is None:
+                plate = {"id": next_id, "author": author, "source": filename}
+                next_id += 1
+            plate["fileName"] = f"plate{plate['id']}.jpg"
+            plates.append(plate)
+
+    return plates, next_id
+
+
+def ingest_one(src, dest):
+    try:
+        normalize_image(src, dest)
+        return None
+    except Exception as e:
+        return f"{type(e).__name__}: {e}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Rename, collect and resize in one pass")
+    parser.add_argument("--source", default=SOURCE_DIR)
+    parser.add_argument("--output", default=OUTPUT_FOLDER)
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument(
+        "--force", action="store_true", help="Rebuild images that already exist"
+    )
+    args = parser.parse_args()
+
+    os.makedirs(args.output, exist_ok=True)
+    mapping_path = os.path.join(args.output, MAPPING_FILE)
+    plates, next_id = walk_sources(args.source, *load_mapping(mapping_path))
+    # Save IDs before any image is written, so a crash can't reassign them
+    save_mapping(mapping_path, plates, next_id)
+
+    todo = [
+        plate
+        for plate in plates
+        if args.force or not os.path.exists(os.path.join(args.output, plate["fileName"]))
+    ]
+    print(f"{len(plates)} plates found, {len(todo)} to process")
+
+    started = time.perf_counter()
+    failed = 0
+    with ProcessPoolExecutor(max_workers=args.workers) as pool:
+        futures = {
+            pool.submit(
+                ingest_one,
+                os.path.join(args.source, plate["author"], plate["source"]),
+                os.path.join(args.output, plate["fileName"]),
+            ): plate
+            for plate in todo
+        }
+        for future in as_completed(futures):
+            plate = futures[future]
+            error = future.result()
+            if error:
+                failed += 1
+                print(f"[ERROR] {plate['author']}/{plate['source']}: {error}")
+            else:
+                print(f"{plate['author']}/{plate['source']} -> {plate['fileName']}")
+
+    elapsed = time.perf_counter() - started
+    done = len(todo) - failed
+    rate = done / elapsed if elapsed else 0
+    print(f"\nDone! Processed {done} images ({failed} failed) at {rate:.1f} images/sec")
+
+
+if __name__ == "__main__":
+    main()
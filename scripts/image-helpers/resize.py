@@ -1,38 +1,150 @@
 from PIL import Image
+from concurrent.futures import ProcessPoolExecutor
+import argparse
+import hashlib
+import json
 import os
+import time
 
 INPUT_FOLDER = ""
 OUTPUT_FOLDER = ""
 TARGET_RATIO = 3 / 4
 FINAL_SIZE = (1200,1600)
+VALID_IMAGE_EXTS = (".jpg",".jpeg",".png")
+# Source hashes of the last run, used by --check hash
+MANIFEST_FILE = ".resize_manifest.json"
 
-count = 0
 
-os.makedirs(OUTPUT_FOLDER, exist_ok=True)
-
-for filename in os.listdir(INPUT_FOLDER):
-    if not filename.lower().endswith((".jpg",".jpeg",".png")):
-        continue
-
-    path = os.path.join(INPUT_FOLDER, filename)
-    img = Image.open(path)
-    w, h = img.size
+def crop_box(w, h):
+    """Center crop of a w x h image to TARGET_RATIO."""
     current_ratio = w / h
 
     # Image is too wide
     if current_ratio > TARGET_RATIO:
         new_width = int(h * TARGET_RATIO)
         offset = (w - new_width) // 2
-        img = img.crop((offset, 0, offset + new_width, h))
+        return (offset, 0, offset + new_width, h)
     # Image is too tall
-    else:
-        new_height = int(w / TARGET_RATIO)
-        offset = (h - new_height) // 2
-        img = img.crop((0, offset, w, offset + new_height))
+    new_height = int(w / TARGET_RATIO)
+    offset = (h - new_height) // 2
+    return (0, offset, w, offset + new_height)
+
+
+def normalize_image(src, dest):
+    """
+    Center-crop src to TARGET_RATIO, resize to FINAL_SIZE and save to dest.
+
+    For JPEGs much bigger than the target, draft() lets the decoder scale by
+    1/2, 1/4 or 1/8 in the DCT domain, so a 4000px phone photo is never
+    fully decoded. The draft size keeps the crop at or above FINAL_SIZE, so
+    the LANCZOS pass still downsamples. The source mode is kept, a PNG's
+    alpha channel included.
+    """
+    with Image.open(src) as img:
+        w, h = img.size
+        left, top, right, bottom = crop_box(w, h)
+        img.draft(
+            img.mode,
+            (
+                -(-w * FINAL_SIZE[0] // (right - left)),
+                -(-h * FINAL_SIZE[1] // (bottom - top)),
+            ),
+        )
+        # The draft may have shrunk the image, crop in its new coordinates
+        box = crop_box(*img.size)
+        out = img.resize(FINAL_SIZE, Image.Resampling.LANCZOS, box=box)
+
+    # Written under a temp name so an interrupted run never leaves a
+    # truncated image that looks up to date
+    tmp_dest = dest + ".tmp"
+    out.save(tmp_dest, format="PNG" if dest.lower().endswith(".png") else "JPEG")
+    os.replace(tmp_dest, dest)
+
+
+def file_hash(path):
+    digest = hashlib.sha1()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def is_up_to_date(src, dest, check, manifest, src_hash=None):
+    """Whether dest already holds the normalized version of src."""
+    if not os.path.exists(dest):
+        return False
+    if check == "mtime":
+        return os.path.getmtime(dest) >= os.path.getmtime(src)
+    return manifest.get(os.path.basename(src)) == src_hash
+
+
+def resize_one(src, dest):
+    try:
+        normalize_image(src, dest)
+        return None
+    except Exception as e:
+        return f"{type(e).__name__}: {e}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Crop and resize plate images")
+    parser.add_argument("--input", default=INPUT_FOLDER)
+    parser.add_argument("--output", default=OUTPUT_FOLDER)
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument(
+        "--check",
+        choices=("mtime", "hash"),
+        default="mtime",
+        help="How to tell an output is already up to date",
+    )
+    args = parser.parse_args()
+
+    os.makedirs(args.output, exist_ok=True)
+    manifest_path = os.path.join(args.output, MANIFEST_FILE)
+    manifest = {}
+    if args.check == "hash" and os.path.exists(manifest_path):
+        with open(manifest_path, encoding="utf-8") as f:
+            manifest = json.load(f)
+
+    todo = []
+    skipped = 0
+    for filename in os.listdir(args.input):
+        if not filename.lower().endswith(VALID_IMAGE_EXTS):
+            continue
+
+        src = os.path.join(args.input, filename)
+        dest = os.path.join(args.output, filename)
+        src_hash = file_hash(src) if args.check == "hash" else None
+        if is_up_to_date(src, dest, args.check, manifest, src_hash):
+            skipped += 1
+            continue
+        todo.append((filename, src, dest, src_hash))
+
+    started = time.perf_counter()
+    count = 0
+    with ProcessPoolExecutor(max_workers=args.workers) as pool:
+        results = pool.map(
+            resize_one,
+            [src for _, src, _, _ in todo],
+            [dest for _, _, dest, _ in todo],
+            chunksize=8,
+        )
+        for (filename, _, _, src_hash), error in zip(todo, results):
+            if error:
+                print(f"[ERROR] {filename}: {error}")
+                continue
+            count += 1
+            if src_hash is not None:
+                manifest[filename] = src_hash
+
+    if args.check == "hash":
+        with open(manifest_path, "w", encoding="utf-8") as f:
+            json.dump(manifest, f)
 
-    img = img.resize(FINAL_SIZE, Image.Resampling.LANCZOS)
-    img.save(os.path.join(OUTPUT_FOLDER, filename))
+    elapsed = time.perf_counter() - started
+    rate = count / elapsed if elapsed else 0
+    print(f"Converted {count} files, {skipped} up to date ({rate:.1f} images/sec)")
 
-    count += 1
 
-print(f"Converted {count} files")
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,11 @@
+"""
+Run from scripts/image-helpers/:
+
+    python -m pytest tests
+"""
+
+import sys
+from pathlib import Path
+
+# The helpers import each other flat, as when run from this folder
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
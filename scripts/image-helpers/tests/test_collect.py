@@ -0,0 +1,57 @@
+import errno
+import os
+
+import pytest
+
+import collect
+
+
+@pytest.fixture
+def src(tmp_path):
+    path = tmp_path / "plate1.jpg"
+    path.write_bytes(b"jpeg")
+    return path
+
+
+def test_hardlink_replaces_leftover_tmp(tmp_path, src):
+    dest = tmp_path / "out" / "plate1.jpg"
+    dest.parent.mkdir()
+    (dest.parent / "plate1.jpg.link").write_bytes(b"stale")
+
+    assert collect.copy_one(str(src), str(dest), "link") == "link"
+    assert os.path.samefile(src, dest)
+    assert not (dest.parent / "plate1.jpg.link").exists()
+
+
+def test_locked_copy_is_not_a_fallback(tmp_path, src, monkeypatch):
+    def locked(src, dest):
+        raise PermissionError(errno.EACCES, "locked", src)
+
+    monkeypatch.setattr(collect.shutil, "copy2", locked)
+    # Raised to main(), which retries it with backoff
+    with pytest.raises(PermissionError):
+        collect.copy_one(str(src), str(tmp_path / "dest.jpg"), "copy")
+
+
+@pytest.mark.parametrize("mode", ["link", "auto"])
+def test_refused_hardlink_falls_back_to_copy(tmp_path, src, monkeypatch, mode):
+    def refused(src, dest):
+        raise PermissionError(errno.EPERM, "Operation not permitted", src)
+
+    monkeypatch.setattr(collect, "reflink", refused)
+    monkeypatch.setattr(collect, "hardlink", refused)
+    dest = tmp_path / "dest.jpg"
+    assert collect.copy_one(str(src), str(dest), mode) in ("kernel", "copy")
+    assert dest.read_bytes() == b"jpeg"
+    assert not os.path.samefile(src, dest)
+
+
+def test_unsupported_falls_back_to_copy(tmp_path, src, monkeypatch):
+    def unsupported(src, dest):
+        raise OSError(errno.EOPNOTSUPP, "no reflink")
+
+    monkeypatch.setattr(collect, "reflink", unsupported)
+    monkeypatch.setattr(collect, "kernel_copy", unsupported)
+    dest = tmp_path / "dest.jpg"
+    assert collect.copy_one(str(src), str(dest), "reflink") == "copy"
+    assert dest.read_bytes() == b"jpeg"
@@ -0,0 +1,79 @@
+import json
+import os
+import re
+import sys
+
+import pytest
+from PIL import Image
+
+import derivatives
+from derivatives import MANIFEST_FILE, WIDTHS, is_current
+
+
+@pytest.fixture
+def folders(tmp_path):
+    source = tmp_path / "normalized"
+    source.mkdir()
+    for n, color in ((1, "red"), (2, "blue")):
+        Image.new("RGB", (1200, 1600), color).save(source / f"plate{n}.jpg")
+    return source, tmp_path / "variants"
+
+
+def run(folders, monkeypatch, capsys):
+    source, output = folders
+    monkeypatch.setattr(
+        sys,
+        "argv",
+        [
+            "derivatives.py",
+            *("--input", str(source), "--output", str(output), "--workers", "1"),
+        ],
+    )
+    derivatives.main()
+    out = capsys.readouterr().out
+    to_build = int(re.search(r"(\d+) images to build", out).group(1))
+    with open(output / MANIFEST_FILE, encoding="utf-8") as f:
+        return to_build, json.load(f)
+
+
+def test_is_current():
+    stat = os.stat_result((0, 0, 0, 0, 0, 0, 100, 0, 5, 0))
+    entry = {"size": 100, "mtime": 5, "hash": "abc"}
+    assert is_current(entry, stat)
+    assert not is_current(None, stat)
+    touched = os.stat_result((0, 0, 0, 0, 0, 0, 100, 0, 9, 0))
+    assert not is_current(entry, touched)
+    assert is_current(entry, touched, "abc")
+    assert not is_current(entry, touched, "def")
+
+
+def test_rebuilds_only_changed_content(folders, monkeypatch, capsys):
+    source, _ = folders
+    built, manifest = run(folders, monkeypatch, capsys)
+    assert built == 2
+    assert len(manifest["1"]["variants"]) == len(WIDTHS) * 2
+
+    # Same stat
+    assert run(folders, monkeypatch, capsys)[0] == 0
+
+    # Touched, same content: only the stat is refreshed
+    os.utime(source / "plate1.jpg", (1_000_000, 1_000_000))
+    built, manifest = run(folders, monkeypatch, capsys)
+    assert built == 0
+    assert manifest["1"]["mtime"] == 1_000_000
+
+    # New content
+    old_hash = manifest["2"]["hash"]
+    Image.new("RGB", (1200, 1600), "green").save(source / "plate2.jpg")
+    built, manifest = run(folders, monkeypatch, capsys)
+    assert built == 1
+    assert manifest["2"]["hash"] != old_hash
+
+
+def test_removed_sources_leave_the_manifest(folders, monkeypatch, capsys):
+    source, _ = folders
+    run(folders, monkeypatch, capsys)
+    (source / "plate2.jpg").unlink()
+    built, manifest = run(folders, monkeypatch, capsys)
+    assert built == 0
+    assert list(manifest) == ["1"]
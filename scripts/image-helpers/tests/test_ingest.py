@@ -0,0 +1,40 @@
+from ingest import load_mapping, save_mapping, walk_sources
+
+
+def _sources(root, files):
+    for name in files:
+        path = root / name
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.touch()
+
+
+def _ingest(source, mapping_path):
+    plates, next_id = walk_sources(str(source), *load_mapping(str(mapping_path)))
+    save_mapping(str(mapping_path), plates, next_id)
+    return {f"{p['author']}/{p['source']}": p["id"] for p in plates}
+
+
+def test_reruns_keep_ids(tmp_path):
+    source = tmp_path / "source"
+    mapping = tmp_path / "plate_authors.json"
+    _sources(source, ["bob/b.jpg", "alice/a.jpg", "alice/notes.txt"])
+    assert _ingest(source, mapping) == {"alice/a.jpg": 1, "bob/b.jpg": 2}
+
+    _sources(source, ["alice/c.jpg"])
+    assert _ingest(source, mapping) == {
+        "alice/a.jpg": 1,
+        "alice/c.jpg": 3,
+        "bob/b.jpg": 2,
+    }
+
+
+def test_removed_highest_id_is_not_reused(tmp_path):
+    source = tmp_path / "source"
+    mapping = tmp_path / "plate_authors.json"
+    _sources(source, ["alice/a.jpg", "bob/b.jpg"])
+    _ingest(source, mapping)
+
+    (source / "bob" / "b.jpg").unlink()
+    _sources(source, ["carol/c.jpg"])
+    # plate2.jpg still holds bob's image, carol's must not map onto it
+    assert _ingest(source, mapping) == {"alice/a.jpg": 1, "carol/c.jpg": 3}
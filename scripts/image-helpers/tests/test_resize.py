@@ -0,0 +1,74 @@
+import numpy as np
+import pytest
+from PIL import Image
+
+from resize import FINAL_SIZE, crop_box, normalize_image
+
+
+def baseline(path):
+    """The crop and resize resize.py did before draft decoding."""
+    with Image.open(path) as img:
+        img = img.crop(crop_box(*img.size))
+        return img.resize(FINAL_SIZE, Image.Resampling.LANCZOS)
+
+
+def photo(path, size):
+    """A smooth gradient, with marked bands where the center crop cuts."""
+    w, h = size
+    x = np.linspace(0, 255, w)[None, :]
+    y = np.linspace(0, 255, h)[:, None]
+    pixels = np.stack(
+        [np.broadcast_to(x, (h, w)), np.broadcast_to(y, (h, w)), (x + y) / 2],
+        axis=-1,
+    ).astype(np.uint8)
+    left, top, right, bottom = crop_box(w, h)
+    # Outside the crop, must not show up in the output
+    pixels[:, :left] = pixels[:, right:] = (255, 0, 0)
+    pixels[:top] = pixels[bottom:] = (255, 0, 0)
+    Image.fromarray(pixels).save(path, quality=95)
+
+
+@pytest.mark.parametrize("size", [(4000, 3000), (3000, 4200), (2400, 3200)])
+def test_large_jpeg_matches_the_baseline_crop(tmp_path, size):
+    src = tmp_path / "plate.jpg"
+    photo(src, size)
+    dest = tmp_path / "out.jpg"
+    normalize_image(str(src), str(dest))
+
+    with Image.open(dest) as out:
+        assert out.size == FINAL_SIZE
+        got = np.asarray(out.convert("RGB"), dtype=np.int16)
+    want = np.asarray(baseline(src), dtype=np.int16)
+    # The DCT-domain downscale and the JPEG save blur a little, a shifted
+    # crop or a red band would be far off
+    assert np.abs(got - want).mean() < 3
+    assert np.abs(got[:, :8] - want[:, :8]).mean() < 10
+    assert np.abs(got[:8] - want[:8]).mean() < 10
+
+
+def test_draft_decodes_a_large_jpeg_smaller(tmp_path, monkeypatch):
+    src = tmp_path / "plate.jpg"
+    photo(src, (4800, 6400))
+    sizes = []
+    resize_image = Image.Image.resize
+
+    def recording(self, *args, **kwargs):
+        sizes.append(self.size)
+        return resize_image(self, *args, **kwargs)
+
+    monkeypatch.setattr(Image.Image, "resize", recording)
+    normalize_image(str(src), str(tmp_path / "out.jpg"))
+    # Scaled by 1/4 in the decoder, no smaller than FINAL_SIZE
+    assert sizes == [FINAL_SIZE]
+
+
+def test_png_keeps_its_alpha(tmp_path):
+    src = tmp_path / "plate.png"
+    Image.new("RGBA", (900, 1000), (10, 20, 30, 128)).save(src)
+    dest = tmp_path / "out.png"
+    normalize_image(str(src), str(dest))
+    with Image.open(dest) as out:
+        assert out.mode == "RGBA"
+        assert out.size == FINAL_SIZE
+        assert out.getpixel((600, 800))[3] == 128
+    assert not (tmp_path / "out.png.tmp").exists()